@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+async_stress.py: UI latency of async_call while one device times out
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Polls 7 fast devices every 50 ms and one device that never answers every
+# 100 ms, like plugins do. The latency is measured from async_call until the
+# result callback runs in the main thread. With a single worker every
+# timeout of the slow device would stall the fast devices for 2.5 s.
+
+import time
+import sys
+
+from PyQt4.QtGui import QApplication
+
+from fake_brickd import FakeBrickd
+from brickv.bindings.ip_connection import IPConnection, base58encode
+from brickv.bindings.bricklet_temperature import BrickletTemperature
+from brickv.async_call import async_call, async_start_thread
+
+DEVICE_COUNT = 8
+FAST_PERIOD = 0.05 # seconds
+SLOW_PERIOD = 0.1 # seconds
+DURATION = 10.0 # seconds
+
+def main():
+    app = QApplication(sys.argv)
+    async_start_thread(app)
+
+    brickd = FakeBrickd(latency=0.002, payload=2)
+    ipcon = IPConnection()
+    ipcon.set_timeout(2.5)
+    ipcon.connect('127.0.0.1', brickd.port)
+
+    # base58encode(0) is '1', UIDs must not be 0
+    devices = [BrickletTemperature(base58encode(100 + i), ipcon) for i in range(DEVICE_COUNT)]
+    slow_device = devices[0]
+    fast_devices = devices[1:]
+
+    brickd.mute.add(slow_device.uid)
+
+    latencies = []
+    timeouts = [0]
+    pending = {} # fast device -> start time of its call
+    next_poll = dict((device, 0.0) for device in devices)
+
+    def fast_result(device):
+        latencies.append(time.time() - pending.pop(device))
+
+    def slow_error():
+        timeouts[0] += 1
+
+    end = time.time() + DURATION
+
+    while time.time() < end:
+        now = time.time()
+
+        for device in fast_devices:
+            if device not in pending and now >= next_poll[device]:
+                pending[device] = now
+                next_poll[device] = now + FAST_PERIOD
+
+                async_call(device.get_temperature, None,
+                           lambda result, device=device: fast_result(device),
+                           lambda device=device: fast_result(device))
+
+        if now >= next_poll[slow_device]:
+            next_poll[slow_device] = now + SLOW_PERIOD
+
+            async_call(slow_device.get_temperature, None, None, slow_error)
+
+        app.processEvents()
+        time.sleep(0.001)
+
+    ipcon.disconnect()
+
+    latencies.sort()
+
+    print('{0} fast calls, median {1:.1f} ms, 99th percentile {2:.1f} ms, max {3:.1f} ms, '
+          '{4} fast calls still pending, {5} slow device timeouts'
+          .format(len(latencies), latencies[len(latencies) // 2] * 1000,
+                  latencies[int(len(latencies) * 0.99)] * 1000, latencies[-1] * 1000,
+                  len(pending), timeouts[0]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+bench_codec.py: Packet packing and unpacking with and without codecs
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Compares the cached codecs of ip_connection.py with the former field by
+# field handling of the form strings, which is kept below as reference.
+
+import struct
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brickv.bindings.ip_connection import get_codec
+
+COUNT = 100000 # packets
+
+UNPACK_CASES = [
+    ('h h h', struct.pack('<hhh', 1, 2, 3)),
+    ('8s 8s c 3B 3B H B', b'abc\0\0\0\0\0def\0\0\0\0\0a\1\2\3\4\5\6' + struct.pack('<HB', 13, 0)),
+    ('3h 3h 3h 3h 4h 3h 3h b B', b'\1' * 46),
+    ('60c B', b'x' * 61)
+]
+
+PACK_CASES = [
+    ('I', [100]),
+    ('H H', [1, 2]),
+    ('H 16B 16B 16B', [0, (1,) * 16, (2,) * 16, (3,) * 16]),
+    ('B 50s B B H H H', [1, 'hello', 1, 2, 3, 4, 5])
+]
+
+def to_char(c):
+    if sys.hexversion >= 0x03000000:
+        c = c.decode('ascii')
+
+    return c
+
+def to_string(s):
+    if sys.hexversion >= 0x03000000:
+        s = s.decode('ascii')
+
+    i = s.find(chr(0))
+    if i >= 0:
+        s = s[:i]
+
+    return s
+
+def unpack_by_field(data, form):
+    ret = []
+    for f in form.split(' '):
+        f = '<' + f
+        length = struct.calcsize(f)
+
+        x = struct.unpack(f, data[:length])
+        if len(x) > 1:
+            if 'c' in f:
+                x = tuple([to_char(c) for c in x])
+            ret.append(x)
+        elif 'c' in f:
+            ret.append(to_char(x[0]))
+        elif 's' in f:
+            ret.append(to_string(x[0]))
+        else:
+            ret.append(x[0])
+
+        data = data[length:]
+
+    if len(ret) == 1:
+        return ret[0]
+    else:
+        return ret
+
+# only covers the fields used in PACK_CASES
+def pack_by_field(data, form):
+    request = b''
+
+    for f, d in zip(form.split(' '), data):
+        if len(f) > 1 and not 's' in f:
+            request += struct.pack('<' + f, *d)
+        elif 's' in f:
+            if sys.hexversion >= 0x03000000:
+                d = bytes(map(ord, d))
+
+            request += struct.pack('<' + f, d)
+        else:
+            request += struct.pack('<' + f, d)
+
+    return request
+
+def measure(func, *args):
+    start = time.time()
+
+    for i in range(COUNT):
+        func(*args)
+
+    return COUNT / (time.time() - start)
+
+def main():
+    for form, data in UNPACK_CASES:
+        assert unpack_by_field(data, form) == get_codec(form).unpack(data)
+
+        print('unpack {0:26} {1:8.0f} -> {2:8.0f} packets/s'
+              .format(repr(form), measure(unpack_by_field, data, form),
+                      measure(lambda: get_codec(form).unpack(data))))
+
+    for form, data in PACK_CASES:
+        assert pack_by_field(data, form) == get_codec(form).pack(data)
+
+        print('pack   {0:26} {1:8.0f} -> {2:8.0f} packets/s'
+              .format(repr(form), measure(pack_by_field, data, form),
+                      measure(lambda: get_codec(form).pack(data))))
+
+if __name__ == '__main__':
+    main()
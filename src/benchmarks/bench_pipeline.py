@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+bench_pipeline.py: Getter throughput with and without request pipelining
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Several threads call a getter of the same device against a FakeBrickd
+# with 5 ms response latency. Without pipelining only one request per
+# device is in flight, so the latency caps the throughput.
+
+from threading import Thread
+import time
+
+from fake_brickd import FakeBrickd
+from brickv.bindings.ip_connection import IPConnection
+from brickv.bindings.bricklet_accelerometer import BrickletAccelerometer
+
+THREAD_COUNT = 8
+DURATION = 2.0 # seconds
+
+def run(port, request_pipelining):
+    ipcon = IPConnection()
+    ipcon.set_request_pipelining(request_pipelining)
+    ipcon.connect('127.0.0.1', port)
+
+    device = BrickletAccelerometer('abc', ipcon)
+    counts = [0] * THREAD_COUNT
+    end = time.time() + DURATION
+
+    def loop(i):
+        while time.time() < end:
+            device.get_acceleration()
+            counts[i] += 1
+
+    threads = [Thread(target=loop, args=(i,)) for i in range(THREAD_COUNT)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    ipcon.disconnect()
+
+    return sum(counts) / DURATION
+
+def main():
+    brickd = FakeBrickd(latency=0.005)
+
+    for request_pipelining in [False, True]:
+        rate = run(brickd.port, request_pipelining)
+
+        print('request pipelining {0}, {1} threads: {2:.0f} requests/s'
+              .format(request_pipelining, THREAD_COUNT, rate))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+fake_brickd.py: Minimal brickd stand-in for the benchmarks
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+from threading import Thread, Condition
+import socket
+import struct
+import heapq
+import time
+import os
+import sys
+
+# makes the brickv package importable when a benchmark is run from a checkout
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+HEADER = struct.Struct('<IBBBB') # uid, length, function id, sequence number and options, flags
+
+class FakeBrickd(object):
+    """
+    Listens on a local port and answers every request that expects a
+    response after a fixed latency, like a Brick behind a slow link would.
+    The response carries payload zero bytes, enough for small getters.
+    Requests to the UIDs in mute are never answered, so they time out.
+    """
+
+    def __init__(self, latency=0.005, payload=6, port=0):
+        self.latency = latency # seconds
+        self.payload = payload # bytes
+        self.mute = set() # UIDs
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('127.0.0.1', port))
+        self.server.listen(5)
+
+        self.port = self.server.getsockname()[1]
+
+        self.start_thread(self.accept_loop)
+
+    # internal
+    def start_thread(self, target, *args):
+        thread = Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+
+    # internal
+    def accept_loop(self):
+        while True:
+            client = self.server.accept()[0]
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            self.start_thread(self.receive_loop, client)
+
+    # internal
+    def receive_loop(self, client):
+        pending = [] # heap of (due time, counter, response)
+        condition = Condition()
+        counter = 0
+        data = b''
+
+        self.start_thread(self.send_loop, client, pending, condition)
+
+        while True:
+            try:
+                received = client.recv(65536)
+            except socket.error:
+                return
+
+            if len(received) == 0:
+                return
+
+            data += received
+
+            while len(data) >= HEADER.size:
+                uid, length, function_id, sequence_number_and_options, flags = HEADER.unpack_from(data)
+
+                if len(data) < length:
+                    break
+
+                data = data[length:]
+
+                # bit 3 of the options is the response expected flag
+                if (sequence_number_and_options & 8) == 0 or uid in self.mute:
+                    continue
+
+                response = HEADER.pack(uid, HEADER.size + self.payload, function_id,
+                                       sequence_number_and_options, 0) + b'\0' * self.payload
+                counter += 1
+
+                with condition:
+                    heapq.heappush(pending, (time.time() + self.latency, counter, response))
+                    condition.notify()
+
+    # internal
+    def send_loop(self, client, pending, condition):
+        while True:
+            with condition:
+                while len(pending) == 0:
+                    condition.wait()
+
+                due = pending[0][0]
+                now = time.time()
+
+                if due > now:
+                    condition.wait(due - now)
+                    continue
+
+                response = heapq.heappop(pending)[2]
+
+            try:
+                client.sendall(response)
+            except socket.error:
+                return
@@ -23,38 +23,315 @@ Boston, MA 02111-1307, USA.
 """
 
 from PyQt4.QtGui import QApplication
-from PyQt4.QtCore import QThread, QEvent
-from threading import Lock
-from collections import namedtuple
+from PyQt4.QtCore import QObject, QThread, QEvent, QTimer
+from threading import Lock, Condition
+from collections import namedtuple, deque
 import logging
 import functools
 from brickv.bindings import ip_connection
 
-try:
-    from queue import Queue
-except:
-    from Queue import Queue # Python 2 fallback
-
 ASYNC_EVENT = 12345
+ASYNC_THREAD_COUNT = 8 # matches IPConnection.PIPELINE_DEPTH, so one group can fill the pipeline
+
+# calls triggered by the user, e.g. setters from button presses, are done
+# before calls from periodic polling, e.g. QTimer driven update_data methods
+ASYNC_PRIORITY_INTERACTIVE = 0
+ASYNC_PRIORITY_BACKGROUND = 1
+ASYNC_PRIORITY_COUNT = 2
 
-async_call_queue = Queue()
-async_event_queue = Queue()
+async_call_condition = Condition()
+async_call_lanes = {} # lane key -> list of AsyncCall deques, one per priority, protected by async_call_condition
+async_call_ready_lanes = [deque() for i in range(ASYNC_PRIORITY_COUNT)] # keys of lanes with calls of that priority, protected by async_call_condition
+async_call_ready_keys = [set() for i in range(ASYNC_PRIORITY_COUNT)] # protected by async_call_condition
+async_call_active_lanes = {} # lane key -> [number of active calls, group of the active calls], protected by async_call_condition
+async_event_queue = deque()
+async_event_lock = Lock()
+async_event_posted = False # protected by async_event_lock
+async_event_receiver = None
 async_session_lock = Lock()
 async_session_id = 1
 
-AsyncCall = namedtuple('AsyncCall', 'func_to_call parameter result_callback error_callback report_exception log_exception session_id')
+AsyncCall = namedtuple('AsyncCall', 'func_to_call parameter priority session_id lane_key group waiters')
+AsyncWaiter = namedtuple('AsyncWaiter', 'result_callback error_callback report_exception log_exception future')
+
+def get_device(func_to_call):
+    while isinstance(func_to_call, functools.partial):
+        func_to_call = func_to_call.func
+
+    obj = getattr(func_to_call, '__self__', None)
+
+    if isinstance(obj, ip_connection.Device):
+        return obj
+
+    return None
+
+def get_lane_key(func_to_call):
+    # calls to the same device share a lane and are done in order, calls to
+    # different devices are done in parallel. everything else, such as local
+    # functions and RED Brick file objects, shares the None lane and is done
+    # in order as before
+    device = get_device(func_to_call)
+
+    if device != None:
+        return device.uid
+
+    return None
+
+def is_getter(func_to_call):
+    return getattr(func_to_call, '__name__', '').startswith(('get_', 'is_'))
+
+def mark_lane_ready(lane_key, priority):
+    # must be called with async_call_condition locked
+    if lane_key not in async_call_ready_keys[priority]:
+        async_call_ready_keys[priority].add(lane_key)
+        async_call_ready_lanes[priority].append(lane_key)
+        async_call_condition.notify()
 
 def async_call(func_to_call, parameter=None, result_callback=None,
-               error_callback=None, report_exception=False, log_exception=False):
-    with async_session_lock:
-        async_call_queue.put(AsyncCall(func_to_call, parameter, result_callback,
-                                       error_callback, report_exception,
-                                       log_exception, async_session_id))
+               error_callback=None, report_exception=False, log_exception=False,
+               priority=ASYNC_PRIORITY_INTERACTIVE):
+    async_put(func_to_call, parameter,
+              AsyncWaiter(result_callback, error_callback, report_exception, log_exception, None),
+              priority, None)
+
+def async_put(func_to_call, parameter, waiter, priority, group):
+    lane_key = get_lane_key(func_to_call)
+
+    with async_session_lock, async_call_condition:
+        lane = async_call_lanes.get(lane_key)
+
+        if lane == None:
+            lane = [deque() for i in range(ASYNC_PRIORITY_COUNT)]
+            async_call_lanes[lane_key] = lane
+
+        # an identical getter is already pending, its result is delivered to
+        # all waiters instead of doing the same call again
+        if func_to_call and is_getter(func_to_call):
+            for ac in lane[priority]:
+                if ac.func_to_call == func_to_call and ac.parameter == parameter:
+                    ac.waiters.append(waiter)
+                    return
+
+        lane[priority].append(AsyncCall(func_to_call, parameter, priority,
+                                        async_session_id, lane_key, group, [waiter]))
+
+        active = async_call_active_lanes.get(lane_key)
+
+        if active == None or active[1] != None:
+            mark_lane_ready(lane_key, priority)
+
+class AsyncFuture(object):
+    """
+    Result of an async_future or async_gather call. It is completed and its
+    callbacks are called in the main thread, same as async_call callbacks.
+    """
+
+    def __init__(self):
+        self.finished = False
+        self.result = None
+        self.exception = None
+        self.done_callbacks = []
+
+    def set_result(self, result=None):
+        if self.finished:
+            return # timed out before
+
+        self.finished = True
+        self.result = result
+        self.call_done_callbacks()
+
+    def set_exception(self, exception):
+        if self.finished:
+            return # timed out before
+
+        self.finished = True
+        self.exception = exception
+        self.call_done_callbacks()
+
+    def set_timeout(self, timeout):
+        # timeout in seconds. the calls are not aborted, but their late
+        # results are ignored
+        def expire():
+            self.set_exception(ip_connection.Error(ip_connection.Error.TIMEOUT,
+                                                   'Did not complete in time'))
+
+        QTimer.singleShot(int(timeout * 1000), expire)
+
+    def add_done_callback(self, done_callback):
+        if self.finished:
+            done_callback(self)
+        else:
+            self.done_callbacks.append(done_callback)
+
+    def call_done_callbacks(self):
+        done_callbacks = self.done_callbacks
+        self.done_callbacks = []
+
+        for done_callback in done_callbacks:
+            done_callback(self)
+
+    def then(self, result_callback=None, error_callback=None, report_exception=False):
+        """
+        The callbacks are called the same way as by async_call. Returns a
+        new future that completes with the return value of the called
+        callback. If that is a future itself, then the new future completes
+        with it. Without an error_callback an error is passed on.
+        """
+
+        future = AsyncFuture()
+
+        def done(source):
+            try:
+                if source.exception != None:
+                    if error_callback == None:
+                        future.set_exception(source.exception)
+                        return
+                    elif report_exception:
+                        value = error_callback(source.exception)
+                    else:
+                        value = error_callback()
+                elif result_callback == None:
+                    value = source.result
+                elif source.result == None:
+                    value = result_callback()
+                else:
+                    value = result_callback(source.result)
+            except Exception as e:
+                logging.exception('Error while delivering async future result')
+                future.set_exception(e)
+                return
+
+            if isinstance(value, AsyncFuture):
+                value.add_done_callback(chained_done)
+            else:
+                future.set_result(value)
+
+        def chained_done(other):
+            if other.exception != None:
+                future.set_exception(other.exception)
+            else:
+                future.set_result(other.result)
+
+        self.add_done_callback(done)
+
+        return future
+
+def async_future(func_to_call, parameter=None, priority=ASYNC_PRIORITY_INTERACTIVE, timeout=None):
+    future = AsyncFuture()
+
+    async_put(func_to_call, parameter,
+              AsyncWaiter(future.set_result, future.set_exception, True, False, future),
+              priority, None)
+
+    if timeout != None:
+        future.set_timeout(timeout)
+
+    return future
+
+def async_gather(calls, priority=ASYNC_PRIORITY_INTERACTIVE, timeout=None, return_exceptions=False):
+    """
+    Waits for a group of calls and returns a future for the list of their
+    results. Each item is either a future or a (func_to_call, parameter)
+    tuple. The calls of the group are allowed to be done at the same time,
+    even if they are for the same device, so the requests can be pipelined
+    by the IPConnection. The first error completes the group with that error.
+    With return_exceptions the exception of a failed call takes its place in
+    the list instead, so the other results can still be used.
+    """
+
+    group = object()
+    futures = []
+
+    for call in calls:
+        if isinstance(call, AsyncFuture):
+            futures.append(call)
+        else:
+            future = AsyncFuture()
+
+            async_put(call[0], call[1],
+                      AsyncWaiter(future.set_result, future.set_exception, True, False, future),
+                      priority, group)
+
+            futures.append(future)
+
+    gathered = AsyncFuture()
+    results = [None] * len(futures)
+    remaining = [len(futures)]
+
+    def make_done(i):
+        def done(future):
+            if future.exception != None and not return_exceptions:
+                gathered.set_exception(future.exception)
+            else:
+                if future.exception != None:
+                    results[i] = future.exception
+                else:
+                    results[i] = future.result
+
+                remaining[0] -= 1
+
+                if remaining[0] == 0:
+                    gathered.set_result(results)
+
+        return done
+
+    if len(futures) == 0:
+        gathered.set_result(results)
+
+    for i, future in enumerate(futures):
+        future.add_done_callback(make_done(i))
+
+    if timeout != None:
+        gathered.set_timeout(timeout)
+
+    return gathered
+
+def async_clear_lanes(lane_key=None, all_lanes=False):
+    # returns the dropped calls. stale keys left in async_call_ready_lanes are
+    # skipped by the workers
+    with async_call_condition:
+        if all_lanes:
+            lanes = list(async_call_lanes.values())
+
+            async_call_lanes.clear()
+
+            for priority in range(ASYNC_PRIORITY_COUNT):
+                async_call_ready_lanes[priority].clear()
+                async_call_ready_keys[priority].clear()
+        else:
+            lane = async_call_lanes.pop(lane_key, None)
+
+            if lane != None:
+                lanes = [lane]
+            else:
+                lanes = []
+
+    return [ac for lane in lanes for calls in lane for ac in calls]
+
+def async_post_event():
+    # wake up the main thread once for all results queued until it gets to
+    # call async_event_handler, instead of once per result
+    global async_event_posted
+
+    with async_event_lock:
+        if async_event_posted:
+            return
+
+        async_event_posted = True
+
+    QApplication.postEvent(async_event_receiver, QEvent(ASYNC_EVENT))
 
 def async_event_handler():
-    while not async_event_queue.empty():
+    global async_event_posted
+
+    with async_event_lock:
+        async_event_posted = False
+
+    # only deliver the results that are already queued. results queued in the
+    # meantime post a new event, so the event loop gets to run in between
+    for i in range(len(async_event_queue)):
         try:
-            func = async_event_queue.get(False, 0)
+            func = async_event_queue.popleft()
 
             if func:
                 func()
@@ -68,67 +345,203 @@ def async_next_session():
         global async_session_id
         async_session_id += 1
 
-        with async_call_queue.mutex:
-            async_call_queue.queue.clear()
+        async_clear_lanes(all_lanes=True)
 
 def async_start_thread(parent):
+    global async_event_receiver
+
+    class AsyncEventReceiver(QObject):
+        def __init__(self, parent=None):
+            QObject.__init__(self, parent)
+
+            self.async_threads = []
+
+        def event(self, event):
+            if event.type() == ASYNC_EVENT:
+                async_event_handler()
+                return True
+
+            return QObject.event(self, event)
+
     class AsyncThread(QThread):
         def __init__(self, parent=None):
             QThread.__init__(self, parent)
 
+        def pop_ready_call(self):
+            # must be called with async_call_condition locked
+            for priority in range(ASYNC_PRIORITY_COUNT):
+                ready_lanes = async_call_ready_lanes[priority]
+
+                while len(ready_lanes) > 0:
+                    lane_key = ready_lanes.popleft()
+                    async_call_ready_keys[priority].discard(lane_key)
+
+                    lane = async_call_lanes.get(lane_key)
+
+                    if lane == None:
+                        continue # lane got cleared meanwhile
+
+                    calls = None
+
+                    for calls in lane:
+                        if len(calls) > 0:
+                            break
+
+                    if calls == None or len(calls) == 0:
+                        continue
+
+                    ac = calls[0]
+                    active = async_call_active_lanes.get(lane_key)
+
+                    # calls of the same group can be active at the same time,
+                    # otherwise the lane is marked ready again when the
+                    # active calls are finished
+                    if active != None and (active[1] == None or active[1] is not ac.group):
+                        continue
+
+                    calls.popleft()
+
+                    if active == None:
+                        async_call_active_lanes[lane_key] = [1, ac.group]
+                    else:
+                        active[0] += 1
+
+                    if ac.group != None:
+                        # let another worker start the next call of the group
+                        for next_priority, next_calls in enumerate(lane):
+                            if len(next_calls) > 0:
+                                mark_lane_ready(lane_key, next_priority)
+
+                    return ac
+
+            return None
+
+        def get_next_call(self):
+            with async_call_condition:
+                while True:
+                    ac = self.pop_ready_call()
+
+                    if ac != None:
+                        return ac
+
+                    async_call_condition.wait()
+
+        def finish_call(self, lane_key):
+            with async_call_condition:
+                active = async_call_active_lanes[lane_key]
+                active[0] -= 1
+
+                if active[0] > 0:
+                    return # the last active call marks the lane ready again
+
+                del async_call_active_lanes[lane_key]
+
+                lane = async_call_lanes.get(lane_key)
+
+                if lane == None:
+                    return # lane got cleared meanwhile
+
+                empty = True
+
+                for priority, calls in enumerate(lane):
+                    if len(calls) > 0:
+                        mark_lane_ready(lane_key, priority)
+                        empty = False
+
+                if empty:
+                    del async_call_lanes[lane_key]
+
         def run(self):
             while True:
-                ac = async_call_queue.get()
+                ac = self.get_next_call()
 
-                if not ac.func_to_call:
-                    continue
+                try:
+                    self.do_call(ac)
+                finally:
+                    self.finish_call(ac.lane_key)
 
-                result = None
+        def call(self, ac):
+            if ac.parameter == None:
+                return ac.func_to_call()
+            elif isinstance(ac.parameter, tuple):
+                return ac.func_to_call(*ac.parameter)
+            else:
+                return ac.func_to_call(ac.parameter)
 
-                try:
-                    if ac.parameter == None:
-                        result = ac.func_to_call()
-                    elif isinstance(ac.parameter, tuple):
-                        result = ac.func_to_call(*ac.parameter)
-                    else:
-                        result = ac.func_to_call(ac.parameter)
-                except Exception as e:
-                    with async_session_lock:
-                        if ac.session_id != async_session_id:
-                            continue
-
-                    if ac.error_callback != None:
-                        if ac.log_exception:
-                            logging.exception('Error while doing async call')
-
-                        if ac.report_exception:
-                            async_event_queue.put(functools.partial(ac.error_callback, e))
+        def do_call(self, ac):
+            if not ac.func_to_call:
+                return
+
+            result = None
+            device = get_device(ac.func_to_call)
+
+            try:
+                # the calls of a group are done at the same time, let their
+                # requests be in flight at the same time as well
+                if ac.group != None and device != None:
+                    with device.ipcon.pipelined():
+                        result = self.call(ac)
+                else:
+                    result = self.call(ac)
+            except Exception as e:
+                with async_session_lock:
+                    if ac.session_id != async_session_id:
+                        return
+
+                waiters = [waiter for waiter in ac.waiters if waiter.error_callback != None]
+
+                if len(waiters) > 0:
+                    if any(waiter.log_exception for waiter in waiters):
+                        logging.exception('Error while doing async call')
+
+                    for waiter in waiters:
+                        if waiter.report_exception:
+                            async_event_queue.append(functools.partial(waiter.error_callback, e))
                         else:
-                            async_event_queue.put(ac.error_callback)
+                            async_event_queue.append(waiter.error_callback)
 
-                        if isinstance(e, ip_connection.Error):
-                            # clear the async call queue if an IPConnection
-                            # error occurred. in this case we assume that the
-                            # next calls will also fail
-                            with async_call_queue.mutex:
-                                async_call_queue.queue.clear()
+                    if isinstance(e, ip_connection.Error):
+                        # clear the lane if an IPConnection error occurred. in
+                        # this case we assume that the next calls to the same
+                        # device will also fail. if the connection itself is
+                        # gone then all other calls will fail too
+                        if e.value == ip_connection.Error.NOT_CONNECTED:
+                            dropped_calls = async_clear_lanes(all_lanes=True)
+                        else:
+                            dropped_calls = async_clear_lanes(ac.lane_key)
 
-                        QApplication.postEvent(self, QEvent(ASYNC_EVENT))
-                        continue
+                        # a future would never complete otherwise. plain
+                        # async_call waiters are dropped silently
+                        for dropped_call in dropped_calls:
+                            for waiter in dropped_call.waiters:
+                                if waiter.future != None:
+                                    async_event_queue.append(functools.partial(waiter.future.set_exception, e))
+
+                    async_post_event()
+
+                return
 
-                if ac.result_callback != None:
-                    with async_session_lock:
-                        if ac.session_id != async_session_id:
-                            continue
+            waiters = [waiter for waiter in ac.waiters if waiter.result_callback != None]
 
+            if len(waiters) > 0:
+                with async_session_lock:
+                    if ac.session_id != async_session_id:
+                        return
+
+                for waiter in waiters:
                     if result == None:
-                        async_event_queue.put(ac.result_callback)
+                        async_event_queue.append(waiter.result_callback)
                     else:
-                        async_event_queue.put(functools.partial(ac.result_callback, result))
+                        async_event_queue.append(functools.partial(waiter.result_callback, result))
+
+                async_post_event()
+
+    async_event_receiver = AsyncEventReceiver(parent)
 
-                    QApplication.postEvent(self, QEvent(ASYNC_EVENT))
+    for i in range(ASYNC_THREAD_COUNT):
+        async_thread = AsyncThread(parent)
+        async_thread.start()
 
-    async_thread = AsyncThread(parent)
-    async_thread.start()
+        async_event_receiver.async_threads.append(async_thread)
 
-    return async_thread
+    return async_event_receiver
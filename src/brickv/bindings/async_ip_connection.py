@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 Matthias Bolte <matthias@tinkerforge.com>
+# Copyright (C) 2011-2012 Olaf Lüke <olaf@tinkerforge.com>
+#
+# Redistribution and use in source and binary forms of this file,
+# with or without modification, are permitted. See the Creative
+# Commons Zero (CC0 1.0) License for more details.
+
+# asyncio front-end for the IP Connection. This requires python 3.7 or newer,
+# therefore it lives in its own module and ip_connection stays importable
+# with python 2.
+
+import asyncio
+import functools
+import struct
+import os
+import hmac
+import hashlib
+
+from brickv.bindings.ip_connection import IPConnection, BrickDaemon, Device, Error, \
+                                          PacketBuffer, get_codec, check_error_code, \
+                                          get_uid_from_data, get_function_id_from_data, \
+                                          get_sequence_number_from_data
+
+ENUMERATE_FORM = '8s 8s c 3B 3B H B'
+
+class AsyncIPConnection:
+    class Protocol(asyncio.BufferedProtocol):
+        def __init__(self, ipcon):
+            self.ipcon = ipcon
+            self.packet_buffer = PacketBuffer(IPConnection.RECEIVE_BUFFER_SIZE)
+            self.closed = asyncio.get_running_loop().create_future()
+
+        def get_buffer(self, sizehint):
+            return self.packet_buffer.get_free_view()
+
+        def buffer_updated(self, nbytes):
+            self.packet_buffer.commit(nbytes)
+
+            while True:
+                packet = self.packet_buffer.next_packet()
+
+                if packet is None:
+                    break
+
+                self.ipcon.handle_packet(packet)
+
+        def connection_lost(self, exc):
+            self.ipcon.handle_connection_lost(self)
+
+            if not self.closed.done():
+                self.closed.set_result(None)
+
+    def __init__(self):
+        """
+        Creates an asyncio IP Connection object. It uses the same packet
+        format as the IPConnection, but all requests are coroutines running
+        on the event loop of the caller, so there is no thread per request.
+        Multiple requests to the same device can be outstanding at the same
+        time (up to IPConnection.PIPELINE_DEPTH per device).
+
+        Wrap generated Brick and Bricklet classes with AsyncDevice to use
+        them with an AsyncIPConnection.
+        """
+
+        self.timeout = 2.5
+        self.devices = {}
+        self.next_sequence_number = 0
+        self.pending_requests = {} # (uid, function_id, sequence_number) -> future
+        self.request_semaphores = {} # uid -> semaphore limiting outstanding requests
+        self.callback_iterators = {} # (uid, callback_id) -> list of CallbackIterator
+        self.transport = None
+        self.protocol = None
+        self.disconnect_probe_flag = False
+        self.disconnect_probe_task = None
+        self.next_authentication_nonce = 0
+        self.brickd = AsyncDevice(BrickDaemon, '2', self)
+
+    async def connect(self, host, port):
+        """
+        Creates a TCP/IP connection to the given *host* and *port*. Finishes
+        when the connection is established and raises an exception if there
+        is no Brick Daemon or WIFI/Ethernet Extension listening at the given
+        host and port.
+        """
+
+        if self.transport is not None:
+            raise Error(Error.ALREADY_CONNECTED, 'Already connected')
+
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_connection(functools.partial(AsyncIPConnection.Protocol, self),
+                                                           host, port)
+
+        self.transport = transport
+        self.protocol = protocol
+        self.disconnect_probe_flag = True
+        self.disconnect_probe_task = loop.create_task(self.disconnect_probe_loop())
+
+    async def disconnect(self):
+        """
+        Disconnects the TCP/IP connection. Pending requests fail with a
+        NOT_CONNECTED error and all callback iterators end.
+        """
+
+        if self.transport is None:
+            raise Error(Error.NOT_CONNECTED, 'Not connected')
+
+        protocol = self.protocol
+
+        self.transport.close()
+
+        await protocol.closed
+
+    async def authenticate(self, secret):
+        """
+        Performs an authentication handshake, see IPConnection.authenticate.
+        """
+
+        secret_bytes = secret.encode('ascii')
+
+        if self.next_authentication_nonce == 0:
+            self.next_authentication_nonce = struct.unpack('<I', os.urandom(4))[0]
+
+        server_nonce = await self.brickd.get_authentication_nonce()
+        client_nonce = struct.unpack('<4B', struct.pack('<I', self.next_authentication_nonce))
+        self.next_authentication_nonce = (self.next_authentication_nonce + 1) % (1 << 32)
+
+        h = hmac.new(secret_bytes, digestmod=hashlib.sha1)
+
+        h.update(struct.pack('<4B', *server_nonce))
+        h.update(struct.pack('<4B', *client_nonce))
+
+        digest = struct.unpack('<20B', h.digest())
+
+        await self.brickd.authenticate(client_nonce, digest)
+
+    def get_connection_state(self):
+        if self.transport is not None:
+            return IPConnection.CONNECTION_STATE_CONNECTED
+        else:
+            return IPConnection.CONNECTION_STATE_DISCONNECTED
+
+    def set_timeout(self, timeout):
+        """
+        Sets the timeout in seconds for getters and for setters for which the
+        response expected flag is activated.
+
+        Default timeout is 2.5.
+        """
+
+        timeout = float(timeout)
+
+        if timeout < 0:
+            raise ValueError('Timeout cannot be negative')
+
+        self.timeout = timeout
+
+    def get_timeout(self):
+        return self.timeout
+
+    def enumerate(self):
+        """
+        Broadcasts an enumerate request. The enumerate callbacks can be
+        received with callbacks(None, IPConnection.CALLBACK_ENUMERATE).
+        """
+
+        self.send(self.create_packet_header(None, 8, IPConnection.FUNCTION_ENUMERATE,
+                                            self.get_next_sequence_number(), False))
+
+    def callbacks(self, device, callback_id, maxsize=0):
+        """
+        Returns an async iterator over the callbacks with ID *callback_id* of
+        the given *device*. Pass None as device for the enumerate callback.
+        Each item is the single callback value or a tuple of all values.
+
+        If *maxsize* is not 0, at most *maxsize* callbacks are queued and the
+        oldest ones are dropped if the iterator is not consumed fast enough.
+        """
+
+        if device is None:
+            key = (None, callback_id)
+            form = ENUMERATE_FORM
+        else:
+            key = (device.uid, callback_id)
+            form = device.callback_formats[callback_id]
+
+        iterator = CallbackIterator(self, key, form, maxsize)
+
+        self.callback_iterators.setdefault(key, []).append(iterator)
+
+        return iterator
+
+    async def send_request(self, device, function_id, data, form, form_ret):
+        codec = get_codec(form)
+        response_expected = device.get_response_expected(function_id)
+
+        if not response_expected:
+            self.send(self.create_packet_header(device, 8 + codec.size, function_id,
+                                                self.get_next_sequence_number(), False) + codec.pack(data))
+            return None
+
+        semaphore = self.request_semaphores.get(device.uid)
+
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(IPConnection.PIPELINE_DEPTH)
+            self.request_semaphores[device.uid] = semaphore
+
+        async with semaphore:
+            key = (device.uid, function_id, self.get_next_sequence_number())
+
+            while key in self.pending_requests:
+                key = (device.uid, function_id, self.get_next_sequence_number())
+
+            future = asyncio.get_running_loop().create_future()
+            self.pending_requests[key] = future
+
+            try:
+                self.send(self.create_packet_header(device, 8 + codec.size, function_id,
+                                                    key[2], True) + codec.pack(data))
+
+                response = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                msg = 'Did not receive response for function {0} in time'.format(function_id)
+                raise Error(Error.TIMEOUT, msg)
+            finally:
+                self.pending_requests.pop(key, None)
+
+        check_error_code(response, function_id)
+
+        if len(form_ret) > 0:
+            return get_codec(form_ret).unpack(response[8:])
+
+    def send(self, packet):
+        if self.transport is None:
+            raise Error(Error.NOT_CONNECTED, 'Not connected')
+
+        self.transport.write(packet)
+        self.disconnect_probe_flag = False
+
+    def get_next_sequence_number(self):
+        sequence_number = self.next_sequence_number + 1
+        self.next_sequence_number = sequence_number % 15
+        return sequence_number
+
+    def create_packet_header(self, device, length, function_id, sequence_number, response_expected):
+        if device is not None:
+            uid = device.uid
+        else:
+            uid = IPConnection.BROADCAST_UID
+
+        sequence_number_and_options = (sequence_number << 4) | (int(response_expected) << 3)
+
+        return struct.pack('<IBBBB', uid, length, function_id, sequence_number_and_options, 0)
+
+    def handle_packet(self, packet):
+        self.disconnect_probe_flag = False
+
+        function_id = get_function_id_from_data(packet)
+        sequence_number = get_sequence_number_from_data(packet)
+        uid = get_uid_from_data(packet)
+
+        if sequence_number == 0:
+            if function_id == IPConnection.CALLBACK_ENUMERATE:
+                key = (None, function_id)
+            else:
+                key = (uid, function_id)
+
+            iterators = self.callback_iterators.get(key)
+
+            if iterators:
+                values = get_codec(iterators[0].form).unpack(packet[8:])
+
+                if isinstance(values, list):
+                    values = tuple(values)
+
+                for iterator in iterators:
+                    iterator.put(values)
+
+            return
+
+        future = self.pending_requests.get((uid, function_id, sequence_number))
+
+        if future is not None and not future.done():
+            future.set_result(packet)
+
+        # otherwise the response arrived after the timeout or is unexpected
+
+    def handle_connection_lost(self, protocol):
+        if protocol is not self.protocol:
+            return
+
+        self.transport = None
+        self.protocol = None
+
+        if self.disconnect_probe_task is not None:
+            self.disconnect_probe_task.cancel()
+            self.disconnect_probe_task = None
+
+        for future in self.pending_requests.values():
+            if not future.done():
+                future.set_exception(Error(Error.NOT_CONNECTED, 'Not connected'))
+
+        for iterators in self.callback_iterators.values():
+            for iterator in iterators:
+                iterator.put(CallbackIterator.END)
+
+    async def disconnect_probe_loop(self):
+        request = self.create_packet_header(None, 8, IPConnection.FUNCTION_DISCONNECT_PROBE,
+                                            self.get_next_sequence_number(), False)
+
+        while self.transport is not None:
+            await asyncio.sleep(IPConnection.DISCONNECT_PROBE_INTERVAL)
+
+            if self.transport is None:
+                break
+
+            if self.disconnect_probe_flag:
+                # a broken connection is reported by connection_lost
+                self.transport.write(request)
+            else:
+                self.disconnect_probe_flag = True
+
+class CallbackIterator:
+    END = object()
+
+    def __init__(self, ipcon, key, form, maxsize):
+        self.ipcon = ipcon
+        self.key = key
+        self.form = form
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.queue is None:
+            raise StopAsyncIteration
+
+        values = await self.queue.get()
+
+        if values is CallbackIterator.END:
+            self.close()
+            raise StopAsyncIteration
+
+        return values
+
+    def put(self, values):
+        if self.queue is None:
+            return
+
+        if self.queue.full():
+            # latest callback wins
+            self.queue.get_nowait()
+            self.dropped += 1
+
+        self.queue.put_nowait(values)
+
+    def close(self):
+        """
+        Stops receiving callbacks with this iterator.
+        """
+
+        if self.queue is None:
+            return
+
+        iterators = self.ipcon.callback_iterators.get(self.key, [])
+
+        if self in iterators:
+            iterators.remove(self)
+
+        self.queue = None
+
+class AsyncDevice:
+    """
+    Makes the functions of a generated Brick or Bricklet class awaitable
+    on an AsyncIPConnection, without changing the generated code:
+
+        temperature = AsyncDevice(BrickletTemperature, uid, ipcon)
+        value = await temperature.get_temperature()
+
+        async for value in temperature.callbacks(BrickletTemperature.CALLBACK_TEMPERATURE):
+            ...
+
+    Every generated function does exactly one send_request call. The adapter
+    runs the generated function once to record the request, sends it
+    asynchronously and runs the function again with the response, so the
+    generated result conversion (named tuples etc.) is applied as usual.
+    """
+
+    class Recorded(Exception):
+        pass
+
+    class RequestRecorder:
+        def __init__(self):
+            self.request = None
+
+        def send_request(self, device, function_id, data, form, form_ret):
+            self.request = (function_id, data, form, form_ret)
+
+            raise AsyncDevice.Recorded()
+
+    class ResponseReplayer:
+        def __init__(self, response):
+            self.response = response
+
+        def send_request(self, device, function_id, data, form, form_ret):
+            return self.response
+
+    def __init__(self, device_class, uid, ipcon):
+        self.device = device_class(uid, ipcon)
+        self.ipcon = ipcon
+        self.uid = self.device.uid
+
+    def __getattr__(self, name):
+        attr = getattr(self.device, name)
+
+        # the generic device functions and constants don't send requests
+        if name in Device.__dict__ or name == 'register_callback' or not callable(attr):
+            return attr
+
+        return functools.partial(self.call, attr)
+
+    def callbacks(self, callback_id, maxsize=0):
+        """
+        Returns an async iterator over the callbacks with ID *callback_id*,
+        see AsyncIPConnection.callbacks.
+        """
+
+        return self.ipcon.callbacks(self.device, callback_id, maxsize)
+
+    async def call(self, function, *args):
+        recorder = AsyncDevice.RequestRecorder()
+        self.device.ipcon = recorder
+
+        try:
+            function(*args)
+        except AsyncDevice.Recorded:
+            pass
+        finally:
+            self.device.ipcon = self.ipcon
+
+        function_id, data, form, form_ret = recorder.request
+        response = await self.ipcon.send_request(self.device, function_id, data, form, form_ret)
+
+        self.device.ipcon = AsyncDevice.ResponseReplayer(response)
+
+        try:
+            return function(*args)
+        finally:
+            self.device.ipcon = self.ipcon
@@ -6,7 +6,7 @@
 # with or without modification, are permitted. See the Creative
 # Commons Zero (CC0 1.0) License for more details.
 
-from threading import Thread, Lock, Semaphore
+from threading import Thread, Lock, Semaphore, Event, Condition, local
 
 # current_thread for python 2.6, currentThread for python 2.5
 try:
@@ -20,8 +20,17 @@ try:
 except ImportError:
     from queue import Queue, Empty
 
+# selectors for python 3.4 and newer, plain select otherwise
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+from collections import deque
 import struct
 import socket
+import select
+import heapq
 import sys
 import time
 import os
@@ -29,6 +38,8 @@ import math
 import hmac
 import hashlib
 import errno
+import functools
+import traceback
 
 # use normal tuples instead of namedtuples in python version below 2.6
 if sys.hexversion < 0x02060000:
@@ -86,6 +97,300 @@ def uid64_to_uid32(uid64):
 
     return uid32
 
+if sys.hexversion < 0x03000000:
+    def encode_string(s):
+        if isinstance(s, unicode):
+            return str(bytearray(map(ord, s)))
+        else:
+            return s
+
+    def decode_string(b):
+        return b
+
+    def decode_chars(t):
+        return t
+else:
+    def encode_string(s):
+        if isinstance(s, str):
+            return bytes(map(ord, s))
+        else:
+            return s
+
+    def decode_string(b):
+        return b.decode('ascii')
+
+    def decode_chars(t):
+        return tuple(b''.join(t).decode('ascii'))
+
+class Codec:
+    """
+    Packs and unpacks the values described by a binding form string such as
+    'c H H' with a single precompiled struct.Struct. The per-element post
+    processing (char decoding, string trimming, grouping of array elements
+    into tuples) is planned once when the codec is created.
+    """
+
+    ELEMENT_VALUE = 0
+    ELEMENT_ARRAY = 1
+    ELEMENT_CHAR = 2
+    ELEMENT_CHAR_ARRAY = 3
+    ELEMENT_STRING = 4
+
+    def __init__(self, form):
+        self.plan = [] # list of (kind, count) tuples, one per form element
+
+        if len(form) > 0:
+            elements = form.split(' ')
+        else:
+            elements = []
+
+        for f in elements:
+            count = len(struct.unpack('<' + f, b'\0' * struct.calcsize('<' + f)))
+
+            if 's' in f:
+                kind = Codec.ELEMENT_STRING
+            elif 'c' in f:
+                if len(f) > 1:
+                    kind = Codec.ELEMENT_CHAR_ARRAY
+                else:
+                    kind = Codec.ELEMENT_CHAR
+            elif count > 1 or len(f) > 1:
+                kind = Codec.ELEMENT_ARRAY
+            else:
+                kind = Codec.ELEMENT_VALUE
+
+            self.plan.append((kind, count))
+
+        self.struct = struct.Struct('<' + ''.join(elements))
+        self.size = self.struct.size
+        self.plain = all([kind == Codec.ELEMENT_VALUE for kind, _ in self.plan])
+
+    def pack(self, data):
+        if self.plain:
+            return self.struct.pack(*data)
+
+        values = []
+
+        for (kind, count), d in zip(self.plan, data):
+            if kind == Codec.ELEMENT_VALUE:
+                values.append(d)
+            elif kind == Codec.ELEMENT_ARRAY:
+                if count == 1 and not isinstance(d, (tuple, list)):
+                    d = (d,)
+
+                if len(d) != count:
+                    raise struct.error('pack expected {0} items for packing (got {1})'.format(count, len(d)))
+
+                values.extend(d)
+            elif kind == Codec.ELEMENT_CHAR:
+                values.append(encode_string(d))
+            elif kind == Codec.ELEMENT_CHAR_ARRAY:
+                if count != len(d):
+                    raise ValueError('Incorrect char list length')
+
+                values.extend([encode_string(c) for c in d])
+            else:
+                values.append(encode_string(d))
+
+        return self.struct.pack(*values)
+
+    def unpack(self, data):
+        values = self.struct.unpack_from(data, 0)
+
+        if self.plain:
+            if len(values) == 1:
+                return values[0]
+            else:
+                return list(values)
+
+        ret = []
+        i = 0
+
+        for kind, count in self.plan:
+            if kind == Codec.ELEMENT_VALUE:
+                ret.append(values[i])
+            elif kind == Codec.ELEMENT_ARRAY:
+                if count > 1:
+                    ret.append(values[i:i + count])
+                else:
+                    ret.append(values[i])
+            elif kind == Codec.ELEMENT_CHAR:
+                ret.append(decode_string(values[i]))
+            elif kind == Codec.ELEMENT_CHAR_ARRAY:
+                if count > 1:
+                    ret.append(decode_chars(values[i:i + count]))
+                else:
+                    ret.append(decode_string(values[i]))
+            else:
+                s = decode_string(values[i])
+                k = s.find(chr(0))
+
+                if k >= 0:
+                    s = s[:k]
+
+                ret.append(s)
+
+            i += count
+
+        if len(ret) == 1:
+            return ret[0]
+        else:
+            return ret
+
+codecs = {}
+
+def get_codec(form):
+    try:
+        return codecs[form]
+    except KeyError:
+        codec = Codec(form)
+        codecs[form] = codec
+        return codec
+
+class PacketBuffer:
+    """
+    Frames packets in place in a preallocated buffer. Only the incomplete
+    packet at the end of the buffer gets moved to its front if the buffer
+    is full. This is cheap, because a packet is at most 255 bytes long.
+    """
+
+    def __init__(self, size):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0 # begin of pending data in buffer
+        self.end = 0 # end of pending data in buffer
+
+    def get_free_view(self):
+        if self.end == len(self.buffer):
+            self.buffer[0:self.end - self.start] = self.view[self.start:self.end]
+            self.end -= self.start
+            self.start = 0
+
+        return self.view[self.end:]
+
+    def commit(self, length):
+        self.end += length
+
+    def next_packet(self):
+        if self.end - self.start < 8:
+            # Wait for complete header
+            if self.start == self.end:
+                self.start = 0
+                self.end = 0
+
+            return None
+
+        length = self.buffer[self.start + 4]
+
+        if self.end - self.start < length:
+            # Wait for complete packet
+            return None
+
+        packet = self.view[self.start:self.start + length].tobytes()
+        self.start += length
+
+        return packet
+
+class CallbackQueue:
+    """
+    Queue for the callback thread. Connection events are delivered first and
+    in order. Callback packets are kept in one lane per device and the lanes
+    take turns, so a device flooding callbacks cannot delay the callbacks of
+    other devices. Of callbacks with enabled coalescing only the latest packet
+    is kept queued.
+    """
+
+    class Lane:
+        def __init__(self):
+            self.items = deque() # (function_id, packet), packet is None if coalesced
+            self.latest = {} # function_id -> latest packet of a coalesced callback
+
+    def __init__(self, devices):
+        self.devices = devices
+        self.condition = Condition()
+        self.meta_items = deque() # protected by condition
+        self.lanes = {} # uid -> Lane, protected by condition
+        self.ready_lanes = deque() # lanes with queued packets in turn order, protected by condition
+        self.depth = 0 # number of queued packets, protected by condition
+
+    def __len__(self):
+        with self.condition:
+            return len(self.meta_items) + self.depth
+
+    def put(self, item):
+        with self.condition:
+            self.append(item)
+            self.condition.notify()
+
+    def get(self):
+        with self.condition:
+            while len(self.meta_items) + self.depth == 0:
+                self.condition.wait()
+
+            return self.popleft()
+
+    def append(self, item):
+        with self.condition:
+            kind, packet = item
+
+            if kind != IPConnection.QUEUE_PACKET:
+                self.meta_items.append(item)
+                return
+
+            uid = get_uid_from_data(packet)
+            function_id = get_function_id_from_data(packet)
+            lane = self.lanes.get(uid)
+
+            if lane is None:
+                lane = CallbackQueue.Lane()
+                self.lanes[uid] = lane
+
+            device = self.devices.get(uid)
+
+            if device is not None and function_id in device.coalesced_callbacks:
+                if function_id in lane.latest:
+                    lane.latest[function_id] = packet
+                    device.callback_drop_counts[function_id] = device.callback_drop_counts.get(function_id, 0) + 1
+                    return
+
+                lane.latest[function_id] = packet
+                packet = None
+
+            if len(lane.items) == 0:
+                self.ready_lanes.append(lane)
+
+            lane.items.append((function_id, packet))
+            self.depth += 1
+
+    def popleft(self):
+        with self.condition:
+            if len(self.meta_items) > 0:
+                return self.meta_items.popleft()
+
+            lane = self.ready_lanes.popleft()
+            function_id, packet = lane.items.popleft()
+            self.depth -= 1
+
+            if packet is None:
+                packet = lane.latest.pop(function_id)
+
+            if len(lane.items) > 0:
+                self.ready_lanes.append(lane)
+
+            return (IPConnection.QUEUE_PACKET, packet)
+
+    def get_depth(self, uid=None):
+        with self.condition:
+            if uid is None:
+                return self.depth
+
+            lane = self.lanes.get(uid)
+
+            if lane is None:
+                return 0
+
+            return len(lane.items)
+
 class Error(Exception):
     TIMEOUT = -1
     NOT_ADDED = -6 # obsolete since v2.0
@@ -102,6 +407,22 @@ class Error(Exception):
     def __str__(self):
         return str(self.description) + ' (' + str(self.value) + ')'
 
+def check_error_code(response, function_id):
+    error_code = get_error_code_from_data(response)
+
+    if error_code == 0:
+        # no error
+        pass
+    elif error_code == 1:
+        msg = 'Got invalid parameter for function {0}'.format(function_id)
+        raise Error(Error.INVALID_PARAMETER, msg)
+    elif error_code == 2:
+        msg = 'Function {0} is not supported'.format(function_id)
+        raise Error(Error.NOT_SUPPORTED, msg)
+    else:
+        msg = 'Function {0} returned an unknown error'.format(function_id)
+        raise Error(Error.UNKNOWN_ERROR_CODE, msg)
+
 class Device:
     RESPONSE_EXPECTED_INVALID_FUNCTION_ID = 0
     RESPONSE_EXPECTED_ALWAYS_TRUE = 1 # getter
@@ -125,10 +446,10 @@ class Device:
         self.api_version = (0, 0, 0)
         self.registered_callbacks = {}
         self.callback_formats = {}
-        self.expected_response_function_id = None # protected by request_lock
-        self.expected_response_sequence_number = None # protected by request_lock
-        self.response_queue = Queue()
-        self.request_lock = Lock()
+        self.coalesced_callbacks = set()
+        self.callback_drop_counts = {}
+        self.request_lock = Lock() # serializes requests if pipelining is disabled
+        self.pipeline_semaphore = Semaphore(IPConnection.PIPELINE_DEPTH) # limits requests if pipelining is enabled
 
         self.response_expected = [Device.RESPONSE_EXPECTED_INVALID_FUNCTION_ID] * 256
         self.response_expected[IPConnection.FUNCTION_ENUMERATE] = Device.RESPONSE_EXPECTED_ALWAYS_FALSE
@@ -225,6 +546,47 @@ class Device:
             if self.response_expected[i] in [Device.RESPONSE_EXPECTED_TRUE, Device.RESPONSE_EXPECTED_FALSE]:
                 self.response_expected[i] = flag
 
+    def set_callback_coalescing(self, callback_id, coalescing):
+        """
+        Enables or disables coalescing for the callback with ID *callback_id*.
+        If coalescing is enabled, at most one callback with this ID is queued
+        for delivery at any time. A newer callback replaces the queued one,
+        so a slow consumer only sees the latest value and the callback queue
+        cannot grow without bound.
+
+        Default value is *False*.
+        """
+
+        if bool(coalescing):
+            self.coalesced_callbacks.add(callback_id)
+        else:
+            self.coalesced_callbacks.discard(callback_id)
+
+    def get_callback_coalescing(self, callback_id):
+        """
+        Returns *true* if coalescing is enabled for the callback with ID
+        *callback_id*, *false* otherwise.
+        """
+
+        return callback_id in self.coalesced_callbacks
+
+    def get_callback_drop_count(self, callback_id):
+        """
+        Returns the number of callbacks with ID *callback_id* that were
+        replaced by a newer one before they could be delivered, because
+        coalescing is enabled for them.
+        """
+
+        return self.callback_drop_counts.get(callback_id, 0)
+
+    def get_callback_queue_depth(self):
+        """
+        Returns the number of callbacks of this device that are queued for
+        delivery.
+        """
+
+        return self.ipcon.get_callback_queue_depth(self)
+
 class BrickDaemon(Device):
     FUNCTION_GET_AUTHENTICATION_NONCE = 1
     FUNCTION_AUTHENTICATE = 2
@@ -286,6 +648,17 @@ class IPConnection:
 
     DISCONNECT_PROBE_INTERVAL = 5
 
+    RECEIVE_BUFFER_SIZE = 8192
+
+    # maximum number of outstanding requests per device if pipelining is
+    # enabled. has to be less than 15 (the number of sequence numbers) to
+    # ensure that there is always a free (uid, function_id, sequence_number)
+    # combination for the next request
+    PIPELINE_DEPTH = 8
+
+    # a batch is sent early if it grows beyond this many bytes
+    BATCH_FLUSH_SIZE = 8192
+
     class CallbackContext:
         def __init__(self):
             self.queue = None
@@ -293,20 +666,64 @@ class IPConnection:
             self.packet_dispatch_allowed = False
             self.lock = None
 
-    def __init__(self):
+    class Batch:
+        def __init__(self, ipcon):
+            self.ipcon = ipcon
+
+        def __enter__(self):
+            self.ipcon.begin_batch()
+
+            return self
+
+        def __exit__(self, type, value, traceback):
+            try:
+                self.ipcon.end_batch()
+            except:
+                # don't hide the exception that ended the batch early
+                if type is None:
+                    raise
+
+            return False
+
+    class Pipelined:
+        def __init__(self, ipcon):
+            self.ipcon = ipcon
+
+        def __enter__(self):
+            pipelining_local = self.ipcon.pipelining_local
+            pipelining_local.depth = getattr(pipelining_local, 'depth', 0) + 1
+
+            return self
+
+        def __exit__(self, type, value, traceback):
+            self.ipcon.pipelining_local.depth -= 1
+
+            return False
+
+    def __init__(self, reactor=None):
         """
         Creates an IP Connection object that can be used to enumerate the available
         devices. It is also required for the constructor of Bricks and Bricklets.
+
+        If a *reactor* is given, the IP Connection does not start its own
+        receive, callback and disconnect probe threads, but is driven by the
+        I/O thread and the dispatch threads of the reactor instead. This
+        allows many IP Connections to share a few threads.
         """
 
         self.host = None
         self.port = None
+        self.reactor = reactor
         self.timeout = 2.5
         self.auto_reconnect = True
         self.auto_reconnect_allowed = False
         self.auto_reconnect_pending = False
         self.sequence_number_lock = Lock()
         self.next_sequence_number = 0 # protected by sequence_number_lock
+        self.request_pipelining = False
+        self.pipelining_local = local() # per thread pipelining state
+        self.pending_requests_lock = Lock()
+        self.pending_requests = {} # protected by pending_requests_lock
         self.authentication_lock = Lock() # protects authentication handshake
         self.next_authentication_nonce = 0 # protected by authentication_lock
         self.devices = {}
@@ -315,12 +732,14 @@ class IPConnection:
         self.socket_id = 0 # protected by socket_lock
         self.socket_lock = Lock()
         self.socket_send_lock = Lock()
+        self.batch_local = local() # per thread batch state
         self.receive_flag = False
         self.receive_thread = None
         self.callback = None
         self.disconnect_probe_flag = False
         self.disconnect_probe_queue = None
         self.disconnect_probe_thread = None
+        self.disconnect_probe_timer = None
         self.waiter = Semaphore()
         self.brickd = BrickDaemon("2", self)
 
@@ -480,6 +899,36 @@ class IPConnection:
 
         return self.timeout
 
+    def set_request_pipelining(self, request_pipelining):
+        """
+        Enables or disables request pipelining. If request pipelining is
+        enabled, multiple threads can have requests to the same device
+        outstanding at the same time (up to PIPELINE_DEPTH per device).
+        Otherwise only one request per device is in flight at any time and
+        the other threads wait for it to complete.
+
+        Default value is *False*.
+        """
+
+        self.request_pipelining = bool(request_pipelining)
+
+    def get_request_pipelining(self):
+        """
+        Returns *true* if request pipelining is enabled, *false* otherwise.
+        """
+
+        return self.request_pipelining
+
+    def pipelined(self):
+        """
+        Returns a context manager that enables request pipelining for the
+        requests of the current thread while the context is active, as if
+        set_request_pipelining was enabled for them only. Requests of other
+        threads are not affected.
+        """
+
+        return IPConnection.Pipelined(self)
+
     def enumerate(self):
         """
         Broadcasts an enumerate request. All devices will respond with an
@@ -490,6 +939,24 @@ class IPConnection:
 
         self.send(request)
 
+    def batch(self):
+        """
+        Returns a context manager that collects all packets send by the
+        current thread while the context is active and sends them with a
+        single sendall call when the context is left. This reduces the number
+        of syscalls and TCP segments for bursts of setter calls.
+
+        The packet order is preserved. A getter or a setter with enabled
+        response expected flag sends the collected packets immediately,
+        because it has to wait for its response. Other errors are reported
+        when the collected packets are actually send.
+
+        Batches can be nested, the packets are send when the outermost batch
+        is left.
+        """
+
+        return IPConnection.Batch(self)
+
     def wait(self):
         """
         Stops the current thread until unwait is called.
@@ -519,6 +986,22 @@ class IPConnection:
 
         self.registered_callbacks[id] = callback
 
+    def get_callback_queue_depth(self, device=None):
+        """
+        Returns the number of callbacks that are queued for delivery, either
+        in total or for the given *device* only.
+        """
+
+        callback = self.callback
+
+        if callback is None:
+            return 0
+
+        if device is None:
+            return callback.queue.get_depth()
+
+        return callback.queue.get_depth(device.uid)
+
     def connect_unlocked(self, is_auto_reconnect):
         # NOTE: assumes that socket is None and socket_lock is locked
 
@@ -526,14 +1009,22 @@ class IPConnection:
         if self.callback is None:
             try:
                 self.callback = IPConnection.CallbackContext()
-                self.callback.queue = Queue()
                 self.callback.packet_dispatch_allowed = False
                 self.callback.lock = Lock()
-                self.callback.thread = Thread(name='Callback-Processor',
-                                              target=self.callback_loop,
-                                              args=(self.callback, ))
-                self.callback.thread.daemon = True
-                self.callback.thread.start()
+
+                if self.reactor is None:
+                    self.callback.queue = CallbackQueue(self.devices)
+                    self.callback.thread = Thread(name='Callback-Processor',
+                                                  target=self.callback_loop,
+                                                  args=(self.callback, ))
+                    self.callback.thread.daemon = True
+                    self.callback.thread.start()
+                else:
+                    # the lane acts as queue and as thread
+                    lane = self.reactor.create_lane(functools.partial(self.dispatch_queue_item, self.callback),
+                                                    CallbackQueue(self.devices))
+                    self.callback.queue = lane
+                    self.callback.thread = lane
             except:
                 self.callback = None
                 raise
@@ -562,16 +1053,11 @@ class IPConnection:
 
         # create disconnect probe thread
         try:
-            self.disconnect_probe_flag = True
-            self.disconnect_probe_queue = Queue()
-            self.disconnect_probe_thread = Thread(name='Disconnect-Prober',
-                                                  target=self.disconnect_probe_loop,
-                                                  args=(self.disconnect_probe_queue, ))
-            self.disconnect_probe_thread.daemon = True
-            self.disconnect_probe_thread.start()
+            self.start_disconnect_probe()
         except:
             def cleanup():
                 self.disconnect_probe_thread = None
+                self.disconnect_probe_timer = None
 
                 # close socket
                 self.socket.close()
@@ -594,11 +1080,15 @@ class IPConnection:
 
         try:
             self.receive_flag = True
-            self.receive_thread = Thread(name='Brickd-Receiver',
-                                         target=self.receive_loop,
-                                         args=(self.socket_id, ))
-            self.receive_thread.daemon = True
-            self.receive_thread.start()
+
+            if self.reactor is None:
+                self.receive_thread = Thread(name='Brickd-Receiver',
+                                             target=self.receive_loop,
+                                             args=(self.socket_id, ))
+                self.receive_thread.daemon = True
+                self.receive_thread.start()
+            else:
+                self.reactor.add_connection(self, self.socket, self.socket_id)
         except:
             def cleanup():
                 # close socket
@@ -632,9 +1122,7 @@ class IPConnection:
         # NOTE: assumes that socket is not None and socket_lock is locked
 
         # end disconnect probe thread
-        self.disconnect_probe_queue.put(True)
-        self.disconnect_probe_thread.join() # FIXME: use a timeout?
-        self.disconnect_probe_thread = None
+        self.stop_disconnect_probe()
 
         # stop dispatching packet callbacks before ending the receive
         # thread to avoid timeout exceptions due to callback functions
@@ -656,7 +1144,9 @@ class IPConnection:
         except socket.error:
             pass
 
-        if self.receive_thread is not None:
+        if self.reactor is not None:
+            self.reactor.remove_connection(self.socket)
+        elif self.receive_thread is not None:
             self.receive_thread.join() # FIXME: use a timeout?
             self.receive_thread = None
 
@@ -665,14 +1155,11 @@ class IPConnection:
         self.socket = None
 
     def receive_loop(self, socket_id):
-        if sys.hexversion < 0x03000000:
-            pending_data = ''
-        else:
-            pending_data = bytes()
+        packet_buffer = PacketBuffer(IPConnection.RECEIVE_BUFFER_SIZE)
 
         while self.receive_flag:
             try:
-                data = self.socket.recv(8192)
+                length = self.socket.recv_into(packet_buffer.get_free_view())
             except socket.error:
                 if self.receive_flag:
                     e = sys.exc_info()[1]
@@ -682,27 +1169,19 @@ class IPConnection:
                     self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR, socket_id, False)
                 break
 
-            if len(data) == 0:
+            if length == 0:
                 if self.receive_flag:
                     self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_SHUTDOWN, socket_id, False)
                 break
 
-            pending_data += data
+            packet_buffer.commit(length)
 
             while self.receive_flag:
-                if len(pending_data) < 8:
-                    # Wait for complete header
-                    break
-
-                length = get_length_from_data(pending_data)
+                packet = packet_buffer.next_packet()
 
-                if len(pending_data) < length:
-                    # Wait for complete packet
+                if packet is None:
                     break
 
-                packet = pending_data[0:length]
-                pending_data = pending_data[length:]
-
                 self.handle_response(packet)
 
     def dispatch_meta(self, function_id, parameter, socket_id):
@@ -720,9 +1199,10 @@ class IPConnection:
                     # reconnected in the meantime
                     if self.socket is not None and self.socket_id == socket_id:
                         # end disconnect probe thread
-                        self.disconnect_probe_queue.put(True)
-                        self.disconnect_probe_thread.join() # FIXME: use a timeout?
-                        self.disconnect_probe_thread = None
+                        self.stop_disconnect_probe()
+
+                        if self.reactor is not None:
+                            self.reactor.remove_connection(self.socket)
 
                         # close socket
                         self.socket.close()
@@ -730,8 +1210,11 @@ class IPConnection:
 
             # FIXME: wait a moment here, otherwise the next connect
             # attempt will succeed, even if there is no open server
-            # socket. the first receive will then fail directly
-            time.sleep(0.1)
+            # socket. the first receive will then fail directly. with a
+            # reactor the auto_reconnect_loop waits instead, this is a
+            # shared dispatch thread
+            if self.reactor is None:
+                time.sleep(0.1)
 
             if IPConnection.CALLBACK_DISCONNECTED in self.registered_callbacks and \
                self.registered_callbacks[IPConnection.CALLBACK_DISCONNECTED] is not None:
@@ -740,24 +1223,39 @@ class IPConnection:
             if parameter != IPConnection.DISCONNECT_REASON_REQUEST and \
                self.auto_reconnect and self.auto_reconnect_allowed:
                 self.auto_reconnect_pending = True
-                retry = True
-
-                # block here until reconnect. this is okay, there is no
-                # callback to deliver when there is no connection
-                while retry:
-                    retry = False
-
-                    with self.socket_lock:
-                        if self.auto_reconnect_allowed and self.socket is None:
-                            try:
-                                self.connect_unlocked(True)
-                            except:
-                                retry = True
-                        else:
-                            self.auto_reconnect_pending = False
-
-                    if retry:
+
+                if self.reactor is None:
+                    # block here until reconnect. this is okay, there is no
+                    # callback to deliver when there is no connection
+                    while self.try_auto_reconnect():
                         time.sleep(0.1)
+                else:
+                    # connect blocks until the host answers or the attempt
+                    # times out, don't do that on a shared dispatch thread
+                    thread = Thread(name='Brickd-Reconnector', target=self.auto_reconnect_loop)
+                    thread.daemon = True
+                    thread.start()
+
+    def try_auto_reconnect(self):
+        # returns True if another attempt is necessary
+        with self.socket_lock:
+            if self.auto_reconnect_allowed and self.socket is None:
+                try:
+                    self.connect_unlocked(True)
+                except:
+                    return True
+            else:
+                self.auto_reconnect_pending = False
+
+        return False
+
+    def auto_reconnect_loop(self):
+        # only runs while a reactor driven connection is down
+        while True:
+            time.sleep(0.1)
+
+            if not self.try_auto_reconnect():
+                break
 
     def dispatch_packet(self, packet):
         uid = get_uid_from_data(packet)
@@ -797,22 +1295,61 @@ class IPConnection:
         while True:
             kind, data = callback.queue.get()
 
-            # FIXME: cannot hold callback lock here because this can
-            #        deadlock due to an ordering problem with the socket lock
-            #with callback.lock:
-            if True:
-                if kind == IPConnection.QUEUE_EXIT:
-                    break
-                elif kind == IPConnection.QUEUE_META:
-                    self.dispatch_meta(*data)
-                elif kind == IPConnection.QUEUE_PACKET:
-                    # don't dispatch callbacks when the receive thread isn't running
-                    if callback.packet_dispatch_allowed:
-                        self.dispatch_packet(data)
+            if not self.dispatch_queue_item(callback, (kind, data)):
+                break
+
+    def dispatch_queue_item(self, callback, item):
+        # returns False if the item asks to stop dispatching
+        kind, data = item
+
+        # FIXME: cannot hold callback lock here because this can
+        #        deadlock due to an ordering problem with the socket lock
+        #with callback.lock:
+        if True:
+            if kind == IPConnection.QUEUE_EXIT:
+                return False
+            elif kind == IPConnection.QUEUE_META:
+                self.dispatch_meta(*data)
+            elif kind == IPConnection.QUEUE_PACKET:
+                # don't dispatch callbacks when the receive thread isn't running
+                if callback.packet_dispatch_allowed:
+                    self.dispatch_packet(data)
+
+        return True
+
+    def start_disconnect_probe(self):
+        self.disconnect_probe_flag = True
+
+        if self.reactor is None:
+            self.disconnect_probe_queue = Queue()
+            self.disconnect_probe_thread = Thread(name='Disconnect-Prober',
+                                                  target=self.disconnect_probe_loop,
+                                                  args=(self.disconnect_probe_queue, self.socket_id))
+            self.disconnect_probe_thread.daemon = True
+            self.disconnect_probe_thread.start()
+        else:
+            request, _, _ = self.create_packet_header(None, 8, IPConnection.FUNCTION_DISCONNECT_PROBE)
+            socket_id = self.socket_id
+
+            def probe():
+                if not self.send_disconnect_probe(request, socket_id):
+                    timer.cancel()
+
+            timer = self.reactor.call_periodic(IPConnection.DISCONNECT_PROBE_INTERVAL, probe)
+            self.disconnect_probe_timer = timer
+
+    def stop_disconnect_probe(self):
+        if self.reactor is None:
+            self.disconnect_probe_queue.put(True)
+            self.disconnect_probe_thread.join() # FIXME: use a timeout?
+            self.disconnect_probe_thread = None
+        else:
+            self.disconnect_probe_timer.cancel()
+            self.disconnect_probe_timer = None
 
     # NOTE: the disconnect probe thread is not allowed to hold the socket_lock at any
     #       time because it is created and joined while the socket_lock is locked
-    def disconnect_probe_loop(self, disconnect_probe_queue):
+    def disconnect_probe_loop(self, disconnect_probe_queue, socket_id):
         request, _, _ = self.create_packet_header(None, 8, IPConnection.FUNCTION_DISCONNECT_PROBE)
 
         while True:
@@ -822,66 +1359,80 @@ class IPConnection:
             except Empty:
                 pass
 
-            if self.disconnect_probe_flag:
-                try:
-                    with self.socket_send_lock:
-                        self.socket.send(request)
-                except socket.error:
-                    self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR,
-                                                   self.socket_id, False)
-                    break
-            else:
-                self.disconnect_probe_flag = True
+            if not self.send_disconnect_probe(request, socket_id):
+                break
 
-    def deserialize_data(self, data, form):
-        ret = []
-        for f in form.split(' '):
-            f = '<' + f
-            length = struct.calcsize(f)
-
-            x = struct.unpack(f, data[:length])
-            if len(x) > 1:
-                if 'c' in f:
-                    x = tuple([self.handle_deserialized_char(c) for c in x])
-                ret.append(x)
-            elif 'c' in f:
-                ret.append(self.handle_deserialized_char(x[0]))
-            elif 's' in f:
-                ret.append(self.handle_deserialized_string(x[0]))
-            else:
-                ret.append(x[0])
+    def send_disconnect_probe(self, request, socket_id):
+        # returns False if the connection got lost. a probe timer of the
+        # reactor is not joined on disconnect, so the socket might be gone
+        # or replaced by the time the probe runs
+        if self.disconnect_probe_flag:
+            try:
+                with self.socket_send_lock:
+                    current_socket = self.socket
 
-            data = data[length:]
+                    if current_socket is None or self.socket_id != socket_id:
+                        return False
 
-        if len(ret) == 1:
-            return ret[0]
+                    current_socket.send(request)
+            except socket.error:
+                self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR,
+                                               socket_id, False)
+                return False
         else:
-            return ret
+            self.disconnect_probe_flag = True
+
+        return True
+
+    def deserialize_data(self, data, form):
+        return get_codec(form).unpack(data)
 
-    def handle_deserialized_char(self, c):
-        if sys.hexversion >= 0x03000000:
-            c = c.decode('ascii')
+    def begin_batch(self):
+        if getattr(self.batch_local, 'depth', 0) == 0:
+            self.batch_local.depth = 0
+            self.batch_local.packets = []
+            self.batch_local.size = 0
 
-        return c
+        self.batch_local.depth += 1
 
-    def handle_deserialized_string(self, s):
-        if sys.hexversion >= 0x03000000:
-            s = s.decode('ascii')
+    def end_batch(self):
+        self.batch_local.depth -= 1
 
-        i = s.find(chr(0))
-        if i >= 0:
-            s = s[:i]
+        if self.batch_local.depth == 0:
+            try:
+                self.flush_batch()
+            finally:
+                self.batch_local.packets = None
+
+    def flush_batch(self):
+        packets = getattr(self.batch_local, 'packets', None)
+
+        if packets:
+            self.batch_local.packets = []
+            self.batch_local.size = 0
 
-        return s
+            self.send_unbatched(b''.join(packets))
 
     def send(self, packet):
+        packets = getattr(self.batch_local, 'packets', None)
+
+        if packets is None:
+            self.send_unbatched(packet)
+        else:
+            packets.append(packet)
+            self.batch_local.size += len(packet)
+
+            if self.batch_local.size >= IPConnection.BATCH_FLUSH_SIZE:
+                self.flush_batch()
+
+    def send_unbatched(self, packet):
         with self.socket_lock:
             if self.socket is None:
                 raise Error(Error.NOT_CONNECTED, 'Not connected')
 
             try:
                 with self.socket_send_lock:
-                    self.socket.send(packet)
+                    self.socket.sendall(packet)
             except socket.error:
                 self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR, None, True)
                 raise Error(Error.NOT_CONNECTED, 'Not connected')
@@ -889,87 +1440,59 @@ class IPConnection:
             self.disconnect_probe_flag = False
 
     def send_request(self, device, function_id, data, form, form_ret):
-        length = 8 + struct.calcsize('<' + form)
+        codec = get_codec(form)
         request, response_expected, sequence_number = \
-            self.create_packet_header(device, length, function_id)
-
-        def pack_string(f, d):
-            if sys.hexversion < 0x03000000:
-                if isinstance(d, unicode):
-                    f = f.replace('s', 'B').replace('c', 'B')
-                    l = map(ord, d)
-                    p = f.replace('B', '')
-                    if len(p) == 0:
-                        p = '1'
-                    l += [0] * (int(p) - len(l))
-                    return struct.pack('<' + f, *l)
-                else:
-                    return struct.pack('<' + f, d)
-            else:
-                if isinstance(d, str):
-                    return struct.pack('<' + f, bytes(map(ord, d)))
-                else:
-                    return struct.pack('<' + f, d)
+            self.create_packet_header(device, 8 + codec.size, function_id)
 
-        for f, d in zip(form.split(' '), data):
-            if len(f) > 1 and not 's' in f and not 'c' in f:
-                request += struct.pack('<' + f, *d)
-            elif 's' in f:
-                request += pack_string(f, d)
-            elif 'c' in f:
-                if len(f) > 1:
-                    if int(f.replace('c', '')) != len(d):
-                        raise ValueError('Incorrect char list length')
-                    for k in d:
-                        request += pack_string('c', k)
-                else:
-                    request += pack_string(f, d)
-            else:
-                request += struct.pack('<' + f, d)
+        request += codec.pack(data)
 
         if response_expected:
-            with device.request_lock:
-                device.expected_response_function_id = function_id
-                device.expected_response_sequence_number = sequence_number
+            if self.request_pipelining or getattr(self.pipelining_local, 'depth', 0) > 0:
+                request_lock = device.pipeline_semaphore
+            else:
+                request_lock = device.request_lock
+
+            with request_lock:
+                key, response_queue = self.add_pending_request(device, function_id, sequence_number)
+
+                if key[2] != sequence_number:
+                    # the sequence number is still in use by another pending
+                    # request to the same function, patch in the replacement
+                    sequence_number = key[2]
+                    request = request[0:6] + struct.pack('<B', (sequence_number << 4) | (1 << 3)) + request[7:]
 
                 try:
                     self.send(request)
+                    self.flush_batch()
 
-                    while True:
-                        response = device.response_queue.get(True, self.timeout)
-
-                        if function_id == get_function_id_from_data(response) and \
-                           sequence_number == get_sequence_number_from_data(response):
-                            # ignore old responses that arrived after the timeout expired, but before setting
-                            # expected_response_function_id and expected_response_sequence_number back to None
-                            break
+                    response = response_queue.get(True, self.timeout)
                 except Empty:
                     msg = 'Did not receive response for function {0} in time'.format(function_id)
                     raise Error(Error.TIMEOUT, msg)
                 finally:
-                    device.expected_response_function_id = None
-                    device.expected_response_sequence_number = None
-
-            error_code = get_error_code_from_data(response)
+                    # responses that arrive after this point are ignored
+                    with self.pending_requests_lock:
+                        del self.pending_requests[key]
 
-            if error_code == 0:
-                # no error
-                pass
-            elif error_code == 1:
-                msg = 'Got invalid parameter for function {0}'.format(function_id)
-                raise Error(Error.INVALID_PARAMETER, msg)
-            elif error_code == 2:
-                msg = 'Function {0} is not supported'.format(function_id)
-                raise Error(Error.NOT_SUPPORTED, msg)
-            else:
-                msg = 'Function {0} returned an unknown error'.format(function_id)
-                raise Error(Error.UNKNOWN_ERROR_CODE, msg)
+            check_error_code(response, function_id)
 
             if len(form_ret) > 0:
                 return self.deserialize_data(response[8:], form_ret)
         else:
             self.send(request)
 
+    def add_pending_request(self, device, function_id, sequence_number):
+        with self.pending_requests_lock:
+            key = (device.uid, function_id, sequence_number)
+
+            while key in self.pending_requests:
+                key = (device.uid, function_id, self.get_next_sequence_number())
+
+            response_queue = Queue()
+            self.pending_requests[key] = response_queue
+
+            return key, response_queue
+
     def get_next_sequence_number(self):
         with self.sequence_number_lock:
             sequence_number = self.next_sequence_number + 1
@@ -1000,9 +1523,11 @@ class IPConnection:
                 self.callback.queue.put((IPConnection.QUEUE_PACKET, packet))
             return
 
-        if device.expected_response_function_id == function_id and \
-           device.expected_response_sequence_number == sequence_number:
-            device.response_queue.put(packet)
+        with self.pending_requests_lock:
+            response_queue = self.pending_requests.get((uid, function_id, sequence_number))
+
+        if response_queue is not None:
+            response_queue.put(packet)
             return
 
         # Response seems to be OK, but can't be handled
@@ -1082,3 +1607,343 @@ class IPConnection:
                                     'I')
 
         return base58encode(uid_int)
+
+def create_socket_pair():
+    try:
+        return socket.socketpair()
+    except (AttributeError, socket.error):
+        # fallback for python 2 on Windows
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        try:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)
+
+            sender = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sender.connect(listener.getsockname())
+            receiver, _ = listener.accept()
+        finally:
+            listener.close()
+
+        return receiver, sender
+
+class Reactor:
+    """
+    Drives the receive path and the disconnect probes of any number of IP
+    Connections from a single I/O thread and delivers their callbacks with a
+    shared pool of dispatch threads. The callbacks of one IP Connection are
+    still delivered one at a time and in order.
+
+    Pass the reactor to the IPConnection constructor to use it. Its threads
+    are daemon threads and run for the lifetime of the program.
+    """
+
+    # number of queued items a lane dispatches before it lets other lanes
+    # use its dispatch thread
+    LANE_BURST_LENGTH = 32
+
+    class Timer:
+        def __init__(self, due, interval, function):
+            self.due = due
+            self.interval = interval # None for one-shot timers
+            self.function = function
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    class Lane:
+        """
+        Queue-like object that dispatches its items one at a time and in
+        order on the dispatch threads of the reactor.
+        """
+
+        def __init__(self, reactor, handler, items):
+            self.reactor = reactor
+            self.handler = handler # returns False to stop dispatching
+            self.lock = Lock()
+            self.items = items # deque-like, protected by lock
+            self.scheduled = False # protected by lock
+            self.thread = None # dispatch thread currently running this lane
+            self.stopped = False
+            self.exited = Event()
+
+        def put(self, item):
+            with self.lock:
+                self.items.append(item)
+
+                if self.scheduled:
+                    return
+
+                self.scheduled = True
+
+            self.reactor.submit(self.run)
+
+        def run(self):
+            for i in range(Reactor.LANE_BURST_LENGTH):
+                with self.lock:
+                    if len(self.items) == 0:
+                        self.thread = None
+                        self.scheduled = False
+                        return
+
+                    item = self.items.popleft()
+                    self.thread = current_thread()
+
+                if self.stopped:
+                    continue
+
+                try:
+                    if not self.handler(item):
+                        self.stopped = True
+                        self.exited.set()
+                except:
+                    traceback.print_exc()
+
+            with self.lock:
+                self.thread = None
+
+            self.reactor.submit(self.run)
+
+        def get_depth(self, uid=None):
+            return self.items.get_depth(uid)
+
+        def join(self):
+            # don't wait for the lane to stop from inside of it
+            if self.thread is not current_thread():
+                self.exited.wait()
+
+    class Connection:
+        def __init__(self, ipcon, socket, socket_id):
+            self.ipcon = ipcon
+            self.socket = socket
+            self.socket_id = socket_id
+            self.packet_buffer = PacketBuffer(IPConnection.RECEIVE_BUFFER_SIZE)
+
+    def __init__(self, dispatch_thread_count=4):
+        """
+        Creates a reactor and starts its I/O thread and *dispatch_thread_count*
+        dispatch threads.
+        """
+
+        self.lock = Lock()
+        self.changes = [] # protected by lock
+        self.timers = [] # heap of (due, sequence, timer), protected by lock
+        self.next_timer_sequence = 0 # protected by lock
+        self.connections = {} # socket -> Connection, only used by the I/O thread
+        self.dispatch_queue = Queue()
+        self.wakeup_receiver, self.wakeup_sender = create_socket_pair()
+        self.wakeup_receiver.setblocking(0)
+        self.wakeup_sender.setblocking(0)
+
+        if selectors is not None:
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.wakeup_receiver, selectors.EVENT_READ, None)
+        else:
+            self.selector = None
+
+        self.io_thread = Thread(name='Reactor-IO', target=self.io_loop)
+        self.io_thread.daemon = True
+        self.io_thread.start()
+
+        self.dispatch_threads = []
+
+        for i in range(dispatch_thread_count):
+            thread = Thread(name='Reactor-Dispatcher', target=self.dispatch_loop)
+            thread.daemon = True
+            thread.start()
+
+            self.dispatch_threads.append(thread)
+
+    def create_lane(self, handler, items=None):
+        if items is None:
+            items = deque()
+
+        return Reactor.Lane(self, handler, items)
+
+    def submit(self, function):
+        self.dispatch_queue.put(function)
+
+    def call_later(self, delay, function):
+        """
+        Calls *function* once on a dispatch thread after *delay* seconds.
+        Returns a timer object that can be cancelled.
+        """
+
+        return self.add_timer(Reactor.Timer(time.time() + delay, None, function))
+
+    def call_periodic(self, interval, function):
+        """
+        Calls *function* every *interval* seconds on a dispatch thread until
+        the returned timer object gets cancelled.
+        """
+
+        return self.add_timer(Reactor.Timer(time.time() + interval, interval, function))
+
+    def add_timer(self, timer):
+        with self.lock:
+            heapq.heappush(self.timers, (timer.due, self.next_timer_sequence, timer))
+            self.next_timer_sequence += 1
+            earliest = self.timers[0][2] is timer
+
+        if earliest:
+            self.wakeup()
+
+        return timer
+
+    def add_connection(self, ipcon, socket, socket_id):
+        with self.lock:
+            self.changes.append((Reactor.Connection(ipcon, socket, socket_id), None))
+
+        self.wakeup()
+
+    def remove_connection(self, socket):
+        # no packet of the socket is handled anymore after this returns
+        if current_thread() is self.io_thread:
+            self.unregister(socket)
+        else:
+            removed = Event()
+
+            with self.lock:
+                self.changes.append((socket, removed))
+
+            self.wakeup()
+            removed.wait()
+
+    def wakeup(self):
+        try:
+            self.wakeup_sender.send(b'\0')
+        except socket.error:
+            pass # wakeup already pending
+
+    def register(self, connection):
+        self.connections[connection.socket] = connection
+
+        if self.selector is not None:
+            self.selector.register(connection.socket, selectors.EVENT_READ, connection)
+
+    def unregister(self, socket):
+        connection = self.connections.pop(socket, None)
+
+        if connection is not None and self.selector is not None:
+            self.selector.unregister(socket)
+
+    def io_loop(self):
+        while True:
+            with self.lock:
+                changes = self.changes
+                self.changes = []
+
+            for change, removed in changes:
+                if removed is None:
+                    self.register(change)
+                else:
+                    self.unregister(change)
+                    removed.set()
+
+            timeout = self.run_due_timers()
+
+            try:
+                if self.selector is not None:
+                    ready = [key.data for key, _ in self.selector.select(timeout)]
+                else:
+                    sockets = [self.wakeup_receiver] + list(self.connections.keys())
+                    ready = [self.connections.get(s) for s in select.select(sockets, [], [], timeout)[0]]
+            except (select.error, socket.error):
+                e = sys.exc_info()[1]
+
+                if getattr(e, 'errno', e.args[0]) == errno.EINTR:
+                    continue
+
+                raise
+
+            for connection in ready:
+                if connection is None:
+                    self.drain_wakeup()
+                else:
+                    self.receive(connection)
+
+    def drain_wakeup(self):
+        try:
+            while len(self.wakeup_receiver.recv(1024)) > 0:
+                pass
+        except socket.error:
+            pass
+
+    def run_due_timers(self):
+        # returns the time until the next timer is due, or None
+        now = time.time()
+        due_timers = []
+
+        with self.lock:
+            while len(self.timers) > 0 and self.timers[0][0] <= now:
+                _, _, timer = heapq.heappop(self.timers)
+
+                if timer.cancelled:
+                    continue
+
+                due_timers.append(timer)
+
+                if timer.interval is not None:
+                    timer.due = max(timer.due + timer.interval, now)
+                    heapq.heappush(self.timers, (timer.due, self.next_timer_sequence, timer))
+                    self.next_timer_sequence += 1
+
+            if len(self.timers) > 0:
+                timeout = max(self.timers[0][0] - now, 0)
+            else:
+                timeout = None
+
+        for timer in due_timers:
+            self.submit(functools.partial(self.run_timer, timer))
+
+        return timeout
+
+    def run_timer(self, timer):
+        if not timer.cancelled:
+            timer.function()
+
+    def receive(self, connection):
+        ipcon = connection.ipcon
+
+        try:
+            length = connection.socket.recv_into(connection.packet_buffer.get_free_view())
+        except socket.error:
+            e = sys.exc_info()[1]
+
+            if e.errno in [errno.EINTR, errno.EAGAIN, errno.EWOULDBLOCK]:
+                return
+
+            self.unregister(connection.socket)
+
+            if ipcon.receive_flag:
+                ipcon.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR, connection.socket_id, False)
+
+            return
+
+        if length == 0:
+            self.unregister(connection.socket)
+
+            if ipcon.receive_flag:
+                ipcon.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_SHUTDOWN, connection.socket_id, False)
+
+            return
+
+        connection.packet_buffer.commit(length)
+
+        while ipcon.receive_flag:
+            packet = connection.packet_buffer.next_packet()
+
+            if packet is None:
+                break
+
+            ipcon.handle_response(packet)
+
+    def dispatch_loop(self):
+        while True:
+            function = self.dispatch_queue.get()
+
+            try:
+                function()
+            except:
+                traceback.print_exc()
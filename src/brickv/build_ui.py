@@ -9,3 +9,4 @@ def system(command):
 system("pyuic4 -o ui_mainwindow.py ui/mainwindow.ui")
 system("pyuic4 -o ui_flashing.py ui/flashing.ui")
 system("pyuic4 -o ui_advanced.py ui/advanced.ui")
+system("pyuic4 -o ui_recording_viewer.py ui/recording_viewer.ui")
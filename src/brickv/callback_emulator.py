@@ -3,7 +3,7 @@
 brickv (Brick Viewer)
 Copyright (C) 2015 Matthias Bolte <matthias@tinkerforge.com>
 
-callback_emulator.py: Emulate callback using getters and threads
+callback_emulator.py: Emulate callback using getters and a shared scheduler
 
 This program is free software; you can redistribute it and/or
 modify it under the terms of the GNU General Public License
@@ -22,22 +22,56 @@ Boston, MA 02111-1307, USA.
 """
 
 from PyQt4.QtCore import QObject, pyqtSignal
-import threading
+import sys
+from brickv.bindings import ip_connection
+from brickv.async_call import async_call
+from brickv.callback_scheduler import callback_scheduler, monotonic
 
 class CallbackEmulator(QObject):
     qtcb_data = pyqtSignal(object)
     qtcb_error = pyqtSignal()
 
+    # the error backoff doubles on every consecutive error up to this
+    MAX_ERROR_BACKOFF = 5.0 # seconds
+
+    # use the device callback matching the getter instead of polling, if the
+    # device has one. the getter is still called every NATIVE_REFRESH_INTERVAL
+    # to refresh the value and the callback period, e.g. after a device reset
+    USE_NATIVE_CALLBACKS = True
+    NATIVE_REFRESH_INTERVAL = 5.0 # seconds
+
+    # adaptive polling: while the plugin is not on screen the period is at
+    # least HIDDEN_PERIOD. after IDLE_UPDATE_COUNT unchanged values in a row
+    # the period is doubled, up to MAX_IDLE_PERIOD. a changed value or
+    # wake() restores the requested period
+    HIDDEN_PERIOD = 2000 # milliseconds
+    IDLE_UPDATE_COUNT = 10
+    MAX_IDLE_PERIOD = 1000 # milliseconds
+
     def __init__(self, data_getter, data_callback, error_callback, use_data_signal=True):
         QObject.__init__(self)
 
         self.period = 0 # milliseconds
-        self.timer = None
+        self.due = None # protected by callback_scheduler.condition
+        self.generation = 0 # protected by callback_scheduler.condition
+        self.updating = False # protected by callback_scheduler.condition
         self.data_getter = data_getter
         self.use_data_signal = use_data_signal
         self.data_callback = data_callback
         self.error_callback = error_callback
         self.last_data = None
+        self.error_backoff = 0
+        self.last_update_time = None
+        self.update_interval = None # seconds, moving average
+        self.lateness = 0.0 # seconds, moving average
+        self.native_callback = None
+        self.native_active = False
+        self.on_screen = True
+        self.idle_level = 0 # the period is doubled per level
+        self.unchanged_count = 0
+
+        if CallbackEmulator.USE_NATIVE_CALLBACKS:
+            self.native_callback = self.find_native_callback()
 
         if self.use_data_signal:
             self.qtcb_data.connect(self.data_callback)
@@ -45,41 +79,240 @@ class CallbackEmulator(QObject):
         if error_callback != None:
             self.qtcb_error.connect(self.error_callback)
 
+    def find_native_callback(self):
+        # a getter get_<name> of a device that has a <name> callback with the
+        # same values and a set_<name>_callback_period function
+        device = getattr(self.data_getter, '__self__', None)
+        name = getattr(self.data_getter, '__name__', '')
+
+        if not isinstance(device, ip_connection.Device) or not name.startswith('get_'):
+            return None
+
+        name = name[4:]
+        callback_id = getattr(device, 'CALLBACK_' + name.upper(), None)
+        period_setter = getattr(device, 'set_{0}_callback_period'.format(name), None)
+
+        if callback_id == None or period_setter == None:
+            return None
+
+        form = device.callback_formats.get(callback_id, '')
+        count = len(form.split(' '))
+
+        if len(form) == 1:
+            result_type = None # the callback gets the single value
+        elif count > 1:
+            # the callback gets the values that the getter returns as named tuple
+            module = sys.modules[device.__class__.__module__]
+            result_type = getattr(module, 'Get' + ''.join([part.capitalize() for part in name.split('_')]), None)
+
+            if result_type == None or len(result_type._fields) != count:
+                return None
+        else:
+            return None
+
+        return device, callback_id, period_setter, result_type
+
+    def set_native_period(self, period):
+        device, callback_id, period_setter, _ = self.native_callback
+
+        if period > 0:
+            device.register_callback(callback_id, self.native_callback_handler)
+            device.set_callback_coalescing(callback_id, True)
+        else:
+            device.register_callback(callback_id, None)
+
+        self.native_active = period > 0
+
+        # the setter waits for the response, so it must not be called on the
+        # main thread. if enabling the callback fails then fall back to polling
+        def report_error():
+            if period > 0 and self.native_active and self.get_effective_period() == period:
+                device.register_callback(callback_id, None)
+                self.native_active = False
+                self.schedule()
+
+        async_call(period_setter, period, None, report_error)
+
     def set_period(self, period):
         self.period = period
+        self.apply_period()
+
+    def apply_period(self):
+        period = self.get_effective_period()
+
+        if self.native_callback != None:
+            if self.native_active or period > 0:
+                self.set_native_period(period)
+
+        self.schedule()
 
-        if self.period > 0 and self.timer == None:
-            self.timer = threading.Timer(self.period / 1000.0, self.update)
-            self.timer.start()
+    def schedule(self):
+        period = self.get_effective_period()
 
-    def update(self):
-        self.timer = None
+        if period > 0:
+            due = monotonic() + period / 1000.0
+
+            with callback_scheduler.condition:
+                # don't let a long old period delay the new one
+                if self.due == None or self.due > due:
+                    callback_scheduler.schedule(self, due)
+        else:
+            callback_scheduler.unschedule(self)
+
+    def get_effective_period(self):
+        """
+        Returns the period in milliseconds that is actually used, according
+        to the adaptive polling state.
+        """
 
         if self.period < 1:
-            # period was set to 0 in the meantime, ignore update
+            return 0
+
+        period = self.period
+
+        if self.idle_level > 0:
+            period = max(min(period * (1 << self.idle_level), CallbackEmulator.MAX_IDLE_PERIOD), period)
+
+        if not self.on_screen:
+            period = max(period, CallbackEmulator.HIDDEN_PERIOD)
+
+        return period
+
+    def set_on_screen(self, on_screen):
+        if self.on_screen == on_screen:
             return
 
+        self.on_screen = on_screen
+
+        if on_screen:
+            self.wake()
+        elif self.period > 0:
+            self.apply_period()
+
+    def wake(self):
+        # restore the requested period, e.g. if the plugin got focus
+        self.idle_level = 0
+        self.unchanged_count = 0
+
+        if self.period > 0:
+            self.apply_period()
+
+    def get_achieved_rate(self):
+        """
+        Returns the achieved number of getter calls or device callbacks per
+        second, as moving average. This is lower than 1000 / period if
+        polling falls behind. Device callbacks are only send on change.
+        """
+
+        if self.update_interval == None or self.update_interval <= 0:
+            return 0.0
+
+        return 1.0 / self.update_interval
+
+    def get_lateness(self):
+        """
+        Returns the average time in milliseconds that the getter calls were
+        done after they were due.
+        """
+
+        return self.lateness * 1000.0
+
+    def update(self, due):
+        # returns the due time of the next update or None
+        if self.period < 1:
+            # period was set to 0 in the meantime, ignore update
+            return None
+
+        now = monotonic()
+        native_active = self.native_active
+
+        if not native_active:
+            self.lateness += (max(now - due, 0.0) - self.lateness) * 0.1
+            self.update_rate_statistic(now)
+
         try:
             data = self.data_getter()
+
+            if native_active:
+                # refresh the period, the device might have been reset
+                _, _, period_setter, _ = self.native_callback
+                period_setter(self.get_effective_period())
         except:
             self.qtcb_error.emit()
 
-            # an error occurred, retry in 5 seconds if period was not set
-            # to 0 in the meantime
+            # an error occurred, retry with exponential backoff if period was
+            # not set to 0 in the meantime
+            period = self.get_effective_period() / 1000.0
+            self.error_backoff = min(max(self.error_backoff * 2, period), CallbackEmulator.MAX_ERROR_BACKOFF)
+
             if self.period > 0:
-                self.timer = threading.Timer(5, self.update)
-                self.timer.start()
+                return monotonic() + self.error_backoff
+
+            return None
+
+        self.error_backoff = 0
+        self.deliver(data)
+
+        if self.period > 0 and native_active:
+            return monotonic() + CallbackEmulator.NATIVE_REFRESH_INTERVAL
 
+        if self.period > 0:
+            # schedule relative to the due time to avoid drift. if the getter
+            # took longer than a period then skip the missed updates
+            period = self.get_effective_period() / 1000.0
+            due += period
+            now = monotonic()
+
+            if due < now:
+                due += ((now - due) // period + 1) * period
+
+            return due
+
+        return None
+
+    def native_callback_handler(self, *values):
+        if not self.native_active:
             return
 
-        if self.last_data != data:
+        _, _, _, result_type = self.native_callback
+
+        if result_type == None:
+            data = values[0]
+        else:
+            data = result_type(*values)
+
+        self.update_rate_statistic(monotonic())
+        self.deliver(data)
+
+    def update_rate_statistic(self, now):
+        if self.last_update_time != None:
+            interval = now - self.last_update_time
+
+            if self.update_interval == None:
+                self.update_interval = interval
+            else:
+                self.update_interval += (interval - self.update_interval) * 0.1
+
+        self.last_update_time = now
+
+    def deliver(self, data):
+        if self.last_data == data:
+            # device callbacks are only send on change, no need to back off
+            if self.native_active:
+                return
+
+            self.unchanged_count += 1
+
+            if self.unchanged_count >= CallbackEmulator.IDLE_UPDATE_COUNT and \
+               self.period * (1 << self.idle_level) < CallbackEmulator.MAX_IDLE_PERIOD:
+                self.idle_level += 1
+                self.unchanged_count = 0
+        else:
+            self.idle_level = 0
+            self.unchanged_count = 0
             self.last_data = data
 
             if self.use_data_signal:
                 self.qtcb_data.emit(data)
             else:
                 self.data_callback(data)
-
-        if self.period > 0:
-            self.timer = threading.Timer(self.period / 1000.0, self.update)
-            self.timer.start()
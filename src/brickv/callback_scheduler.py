@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+callback_scheduler.py: Shared scheduler for periodic getter calls
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+from threading import Thread, Condition
+import heapq
+import time
+
+try:
+    from queue import Queue
+except:
+    from Queue import Queue # Python 2 fallback
+
+# time.monotonic is not available in Python 2
+monotonic = getattr(time, 'monotonic', time.time)
+
+class CallbackScheduler(object):
+    """
+    Shared by all CallbackEmulators, and by the channels of the headless
+    logger. One thread keeps a heap of due updates and hands them to a few
+    worker threads that call the getters.
+
+    A scheduled object has the attributes due, generation and updating, all
+    protected by condition, and an update(due) method that returns when it
+    is due next, or None to stop.
+    """
+
+    WORKER_COUNT = 8
+
+    def __init__(self):
+        self.condition = Condition()
+        self.heap = [] # (due, sequence number, emulator, generation), protected by condition
+        self.next_sequence_number = 0 # protected by condition
+        self.update_queue = Queue()
+        self.threads = []
+
+    def schedule(self, emulator, due):
+        with self.condition:
+            if len(self.threads) == 0:
+                self.start_threads()
+
+            emulator.generation += 1
+            emulator.due = due
+
+            self.next_sequence_number += 1
+            heapq.heappush(self.heap, (due, self.next_sequence_number, emulator, emulator.generation))
+
+            if self.heap[0][2] is emulator:
+                self.condition.notify()
+
+    def unschedule(self, emulator):
+        with self.condition:
+            # the heap entry is skipped when it becomes due
+            emulator.generation += 1
+            emulator.due = None
+
+    def start_threads(self):
+        # must be called with condition locked
+        thread = Thread(name='Callback-Scheduler', target=self.schedule_loop)
+        thread.daemon = True
+        thread.start()
+
+        self.threads.append(thread)
+
+        for i in range(CallbackScheduler.WORKER_COUNT):
+            thread = Thread(name='Callback-Worker', target=self.update_loop)
+            thread.daemon = True
+            thread.start()
+
+            self.threads.append(thread)
+
+    def schedule_loop(self):
+        while True:
+            with self.condition:
+                while len(self.heap) == 0:
+                    self.condition.wait()
+
+                due, _, emulator, generation = self.heap[0]
+                now = monotonic()
+
+                if due > now:
+                    self.condition.wait(due - now)
+                    continue
+
+                heapq.heappop(self.heap)
+
+                if generation != emulator.generation:
+                    continue # rescheduled or stopped in the meantime
+
+                emulator.due = None
+
+                if emulator.updating:
+                    continue # the active update schedules the next one
+
+                emulator.updating = True
+
+            self.update_queue.put((emulator, due))
+
+    def update_loop(self):
+        while True:
+            emulator, due = self.update_queue.get()
+            next_due = None
+
+            try:
+                next_due = emulator.update(due)
+            finally:
+                with self.condition:
+                    emulator.updating = False
+
+                    # set_period might have scheduled an update meanwhile
+                    if next_due != None and emulator.due == None:
+                        self.schedule(emulator, next_due)
+
+callback_scheduler = CallbackScheduler()
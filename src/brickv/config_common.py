@@ -31,6 +31,10 @@ BRICKV_VERSION = '2.2.7'
 
 HOST_INFO_COUNT = 10
 
+# seconds a plugin can stay stopped in a background tab before its widgets are
+# torn down again, until the tab is shown next time. 0 keeps all plugins built
+PLUGIN_IDLE_TIMEOUT = 0
+
 DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 4223
 
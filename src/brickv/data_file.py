@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+data_file.py: Columnar binary format for recorded data
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# File layout, all numbers are little endian:
+#
+#   magic            8 bytes, 'BVDATA' + version
+#   records          channel and block records in write order
+#   footer           optional, written on close
+#   trailer          optional, footer offset and end magic
+#
+# Every record starts with a tag, a channel number and a count:
+#
+#   'CHAN'           count bytes: source and curve name of the channel
+#   'BLCK'           count timestamps (float64, seconds since the epoch),
+#                    count values (float64) and one SEGMENT summary (t min,
+#                    t max, v min, v max, v sum as float64) per SEGMENT_SIZE
+#                    samples
+#   'FOOT'           count is the number of block index entries, the channel
+#                    field is the number of channels. followed by all channel
+#                    names and one BLOCK_INDEX entry per block
+#
+# The footer lets the reader find all blocks and their time and value range
+# without touching the data. The segment summaries let it downsample a block
+# that spans several buckets without reading all of its samples. A file
+# without footer (e.g. after a crash) is still readable by scanning the
+# records.
+
+import os
+import sys
+import math
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+MAGIC = b'BVDATA\x00\x01'
+TRAILER_MAGIC = b'BVDATEND'
+
+TAG_CHANNEL = b'CHAN'
+TAG_BLOCK = b'BLCK'
+TAG_FOOTER = b'FOOT'
+
+RECORD = struct.Struct('<4sII') # tag, channel, count
+BLOCK_INDEX = struct.Struct('<IIQddddd') # channel, count, data offset, t min, t max, v min, v max, v sum
+TRAILER = struct.Struct('<Q8s') # footer offset, trailer magic
+TEXT_LENGTH = struct.Struct('<H')
+
+SEGMENT = struct.Struct('<ddddd') # t min, t max, v min, v max, v sum
+
+BLOCK_SIZE = 1024 # samples
+SEGMENT_SIZE = 64 # samples
+
+def doubles_to_bytes(values):
+    if sys.byteorder != 'little':
+        values = array('d', values)
+        values.byteswap()
+
+    if hasattr(values, 'tobytes'):
+        return values.tobytes()
+    else:
+        return values.tostring() # Python 2 fallback
+
+def bytes_to_doubles(data):
+    values = array('d')
+
+    if hasattr(values, 'frombytes'):
+        values.frombytes(data)
+    else:
+        values.fromstring(data) # Python 2 fallback
+
+    if sys.byteorder != 'little':
+        values.byteswap()
+
+    return values
+
+def get_block_length(count): # bytes
+    return count * 16 + (count + SEGMENT_SIZE - 1) // SEGMENT_SIZE * SEGMENT.size
+
+# plot titles are byte strings on Python 2, some of them latin-1 encoded
+def to_text(text):
+    if isinstance(text, bytes):
+        try:
+            return text.decode('utf-8')
+        except UnicodeDecodeError:
+            return text.decode('latin-1')
+
+    return text
+
+def pack_text(text):
+    data = to_text(text).encode('utf-8')
+
+    return TEXT_LENGTH.pack(len(data)) + data
+
+def unpack_text(data, offset):
+    length = TEXT_LENGTH.unpack_from(data, offset)[0]
+    offset += TEXT_LENGTH.size
+
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+class DataFileWriter(object):
+    """
+    Collects the samples of each channel into blocks of up to BLOCK_SIZE
+    samples. A block is written as a timestamp column followed by a value
+    column, and its time and value range goes into the block index. The
+    timestamps of a channel have to be non-decreasing.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.channels = {} # (source, curve) -> channel number
+        self.buffers = [] # per channel (timestamps, values)
+        self.index = [] # per block BLOCK_INDEX fields
+        self.channel_names = [] # per channel (source, curve)
+
+        self.f.write(MAGIC)
+
+    def tell(self):
+        return self.f.tell()
+
+    def fileno(self):
+        return self.f.fileno()
+
+    # samples is a list of (source, curve, timestamp, value)
+    def write_samples(self, samples):
+        for source, curve, timestamp, value in samples:
+            channel = self.channels.get((source, curve))
+
+            if channel == None:
+                channel = self.add_channel(source, curve)
+
+            timestamps, values = self.buffers[channel]
+
+            timestamps.append(timestamp)
+            values.append(value)
+
+            if len(timestamps) >= BLOCK_SIZE:
+                self.write_block(channel)
+
+    # writes all partial blocks, so slow channels reach the disk with every
+    # fsync of the DataRecorder as well
+    def flush(self):
+        for channel in range(len(self.buffers)):
+            self.write_block(channel)
+
+        self.f.flush()
+
+    def close(self):
+        for channel in range(len(self.buffers)):
+            self.write_block(channel)
+
+        footer_offset = self.f.tell()
+
+        self.f.write(RECORD.pack(TAG_FOOTER, len(self.channel_names), len(self.index)))
+
+        for source, curve in self.channel_names:
+            self.f.write(pack_text(source) + pack_text(curve))
+
+        for entry in self.index:
+            self.f.write(BLOCK_INDEX.pack(*entry))
+
+        self.f.write(TRAILER.pack(footer_offset, TRAILER_MAGIC))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+
+    # internal
+    def add_channel(self, source, curve):
+        channel = len(self.channel_names)
+        names = pack_text(source) + pack_text(curve)
+
+        self.f.write(RECORD.pack(TAG_CHANNEL, channel, len(names)) + names)
+
+        self.channels[(source, curve)] = channel
+        self.channel_names.append((source, curve))
+        self.buffers.append((array('d'), array('d')))
+
+        return channel
+
+    # internal
+    def write_block(self, channel):
+        timestamps, values = self.buffers[channel]
+        count = len(timestamps)
+
+        if count == 0:
+            return
+
+        self.f.write(RECORD.pack(TAG_BLOCK, channel, count))
+
+        offset = self.f.tell()
+        segments = array('d')
+
+        for first in range(0, count, SEGMENT_SIZE):
+            segment_values = values[first:first + SEGMENT_SIZE]
+
+            segments.extend([timestamps[first], timestamps[min(first + SEGMENT_SIZE, count) - 1],
+                             min(segment_values), max(segment_values), sum(segment_values)])
+
+        self.f.write(doubles_to_bytes(timestamps) + doubles_to_bytes(values) + doubles_to_bytes(segments))
+        self.index.append((channel, count, offset, timestamps[0], timestamps[-1],
+                           min(values), max(values), sum(values)))
+
+        self.buffers[channel] = (array('d'), array('d'))
+
+class DataFileReader(object):
+    """
+    Memory-maps one or more data files and answers time range and
+    downsampling queries for their channels. Channels with the same source
+    and curve name are merged over all files. Only the block index is read
+    up front; the data of a block is read when a query needs it.
+    """
+
+    def __init__(self, paths):
+        self.files = [] # (file, mmap)
+        self.channels = [] # per channel (source, curve)
+        self.channel_numbers = {} # (source, curve) -> channel number
+        self.blocks = [] # per channel sorted list of (t min, t max, v min, v max, v sum, count, mmap, data offset)
+        self.blocks_start = [] # per channel block t min, for bisect
+        self.blocks_end = [] # per channel running maximum of the block t max, for bisect
+
+        try:
+            for path in paths:
+                self.open_file(path)
+        except:
+            self.close()
+            raise
+
+        for c, blocks in enumerate(self.blocks):
+            blocks.sort(key=lambda block: block[0])
+
+            t_end = None
+
+            for block in blocks:
+                if t_end == None or block[1] > t_end:
+                    t_end = block[1]
+
+                self.blocks_start[c].append(block[0])
+                self.blocks_end[c].append(t_end)
+
+    def close(self):
+        for f, mm in self.files:
+            mm.close()
+            f.close()
+
+        self.files = []
+
+    def get_channels(self):
+        return list(self.channels)
+
+    def get_channel(self, source, curve):
+        return self.channel_numbers.get((source, curve))
+
+    def get_sample_count(self, channel):
+        return sum([block[5] for block in self.blocks[channel]])
+
+    # returns (t min, t max) of a channel or of all channels, None if empty
+    def get_time_range(self, channel=None):
+        if channel == None:
+            channels = range(len(self.channels))
+        else:
+            channels = [channel]
+
+        t_min = None
+        t_max = None
+
+        for c in channels:
+            if len(self.blocks[c]) == 0:
+                continue
+
+            if t_min == None or self.blocks[c][0][0] < t_min:
+                t_min = self.blocks[c][0][0]
+
+            if t_max == None or self.blocks_end[c][-1] > t_max:
+                t_max = self.blocks_end[c][-1]
+
+        if t_min == None:
+            return None
+
+        return t_min, t_max
+
+    # returns (v min, v max) of a channel, None if empty
+    def get_value_range(self, channel):
+        blocks = self.blocks[channel]
+
+        if len(blocks) == 0:
+            return None
+
+        return min([block[2] for block in blocks]), max([block[3] for block in blocks])
+
+    # returns the (timestamps, values) arrays of a channel in [t_start, t_end]
+    def get_samples(self, channel, t_start, t_end):
+        all_timestamps = array('d')
+        all_values = array('d')
+
+        for block in self.get_blocks(channel, t_start, t_end):
+            timestamps, values = self.read_block(block)
+            first = bisect_left(timestamps, t_start)
+            last = bisect_right(timestamps, t_end)
+
+            all_timestamps.extend(timestamps[first:last])
+            all_values.extend(values[first:last])
+
+        return all_timestamps, all_values
+
+    # returns at most about max_buckets (t center, v min, v max, v mean)
+    # tuples covering [t_start, t_end]. buckets are aligned to multiples of
+    # their length, so panning does not change the downsampling. blocks and
+    # segments are taken from their summary if they fall into one bucket or
+    # are shorter than a quarter bucket, which moves their samples by less
+    # than that into the bucket they start in. only the remaining segments
+    # are read sample by sample
+    def get_buckets(self, channel, t_start, t_end, max_buckets):
+        if t_end <= t_start:
+            return []
+
+        bucket_length = float(t_end - t_start) / max(max_buckets, 1)
+        buckets = {} # bucket number -> [v min, v max, v sum, count]
+
+        for block in self.get_blocks(channel, t_start, t_end):
+            block_t_min, block_t_max, v_min, v_max, v_sum, count = block[:6]
+            first_i = int(math.floor(block_t_min / bucket_length))
+            last_i = int(math.floor(block_t_max / bucket_length))
+
+            if (first_i == last_i or block_t_max - block_t_min < bucket_length / 4) and \
+               block_t_min >= t_start and block_t_max <= t_end:
+                self.add_to_bucket(buckets, first_i, v_min, v_max, v_sum, count)
+                continue
+
+            segments = self.read_segments(block)
+            segments_t_min = segments[0::5]
+            segments_t_max = segments[1::5]
+            segment_count = len(segments_t_min)
+            timestamps = None
+            s = bisect_left(segments_t_max, t_start)
+
+            # one step per bucket, all segments that start in the bucket are
+            # merged at once. a long segment that crosses the border of the
+            # bucket or of the time range is read sample by sample
+            while s < segment_count and segments_t_min[s] <= t_end:
+                i = int(math.floor(segments_t_min[s] / bucket_length))
+                bucket_end = (i + 1) * bucket_length
+
+                if segments_t_min[s] >= t_start:
+                    e = min(bisect_left(segments_t_min, bucket_end, s),
+                            bisect_right(segments_t_max, t_end, s))
+
+                    if e > s and segments_t_max[e - 1] >= bucket_end and \
+                       segments_t_max[e - 1] - segments_t_min[e - 1] >= bucket_length / 4:
+                        e -= 1
+                else:
+                    e = s
+
+                if e > s:
+                    self.add_to_bucket(buckets, i, min(segments[s * 5 + 2:e * 5:5]), max(segments[s * 5 + 3:e * 5:5]),
+                                       sum(segments[s * 5 + 4:e * 5:5]), min(e * SEGMENT_SIZE, count) - s * SEGMENT_SIZE)
+
+                    s = e
+                    continue
+
+                if timestamps == None:
+                    timestamps, values = self.read_block(block)
+
+                self.add_samples(buckets, bucket_length, timestamps, values, t_start, t_end,
+                                 s * SEGMENT_SIZE, min((s + 1) * SEGMENT_SIZE, count))
+
+                s += 1
+
+        result = []
+
+        for i in sorted(buckets.keys()):
+            v_min, v_max, v_sum, count = buckets[i]
+
+            result.append(((i + 0.5) * bucket_length, v_min, v_max, v_sum / count))
+
+        return result
+
+    # internal
+    def add_samples(self, buckets, bucket_length, timestamps, values, t_start, t_end, first, last):
+        first = bisect_left(timestamps, t_start, first, last)
+        last = bisect_right(timestamps, t_end, first, last)
+
+        while first < last:
+            i = int(math.floor(timestamps[first] / bucket_length))
+            end = max(bisect_left(timestamps, (i + 1) * bucket_length, first, last), first + 1)
+            chunk = values[first:end]
+
+            self.add_to_bucket(buckets, i, min(chunk), max(chunk), sum(chunk), len(chunk))
+
+            first = end
+
+    # internal
+    def add_to_bucket(self, buckets, i, v_min, v_max, v_sum, count):
+        bucket = buckets.get(i)
+
+        if bucket == None:
+            buckets[i] = [v_min, v_max, v_sum, count]
+        else:
+            bucket[0] = min(bucket[0], v_min)
+            bucket[1] = max(bucket[1], v_max)
+            bucket[2] += v_sum
+            bucket[3] += count
+
+    # internal
+    def get_blocks(self, channel, t_start, t_end):
+        first = bisect_left(self.blocks_end[channel], t_start)
+        last = bisect_right(self.blocks_start[channel], t_end)
+
+        return self.blocks[channel][first:last]
+
+    # internal
+    def read_block(self, block):
+        count, mm, offset = block[5:]
+        data = mm[offset:offset + count * 16]
+
+        return bytes_to_doubles(data[:count * 8]), bytes_to_doubles(data[count * 8:])
+
+    # internal
+    def read_segments(self, block):
+        count, mm, offset = block[5:]
+
+        return bytes_to_doubles(mm[offset + count * 16:offset + get_block_length(count)])
+
+    # internal
+    def add_channel(self, source, curve):
+        channel = self.channel_numbers.get((source, curve))
+
+        if channel == None:
+            channel = len(self.channels)
+
+            self.channels.append((source, curve))
+            self.channel_numbers[(source, curve)] = channel
+            self.blocks.append([])
+            self.blocks_start.append([])
+            self.blocks_end.append([])
+
+        return channel
+
+    # internal
+    def open_file(self, path):
+        f = open(path, 'rb')
+        size = os.fstat(f.fileno()).st_size
+
+        if size < len(MAGIC):
+            f.close()
+            raise IOError('{0} is not a Brick Viewer data file'.format(path))
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.files.append((f, mm))
+
+        if mm[:len(MAGIC)] != MAGIC:
+            raise IOError('{0} is not a Brick Viewer data file'.format(path))
+
+        if size >= len(MAGIC) + RECORD.size + TRAILER.size:
+            footer_offset, trailer_magic = TRAILER.unpack_from(mm, size - TRAILER.size)
+        else:
+            trailer_magic = None
+
+        try:
+            if trailer_magic == TRAILER_MAGIC:
+                self.read_footer(mm, footer_offset)
+            else:
+                self.scan_records(mm, size)
+        except (struct.error, UnicodeDecodeError, IndexError):
+            raise IOError('{0} is damaged'.format(path))
+
+    # internal
+    def read_footer(self, mm, offset):
+        tag, channel_count, block_count = RECORD.unpack_from(mm, offset)
+        offset += RECORD.size
+        channels = []
+
+        for i in range(channel_count):
+            source, offset = unpack_text(mm, offset)
+            curve, offset = unpack_text(mm, offset)
+
+            channels.append(self.add_channel(source, curve))
+
+        for i in range(block_count):
+            channel, count, data_offset, t_min, t_max, v_min, v_max, v_sum = BLOCK_INDEX.unpack_from(mm, offset)
+            offset += BLOCK_INDEX.size
+
+            self.blocks[channels[channel]].append((t_min, t_max, v_min, v_max, v_sum, count, mm, data_offset))
+
+    # internal, reads the block index from the records of an unclosed file,
+    # a truncated last record is ignored
+    def scan_records(self, mm, size):
+        offset = len(MAGIC)
+        channels = {} # channel number in this file -> channel number
+
+        while offset + RECORD.size <= size:
+            tag, channel, count = RECORD.unpack_from(mm, offset)
+            offset += RECORD.size
+
+            if tag == TAG_CHANNEL:
+                if offset + count > size:
+                    break
+
+                source, text_offset = unpack_text(mm, offset)
+                curve, text_offset = unpack_text(mm, text_offset)
+
+                channels[channel] = self.add_channel(source, curve)
+                offset += count
+            elif tag == TAG_BLOCK:
+                if offset + get_block_length(count) > size or channel not in channels:
+                    break
+
+                segments = self.read_segments((None, None, None, None, None, count, mm, offset))
+
+                self.blocks[channels[channel]].append((segments[0], segments[-4], min(segments[2::5]),
+                                                       max(segments[3::5]), sum(segments[4::5]),
+                                                       count, mm, offset))
+                offset += get_block_length(count)
+            else:
+                break
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+data_recorder.py: Stream plotted data to disk from a background thread
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+from threading import Thread, Lock
+import os
+import time
+import gzip
+import traceback
+import sys
+
+from brickv.data_file import DataFileWriter, to_text
+
+try:
+    from queue import Queue, Empty, Full
+except:
+    from Queue import Queue, Empty, Full # Python 2 fallback
+
+# time.monotonic is not available in Python 2, matches plot_widget.monotonic
+monotonic = getattr(time, 'monotonic', time.time)
+
+FORMAT_CSV = 'csv'
+FORMAT_BINARY = 'binary' # see data_file.py
+
+def quote(text):
+    return u'"' + to_text(text).replace(u'"', u'""') + u'"'
+
+class CSVWriter(object):
+    def __init__(self, f):
+        self.f = f
+
+        if self.f.tell() == 0:
+            self.f.write(b'time,source,curve,value\n')
+
+    def tell(self):
+        return self.f.tell()
+
+    def fileno(self):
+        return self.f.fileno()
+
+    # samples is a list of (source, curve, timestamp, value)
+    def write_samples(self, samples):
+        lines = []
+
+        for source, curve, timestamp, value in samples:
+            lines.append(u'{0:.6f},{1},{2},{3!r}\n'.format(timestamp, quote(source), quote(curve), value))
+
+        self.f.write(u''.join(lines).encode('utf-8'))
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+
+class DataRecorder(object):
+    """
+    Shared by all PlotWidgets. The GUI thread only puts samples into a
+    bounded queue and never waits for it. If the queue is full the sample
+    is counted as dropped. A writer thread appends the samples as CSV lines
+    or in the binary format of data_file.py to a series of chunk files and
+    fsyncs them periodically. A new chunk is started when the current one
+    reaches chunk_size bytes or, if given, is chunk_interval seconds old.
+    CSV chunks are optionally gzipped, binary chunks are memory-mapped by
+    the reader and cannot be compressed. If the writer thread fails, the
+    recording stops and failure_callback is called from the writer thread
+    with the error.
+    """
+
+    QUEUE_SIZE = 65536 # samples
+    BATCH_SIZE = 4096 # samples
+    CHUNK_SIZE = 16 * 1024 * 1024 # bytes
+    FSYNC_INTERVAL = 1.0 # seconds
+
+    def __init__(self):
+        self.queue = None
+        self.thread = None
+        self.recording = False
+        self.directory = None
+        self.dropped_count = 0
+        self.dropped_count_lock = Lock() # record is called from several threads
+        self.written_count = 0
+        self.chunk_count = 0
+        self.chunk_size = DataRecorder.CHUNK_SIZE
+        self.chunk_interval = None
+        self.compress = False
+        self.file_format = FORMAT_CSV
+        self.time_offset = 0 # wall clock minus monotonic clock
+        self.failure_callback = None
+
+    def start(self, directory, name='brickv', compress=False,
+              chunk_size=CHUNK_SIZE, chunk_interval=None, file_format=FORMAT_CSV):
+        if file_format not in [FORMAT_CSV, FORMAT_BINARY]:
+            raise ValueError('Unknown file format: {0}'.format(file_format))
+
+        if compress and file_format != FORMAT_CSV:
+            raise ValueError('Only CSV files can be compressed')
+
+        if self.recording:
+            self.stop()
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.directory = directory
+        self.dropped_count = 0
+        self.written_count = 0
+        self.chunk_count = 0
+        self.chunk_size = chunk_size
+        self.chunk_interval = chunk_interval
+        self.compress = compress
+        self.file_format = file_format
+        self.time_offset = time.time() - monotonic()
+
+        # open the first chunk here to report errors to the caller
+        prefix = '{0}-{1}'.format(name, time.strftime('%Y%m%d-%H%M%S'))
+        writer = self.open_chunk(prefix)
+
+        self.queue = Queue(DataRecorder.QUEUE_SIZE)
+        self.thread = Thread(name='Data-Recorder', target=self.write_loop,
+                             args=(self.queue, prefix, writer))
+        self.thread.daemon = True
+        self.thread.start()
+        self.recording = True
+
+    def stop(self):
+        if not self.recording:
+            return
+
+        self.recording = False
+
+        # the writer thread drains the queue before it sees the stop marker.
+        # it's the only place where the GUI thread might wait for the disk
+        self.queue.put(None)
+        self.thread.join()
+
+        self.queue = None
+        self.thread = None
+
+    # timestamp is from the monotonic clock, as used by PlotWidget
+    def record(self, source, curve, timestamp, value):
+        if not self.recording:
+            return
+
+        try:
+            self.queue.put_nowait((source, curve, timestamp, value))
+        except Full:
+            with self.dropped_count_lock:
+                self.dropped_count += 1
+
+    # internal
+    def open_chunk(self, prefix):
+        path = os.path.join(self.directory, '{0}-{1:04d}'.format(prefix, self.chunk_count))
+
+        if self.file_format == FORMAT_BINARY:
+            writer = DataFileWriter(open(path + '.bvd', 'wb'))
+        elif self.compress:
+            writer = CSVWriter(gzip.open(path + '.csv.gz', 'ab'))
+        else:
+            writer = CSVWriter(open(path + '.csv', 'ab'))
+
+        self.chunk_count += 1
+
+        return writer
+
+    # internal
+    def write_loop(self, queue, prefix, writer):
+        dirty = False
+        last_fsync = monotonic()
+        chunk_start = last_fsync
+        stop = False
+
+        try:
+            while not stop:
+                try:
+                    samples = [queue.get(True, DataRecorder.FSYNC_INTERVAL)]
+                except Empty:
+                    samples = []
+
+                while len(samples) > 0 and len(samples) < DataRecorder.BATCH_SIZE:
+                    try:
+                        samples.append(queue.get_nowait())
+                    except Empty:
+                        break
+
+                batch = []
+
+                for sample in samples:
+                    if sample == None:
+                        stop = True
+                        break
+
+                    source, curve, timestamp, value = sample
+
+                    batch.append((source, curve, timestamp + self.time_offset, value))
+
+                if len(batch) > 0:
+                    writer.write_samples(batch)
+                    self.written_count += len(batch)
+                    dirty = True
+
+                if writer.tell() >= self.chunk_size or \
+                   (self.chunk_interval != None and monotonic() - chunk_start >= self.chunk_interval):
+                    # not closed again below if the next chunk can't be opened
+                    chunk = writer
+                    writer = None
+                    chunk.close()
+                    writer = self.open_chunk(prefix)
+                    dirty = False
+                    last_fsync = monotonic()
+                    chunk_start = last_fsync
+
+                if dirty and monotonic() - last_fsync >= DataRecorder.FSYNC_INTERVAL:
+                    writer.flush()
+                    os.fsync(writer.fileno())
+                    dirty = False
+                    last_fsync = monotonic()
+        except Exception as e:
+            self.recording = False
+
+            if not hasattr(sys, 'frozen'):
+                traceback.print_exc()
+
+            if self.failure_callback != None:
+                self.failure_callback(to_text(str(e)))
+        finally:
+            if writer != None:
+                # closing fails as well if the disk is full, that was
+                # already reported above
+                try:
+                    writer.close()
+                except:
+                    if not hasattr(sys, 'frozen'):
+                        traceback.print_exc()
+
+data_recorder = DataRecorder()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+logger.py: Entry file for the headless Brick Viewer data logger
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+import os
+import sys
+import socket
+import time
+import signal
+import inspect
+import logging
+import argparse
+from threading import Event
+
+def prepare_package(package_name):
+    # allow the logger to be directly started by calling 'logger.py'
+    # without '<package_name>' being in the path already, see main.py
+    if hasattr(sys, 'frozen'):
+        program_path = os.path.dirname(os.path.realpath(sys.executable))
+    else:
+        program_path = os.path.dirname(os.path.realpath(__file__))
+
+    if package_name not in sys.modules:
+        head, tail = os.path.split(program_path)
+
+        if head not in sys.path:
+            sys.path.insert(0, head)
+
+        if not hasattr(sys, 'frozen') and tail != package_name:
+            sys.modules[package_name] = __import__(tail)
+
+prepare_package('brickv')
+
+# no Qt imports here, the logger has to run without a display
+from brickv import config
+from brickv.bindings import ip_connection
+from brickv.bindings.ip_connection import IPConnection
+from brickv.callback_scheduler import callback_scheduler, monotonic
+from brickv.data_recorder import data_recorder, FORMAT_CSV, FORMAT_BINARY
+
+# (divisor, unit) per binding module and getter, the same scaling that the
+# plugins apply before plotting. getters of devices listed here are logged
+# when a channel only names a UID
+UNIT_SCALING = {
+    'bricklet_ac_current':              {'get_current': (1000.0, u'A')},
+    'bricklet_accelerometer':           {'get_acceleration': (1000.0, u'g')},
+    'bricklet_ambient_light':           {'get_illuminance': (10.0, u'lx')},
+    'bricklet_ambient_light_v2':        {'get_illuminance': (100.0, u'lx')},
+    'bricklet_analog_in':               {'get_voltage': (1.0, u'mV')},
+    'bricklet_analog_in_v2':            {'get_voltage': (1000.0, u'V')},
+    'bricklet_barometer':               {'get_air_pressure': (1000.0, u'mbar'),
+                                         'get_altitude': (100.0, u'm')},
+    'bricklet_co2':                     {'get_co2_concentration': (1.0, u'ppm')},
+    'bricklet_color':                   {'get_illuminance': (1.0, u'lx'),
+                                         'get_color_temperature': (1.0, u'K')},
+    'bricklet_current12':               {'get_current': (1.0, u'mA')},
+    'bricklet_current25':               {'get_current': (1.0, u'mA')},
+    'bricklet_distance_ir':             {'get_distance': (10.0, u'cm')},
+    'bricklet_distance_us':             {'get_distance_value': (1.0, u'')},
+    'bricklet_dust_detector':           {'get_dust_density': (1.0, u'µg/m³')},
+    'bricklet_gas_detector':            {'get_value': (1.0, u'')},
+    'bricklet_heart_rate':              {'get_heart_rate': (1.0, u'BPM')},
+    'bricklet_humidity':                {'get_humidity': (10.0, u'%RH')},
+    'bricklet_laser_range_finder':      {'get_distance': (1.0, u'cm'),
+                                         'get_velocity': (100.0, u'm/s')},
+    'bricklet_line':                    {'get_reflectivity': (1.0, u'')},
+    'bricklet_linear_poti':             {'get_position': (1.0, u'')},
+    'bricklet_load_cell':               {'get_weight': (1.0, u'g')},
+    'bricklet_moisture':                {'get_moisture_value': (1.0, u'')},
+    'bricklet_ozone':                   {'get_ozone_concentration': (1.0, u'ppb')},
+    'bricklet_ptc':                     {'get_temperature': (100.0, u'°C')},
+    'bricklet_rotary_poti':             {'get_position': (1.0, u'')},
+    'bricklet_sound_intensity':         {'get_intensity': (1.0, u'')},
+    'bricklet_temperature':             {'get_temperature': (100.0, u'°C')},
+    'bricklet_temperature_ir':          {'get_ambient_temperature': (10.0, u'°C'),
+                                         'get_object_temperature': (10.0, u'°C')},
+    'bricklet_voltage':                 {'get_voltage': (1.0, u'mV')},
+    'bricklet_voltage_current':         {'get_current': (1.0, u'mA'),
+                                         'get_voltage': (1.0, u'mV'),
+                                         'get_power': (1.0, u'mW')},
+}
+
+DEFAULT_PERIOD = 1000 # ms
+MAX_ERROR_BACKOFF = 5.0 # seconds
+
+def load_device_classes():
+    device_classes = {} # device identifier -> binding class
+    bindings_path = os.path.dirname(os.path.realpath(ip_connection.__file__))
+
+    for name in sorted(os.listdir(bindings_path)):
+        if not name.endswith('.py') or not name.startswith(('brick_', 'bricklet_')):
+            continue
+
+        module_name = 'brickv.bindings.' + name[:-3]
+        module = __import__(module_name, globals(), locals(), ['*'])
+
+        for value in module.__dict__.values():
+            # old-style classes on Python 2, isinstance(value, type) is False
+            if inspect.isclass(value) and value.__module__ == module_name and \
+               hasattr(value, 'DEVICE_IDENTIFIER'):
+                device_classes[value.DEVICE_IDENTIFIER] = value
+
+    return device_classes
+
+def get_unit_scaling(device_class):
+    return UNIT_SCALING.get(device_class.__module__.split('.')[-1], {})
+
+class LoggerChannel(object):
+    """
+    One getter of one device, called periodically by the shared
+    callback_scheduler. The samples go to the data_recorder.
+    """
+
+    def __init__(self, device, getter_name, period, source, divisor, unit):
+        self.getter = getattr(device, getter_name)
+        self.period = period / 1000.0
+        self.source = source
+        self.curve = getter_name[4:] if getter_name.startswith('get_') else getter_name
+        self.divisor = divisor
+        self.unit = unit
+        self.sample_count = 0
+        self.error_count = 0
+        self.missed_count = 0
+        self.error_backoff = 0
+        self.due = None # protected by callback_scheduler.condition
+        self.generation = 0 # protected by callback_scheduler.condition
+        self.updating = False # protected by callback_scheduler.condition
+
+    def start(self):
+        callback_scheduler.schedule(self, monotonic())
+
+    def stop(self):
+        callback_scheduler.unschedule(self)
+
+    # called by callback_scheduler, returns when to be called next
+    def update(self, due):
+        try:
+            value = self.getter()
+        except ip_connection.Error as e:
+            self.error_count += 1
+            self.error_backoff = min(max(self.error_backoff * 2, self.period), MAX_ERROR_BACKOFF)
+
+            if self.error_count == 1 or self.error_count % 100 == 0:
+                logging.warning('{0} {1}: {2} (error {3})'.format(self.source, self.curve, e, self.error_count))
+
+            return monotonic() + self.error_backoff
+
+        now = monotonic()
+
+        self.error_backoff = 0
+        self.sample_count += 1
+        self.record(now, self.curve, value)
+
+        # stay on the original grid, skip samples that are already too late
+        next_due = due + self.period
+
+        if next_due <= now:
+            missed = int((now - next_due) / self.period) + 1
+            self.missed_count += missed
+            next_due += missed * self.period
+
+        return next_due
+
+    # internal
+    def record(self, timestamp, name, value):
+        if hasattr(value, '_fields'):
+            for field, field_value in zip(value._fields, value):
+                self.record(timestamp, name + '.' + field, field_value)
+        elif isinstance(value, (list, tuple)):
+            for i, item in enumerate(value):
+                self.record(timestamp, u'{0}[{1}]'.format(name, i), item)
+        elif isinstance(value, bool):
+            data_recorder.record(self.source, name, timestamp, int(value))
+        elif isinstance(value, (int, float)) or type(value).__name__ == 'long':
+            if len(self.unit) > 0:
+                name = u'{0} [{1}]'.format(name, self.unit)
+
+            if self.divisor != 1.0:
+                value = value / self.divisor
+
+            data_recorder.record(self.source, name, timestamp, value)
+
+def parse_channel(text):
+    # UID[:getter[@period]]
+    if '@' in text:
+        text, period = text.rsplit('@', 1)
+        period = int(period)
+    else:
+        period = DEFAULT_PERIOD
+
+    if ':' in text:
+        uid, getter_name = text.split(':', 1)
+    else:
+        uid, getter_name = text, None
+
+    return uid, getter_name, period
+
+def enumerate_devices(ipcon, wait):
+    devices = {} # uid -> device identifier
+
+    def cb_enumerate(uid, connected_uid, position, hardware_version,
+                     firmware_version, device_identifier, enumeration_type):
+        if enumeration_type != IPConnection.ENUMERATION_TYPE_DISCONNECTED:
+            devices[uid] = device_identifier
+
+    ipcon.register_callback(IPConnection.CALLBACK_ENUMERATE, cb_enumerate)
+    ipcon.enumerate()
+
+    # there is no end marker for the enumeration, just give it some time
+    time.sleep(wait)
+
+    return devices
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless Brick Viewer data logger. Samples getters of ' +
+                                                 'Bricks and Bricklets and writes them to rotating log files.')
+    parser.add_argument('channels', nargs='*', metavar='UID[:GETTER[@PERIOD]]',
+                        help='getter to sample every PERIOD ms (default {0}), all known getters '.format(DEFAULT_PERIOD) +
+                             'of the device if only the UID is given')
+    parser.add_argument('--host', default=config.DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=config.DEFAULT_PORT)
+    parser.add_argument('--secret', default=None, help='authenticate with this secret')
+    parser.add_argument('--list', action='store_true', help='list the connected devices and their known getters')
+    parser.add_argument('--output', default='.', help='directory for the log files')
+    parser.add_argument('--format', choices=[FORMAT_BINARY, FORMAT_CSV], default=FORMAT_BINARY,
+                        help='binary files can be opened in Brick Viewer (default), CSV files are gzipped')
+    parser.add_argument('--no-compress', action='store_true', help='do not gzip the CSV files')
+    parser.add_argument('--rotate-size', type=int, default=64, help='start a new file after this many MiB')
+    parser.add_argument('--rotate-interval', type=int, default=3600, help='start a new file after this many seconds')
+    parser.add_argument('--duration', type=float, default=None, help='stop after this many seconds')
+    parser.add_argument('--enumerate-wait', type=float, default=1.0, help='seconds to wait for the enumeration')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format=config.LOGGING_FORMAT,
+                        datefmt=config.LOGGING_DATEFMT)
+
+    device_classes = load_device_classes()
+
+    ipcon = IPConnection()
+    # lets the scheduler workers have several requests in flight at once
+    ipcon.set_request_pipelining(True)
+
+    try:
+        ipcon.connect(args.host, args.port)
+
+        if args.secret != None:
+            ipcon.authenticate(args.secret)
+
+        devices = enumerate_devices(ipcon, args.enumerate_wait)
+    except (socket.error, ip_connection.Error) as e:
+        logging.error('Could not connect to {0}:{1}: {2}'.format(args.host, args.port, e))
+
+        if ipcon.get_connection_state() != IPConnection.CONNECTION_STATE_DISCONNECTED:
+            ipcon.disconnect()
+
+        sys.exit(1)
+
+    if args.list:
+        for uid, device_identifier in sorted(devices.items()):
+            device_class = device_classes.get(device_identifier)
+
+            if device_class == None:
+                print(u'{0}: unknown device {1}'.format(uid, device_identifier))
+            else:
+                getters = ', '.join(sorted(get_unit_scaling(device_class).keys()))
+                print(u'{0}: {1} ({2})'.format(uid, device_class.DEVICE_DISPLAY_NAME, getters))
+
+        ipcon.disconnect()
+        return
+
+    channels = []
+    device_objects = {}
+
+    for text in args.channels:
+        uid, getter_name, period = parse_channel(text)
+
+        if uid not in devices or devices[uid] not in device_classes:
+            parser.error('Device {0} is not connected or unknown'.format(uid))
+
+        device_class = device_classes[devices[uid]]
+        scaling = get_unit_scaling(device_class)
+
+        if uid not in device_objects:
+            device_objects[uid] = device_class(uid, ipcon)
+
+        device = device_objects[uid]
+        source = u'{0} {1}'.format(device_class.DEVICE_DISPLAY_NAME, uid)
+
+        if getter_name == None:
+            getter_names = sorted(scaling.keys())
+
+            if len(getter_names) == 0:
+                parser.error('No known getters for {0}, name one explicitly'.format(source))
+        else:
+            getter_names = [getter_name]
+
+        for name in getter_names:
+            if not name.startswith('get_') or not hasattr(device, name):
+                parser.error('{0} has no getter {1}'.format(source, name))
+
+            divisor, unit = scaling.get(name, (1.0, u''))
+
+            channels.append(LoggerChannel(device, name, period, source, divisor, unit))
+
+    if len(channels) == 0:
+        parser.error('No channels given, use --list to show the connected devices')
+
+    data_recorder.start(args.output, 'brickv-logger', args.format == FORMAT_CSV and not args.no_compress,
+                        args.rotate_size * 1024 * 1024, args.rotate_interval, args.format)
+
+    stop = Event()
+
+    def handle_signal(signal_number, frame):
+        stop.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    logging.info('Logging {0} channel(s) to {1}'.format(len(channels), args.output))
+
+    for channel in channels:
+        channel.start()
+
+    start = monotonic()
+
+    # Event.wait without timeout is not interruptible by signals on Python 2
+    while not stop.is_set():
+        if args.duration != None and monotonic() - start >= args.duration:
+            break
+
+        stop.wait(0.5)
+
+    for channel in channels:
+        channel.stop()
+
+    data_recorder.stop()
+    ipcon.disconnect()
+
+    logging.info('Wrote {0} samples, dropped {1}, missed {2}, errors {3}'.format(data_recorder.written_count,
+                                                                                 data_recorder.dropped_count,
+                                                                                 sum([channel.missed_count for channel in channels]),
+                                                                                 sum([channel.error_count for channel in channels])))
+
+if __name__ == "__main__":
+    main()
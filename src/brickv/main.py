@@ -57,11 +57,10 @@ def prepare_package(package_name):
 prepare_package('brickv')
 
 from PyQt4.QtGui import QApplication, QIcon, QFont
-from PyQt4.QtCore import QEvent, pyqtSignal
+from PyQt4.QtCore import pyqtSignal
 
 from brickv import config
 from brickv.mainwindow import MainWindow
-from brickv.async_call import ASYNC_EVENT, async_event_handler
 from brickv.load_pixmap import load_pixmap
 
 logging.basicConfig(level=config.LOGGING_LEVEL,
@@ -81,12 +80,6 @@ class BrickViewer(QApplication):
     def object_creator_slot(self, object_creator):
         object_creator.create()
 
-    def notify(self, receiver, event):
-        if event.type() > QEvent.User and event.type() == ASYNC_EVENT:
-            async_event_handler()
-
-        return QApplication.notify(self, receiver, event)
-
 def main():
     argv = sys.argv
 
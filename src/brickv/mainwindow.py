@@ -27,9 +27,12 @@ from PyQt4.QtGui import QApplication, QMainWindow, QMessageBox, \
                         QPushButton, QHBoxLayout, QVBoxLayout, \
                         QLabel, QFrame, QSpacerItem, QSizePolicy, \
                         QStandardItemModel, QStandardItem, QToolButton, \
-                        QLineEdit, QCursor, QMenu, QToolButton, QAction
+                        QLineEdit, QCursor, QMenu, QToolButton, QAction, \
+                        QWidget
 from brickv.ui_mainwindow import Ui_MainWindow
 from brickv.plugin_system.plugin_manager import PluginManager
+from brickv.plugin_system.plugin_base import PluginBase
+from brickv.plugin_system.placeholder import Placeholder
 from brickv.bindings.ip_connection import IPConnection
 from brickv.flashing import FlashingWindow
 from brickv.advanced import AdvancedWindow
@@ -39,7 +42,12 @@ from brickv.bindings.brick_red import BrickRED
 from brickv import config
 from brickv import infos
 from brickv.tab_window import TabWindow
+from brickv.data_recorder import data_recorder, FORMAT_BINARY
+from brickv.data_file import DataFileReader
+from brickv.recording_viewer import RecordingViewerWindow
+from brickv.utils import get_home_path, get_existing_directory, get_open_file_names
 
+import os
 import signal
 import sys
 import time
@@ -49,10 +57,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     qtcb_enumerate = pyqtSignal(str, str, 'char', type((0,)), type((0,)), int, int)
     qtcb_connected = pyqtSignal(int)
     qtcb_disconnected = pyqtSignal(int)
+    qtcb_recording_failed = pyqtSignal(str)
 
     def __init__(self, parent=None):
         QMainWindow.__init__(self, parent)
 
+        # changeEvent is already called by setupUi
+        self.current_device_info = None
+
         self.setupUi(self)
 
         signal.signal(signal.SIGINT, self.exit_brickv)
@@ -89,12 +101,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.ipcon.register_callback(IPConnection.CALLBACK_DISCONNECTED,
                                      self.qtcb_disconnected.emit)
 
-        self.current_device_info = None
         self.flashing_window = None
         self.advanced_window = None
         self.delayed_refresh_updates_timer = QTimer()
         self.delayed_refresh_updates_timer.timeout.connect(self.delayed_refresh_updates)
         self.delayed_refresh_updates_timer.setInterval(500)
+        self.plugin_idle_times = {} # uid -> time since which the built plugin is stopped
+        self.teardown_idle_plugins_timer = QTimer()
+        self.teardown_idle_plugins_timer.timeout.connect(self.teardown_idle_plugins)
+        self.teardown_idle_plugins_timer.setInterval(10000)
+
+        if config.PLUGIN_IDLE_TIMEOUT > 0:
+            self.teardown_idle_plugins_timer.start()
+
         self.reset_view()
         self.button_advanced.setDisabled(True)
 
@@ -105,6 +124,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.button_connect.clicked.connect(self.connect_clicked)
         self.button_flashing.clicked.connect(self.flashing_clicked)
         self.button_advanced.clicked.connect(self.advanced_clicked)
+        self.button_recording.clicked.connect(self.recording_clicked)
+        self.button_open_recording.clicked.connect(self.open_recording_clicked)
+        self.last_recording_dir = get_home_path()
+        self.qtcb_recording_failed.connect(self.cb_recording_failed)
+        data_recorder.failure_callback = self.qtcb_recording_failed.emit
         self.plugin_manager = PluginManager()
 
         # host info
@@ -151,11 +175,24 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def closeEvent(self, event):
         self.exit_brickv()
 
+    # override QMainWindow.changeEvent
+    def changeEvent(self, event):
+        if self.current_device_info is not None:
+            if event.type() == QEvent.WindowStateChange:
+                self.current_device_info.plugin.set_on_screen(not self.isMinimized())
+            elif event.type() == QEvent.ActivationChange and self.isActiveWindow():
+                self.current_device_info.plugin.set_on_screen(True)
+                self.current_device_info.plugin.got_focus()
+
+        QMainWindow.changeEvent(self, event)
+
     def exit_brickv(self, signal=None, frame=None):
         if self.current_device_info is not None:
             self.current_device_info.plugin.stop_plugin()
             self.current_device_info.plugin.destroy_plugin()
 
+        data_recorder.stop()
+
         self.update_current_host_info()
         config.set_host_infos(self.host_infos)
 
@@ -210,6 +247,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             new_current_device_info = None
         else:
             new_current_device_info = self.tab_widget.widget(i)._info
+            self.materialize_plugin(new_current_device_info)
             new_current_device_info.plugin.start_plugin()
 
         # stop the now deselected plugin, if there is one that's running
@@ -265,6 +303,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             plugin.hide()
             plugin.setParent(None)
 
+        self.plugin_idle_times.pop(uid, None)
         infos.remove_info(uid)
 
     def reset_view(self):
@@ -344,6 +383,55 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.advanced_window.show()
 
+    def recording_clicked(self):
+        if data_recorder.recording:
+            data_recorder.stop()
+        else:
+            directory = get_existing_directory(self, 'Select Recording Directory', self.last_recording_dir)
+
+            if len(directory) == 0:
+                return
+
+            self.last_recording_dir = directory
+
+            try:
+                data_recorder.start(directory, file_format=FORMAT_BINARY)
+            except (IOError, OSError) as e:
+                QMessageBox.critical(self, 'Recording',
+                                     u'Could not start recording to {0}:\n\n{1}'.format(directory, e),
+                                     QMessageBox.Ok)
+
+        if data_recorder.recording:
+            self.button_recording.setText('Stop Recording')
+        else:
+            self.button_recording.setText('Start Recording')
+
+    def cb_recording_failed(self, error):
+        self.button_recording.setText('Start Recording')
+
+        QMessageBox.critical(self, 'Recording',
+                             u'Recording stopped because of an error:\n\n{0}'.format(error),
+                             QMessageBox.Ok)
+
+    def open_recording_clicked(self):
+        paths = get_open_file_names(self, 'Open Recording', self.last_recording_dir,
+                                    'Brick Viewer Recordings (*.bvd)')
+
+        if len(paths) == 0:
+            return
+
+        self.last_recording_dir = os.path.dirname(paths[0])
+
+        try:
+            reader = DataFileReader(paths)
+        except (IOError, OSError) as e:
+            QMessageBox.critical(self, 'Open Recording',
+                                 u'Could not open recording:\n\n{0}'.format(e),
+                                 QMessageBox.Ok)
+            return
+
+        RecordingViewerWindow(self, reader, paths).show()
+
     def connect_clicked(self):
         if self.ipcon.get_connection_state() == IPConnection.CONNECTION_STATE_DISCONNECTED:
             try:
@@ -375,8 +463,26 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         tab_window.set_callback_on_tab(lambda index:
             self.ipcon.get_connection_state() == IPConnection.CONNECTION_STATE_PENDING and \
                 self.tab_widget.setTabEnabled(index, False))
+        # look the plugin up on each call, a Placeholder gets replaced
+        tab_window.set_callback_on_screen_change(lambda on_screen: device_info.plugin.set_on_screen(on_screen))
+        tab_window.set_callback_on_focus(lambda: device_info.plugin.got_focus())
 
         layout = QVBoxLayout(tab_window)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        tab_window._content = self.create_tab_content(device_info, connected_uid, position)
+        layout.addWidget(tab_window._content)
+
+        return tab_window
+
+    def create_tab_content(self, device_info, connected_uid, position):
+        # a Placeholder has no widgets worth showing, it gets replaced by the
+        # actual plugin before its tab is shown
+        if isinstance(device_info.plugin, Placeholder):
+            return device_info.plugin
+
+        content = QWidget()
+        layout = QVBoxLayout(content)
         info_bar = QHBoxLayout()
 
         # uid
@@ -460,7 +566,69 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         layout.addWidget(line)
         layout.addWidget(device_info.plugin)
 
-        return tab_window
+        return content
+
+    def set_tab_content(self, device_info, content):
+        tab_window = device_info.tab_window
+        old_content = tab_window._content
+
+        tab_window.layout().removeWidget(old_content)
+        old_content.hide()
+        old_content.setParent(None)
+
+        tab_window._content = content
+        tab_window.layout().addWidget(content)
+
+    def materialize_plugin(self, device_info):
+        placeholder = device_info.plugin
+
+        if not isinstance(placeholder, Placeholder):
+            return
+
+        plugin = self.plugin_manager.get_plugin(device_info.device_identifier, self.ipcon, placeholder.uid,
+                                                placeholder.hardware_version, placeholder.firmware_version)
+
+        # the plugin has its own device object now. the name and URL part stay
+        # as the Placeholder reported them, even if the plugin failed to build
+        placeholder.destroy_plugin()
+
+        device_info.plugin = plugin
+
+        self.set_tab_content(device_info, self.create_tab_content(device_info, device_info.connected_uid,
+                                                                  device_info.position))
+
+    # replaces plugins that were stopped for PLUGIN_IDLE_TIMEOUT seconds by a
+    # Placeholder again, to free their widgets. the current tab and untabbed
+    # windows keep their plugin running and are never torn down
+    def teardown_idle_plugins(self):
+        now = time.time()
+
+        for device_info in infos.get_device_infos():
+            plugin = device_info.plugin
+
+            if isinstance(plugin, Placeholder) or plugin.plugin_state != PluginBase.PLUGIN_STATE_STOPPED:
+                self.plugin_idle_times.pop(device_info.uid, None)
+                continue
+
+            idle_since = self.plugin_idle_times.setdefault(device_info.uid, now)
+
+            if now - idle_since < config.PLUGIN_IDLE_TIMEOUT:
+                continue
+
+            placeholder = self.plugin_manager.get_placeholder(device_info.device_identifier, self.ipcon,
+                                                              plugin.uid, plugin.hardware_version,
+                                                              plugin.firmware_version)
+
+            if placeholder == None:
+                continue
+
+            del self.plugin_idle_times[device_info.uid]
+
+            plugin.destroy_plugin()
+
+            device_info.plugin = placeholder
+
+            self.set_tab_content(device_info, placeholder)
 
     def tab_move(self, event):
         # visualize rearranging of tabs (if allowed by tab_widget)
@@ -475,6 +643,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
     def untab(self, tab_index):
         tab = self.tab_widget.widget(tab_index)
+        self.materialize_plugin(tab._info)
         tab.untab()
         tab._info.plugin.start_plugin()
         self.tab_widget.setCurrentIndex(0)
@@ -560,8 +729,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                             something_changed_ref[0] = True
 
             if device_info.plugin == None:
-                plugin = self.plugin_manager.get_plugin(device_identifier, self.ipcon,
-                                                        uid, hardware_version, firmware_version)
+                # only build the plugin when its tab is shown, otherwise a big
+                # stack would build the widgets of all its plugins right here
+                plugin = self.plugin_manager.get_placeholder(device_identifier, self.ipcon,
+                                                             uid, hardware_version, firmware_version)
+
+                if plugin == None:
+                    plugin = self.plugin_manager.get_plugin(device_identifier, self.ipcon,
+                                                            uid, hardware_version, firmware_version)
 
                 device_info.plugin = plugin
                 device_info.name = plugin.name
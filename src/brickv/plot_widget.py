@@ -24,15 +24,26 @@ Boston, MA 02111-1307, USA.
 
 import sys
 import math
+import time
 import functools
+import bisect
+from array import array
+from collections import deque
 
 from PyQt4.QtGui import QVBoxLayout, QHBoxLayout, QWidget, QToolButton, \
                         QPushButton, QPainter, QSizePolicy, QFontMetrics, \
                         QPixmap, QIcon, QColor, QCursor, QPen, QPainterPath
 from PyQt4.QtCore import QTimer, Qt, QSize, QPointF
 
+from brickv.data_recorder import data_recorder, to_text
+
 EPSILON = 0.000001
 DEBUG = False
+REPAINT_INTERVAL = 16 # ms, coalesce repaints to about 60 fps
+MIN_VIEW_LENGTH = 1.0 # seconds, smallest zoomed time range
+
+# clock for PlotWidget.push timestamps, falls back to time.time on Python 2
+monotonic = getattr(time, 'monotonic', time.time)
 
 def istr(i):
     return str(int(i))
@@ -54,6 +65,359 @@ def fuzzy_leq(a, b):
 def fuzzy_geq(a, b):
     return a > b or fuzzy_eq(a, b)
 
+class RingBuffer(object):
+    """Ring buffer of floats stored in an array, doubles its capacity when full"""
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.data = array('d', [0.0]) * capacity
+        self.start = 0
+        self.length = 0
+        self.offset = 0 # absolute index of the oldest value
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.length
+
+        return self.data[(self.start + i) % self.capacity]
+
+    def append(self, value):
+        if self.length == self.capacity:
+            self.data = self.values() + array('d', [0.0]) * self.capacity
+            self.start = 0
+            self.capacity *= 2
+
+        self.data[(self.start + self.length) % self.capacity] = value
+        self.length += 1
+
+    # removes the count oldest values
+    def drop(self, count):
+        count = min(count, self.length)
+
+        self.start = (self.start + count) % self.capacity
+        self.length -= count
+        self.offset += count
+
+    # returns all values in order as array
+    def values(self):
+        end = self.start + self.length
+
+        if end <= self.capacity:
+            return self.data[self.start:end]
+        else:
+            return self.data[self.start:] + self.data[:end - self.capacity]
+
+class SlidingMinMax(object):
+    """Minimum and maximum of a sliding window of values. Uses a monotonic deque
+    of (index, value) tuples each for minimum and maximum, so appending and
+    dropping values takes amortized constant time"""
+
+    def __init__(self):
+        self.mins = deque()
+        self.maxs = deque()
+        self.first_index = 0
+        self.next_index = 0
+
+    def append(self, value):
+        mins = self.mins
+        maxs = self.maxs
+
+        while len(mins) > 0 and mins[-1][1] >= value:
+            mins.pop()
+
+        while len(maxs) > 0 and maxs[-1][1] <= value:
+            maxs.pop()
+
+        mins.append((self.next_index, value))
+        maxs.append((self.next_index, value))
+
+        self.next_index += 1
+
+    # removes the count oldest values
+    def drop(self, count):
+        self.first_index = min(self.first_index + count, self.next_index)
+
+        while len(self.mins) > 0 and self.mins[0][0] < self.first_index:
+            self.mins.popleft()
+
+        while len(self.maxs) > 0 and self.maxs[0][0] < self.first_index:
+            self.maxs.popleft()
+
+    def get_min(self):
+        if len(self.mins) == 0:
+            return None
+
+        return self.mins[0][1]
+
+    def get_max(self):
+        if len(self.maxs) == 0:
+            return None
+
+        return self.maxs[0][1]
+
+class CurveDecimator(object):
+    """Reduces a curve to at most one minimum/maximum pair per pixel column.
+    Columns are aligned to absolute x values, so already decimated columns stay
+    valid while new values are appended and old values are dropped. Only the
+    values added since the last call are processed, everything else is reused"""
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, factor):
+        self.factor = factor
+        # per column: [column, first index, last index, min index, min x, min y, max index, max x, max y]
+        self.columns = deque()
+        self.next_index = 0 # absolute index of the next value to process
+        self.path = None # cached QPainterPath, None if outdated
+
+    def make_column(self, column, i, x, y):
+        return [column, i, i, i, x, y, i, x, y]
+
+    def add_to_column(self, record, i, x, y):
+        record[2] = i
+
+        if y < record[5]:
+            record[3:6] = [i, x, y]
+
+        if y > record[8]:
+            record[6:9] = [i, x, y]
+
+    def build_column(self, curve_x, curve_y, first, last):
+        offset = curve_x.offset
+        record = None
+
+        for i in xrange(first, last + 1):
+            x = curve_x[i - offset]
+            y = curve_y[i - offset]
+
+            if record == None:
+                record = self.make_column(int(math.floor(x * self.factor)), i, x, y)
+            else:
+                self.add_to_column(record, i, x, y)
+
+        return record
+
+    # returns a QPainterPath for the curve in value coordinates
+    def get_path(self, curve_x, curve_y, factor):
+        if factor != self.factor:
+            self.reset(factor)
+
+        columns = self.columns
+        offset = curve_x.offset
+        end = offset + len(curve_x)
+
+        # forget columns whose values got dropped
+        if self.next_index < offset:
+            self.next_index = offset
+
+        while len(columns) > 0 and columns[0][2] < offset:
+            columns.popleft()
+            self.path = None
+
+        if len(columns) > 0 and columns[0][1] < offset:
+            columns[0] = self.build_column(curve_x, curve_y, offset, columns[0][2])
+            self.path = None
+
+        # decimate new values
+        if self.next_index < end:
+            for i in xrange(self.next_index, end):
+                x = curve_x[i - offset]
+                y = curve_y[i - offset]
+                column = int(math.floor(x * factor))
+
+                if len(columns) > 0 and columns[-1][0] == column:
+                    self.add_to_column(columns[-1], i, x, y)
+                else:
+                    columns.append(self.make_column(column, i, x, y))
+
+            self.next_index = end
+            self.path = None
+
+        if self.path == None and len(columns) > 0:
+            path = QPainterPath()
+            lineTo = path.lineTo
+            first = True
+
+            for record in columns:
+                if record[3] <= record[6]:
+                    points = [(record[4], record[5]), (record[7], record[8])]
+                else:
+                    points = [(record[7], record[8]), (record[4], record[5])]
+
+                if record[3] == record[6]:
+                    del points[1]
+
+                for x, y in points:
+                    if first:
+                        path.moveTo(x, y)
+                        first = False
+                    else:
+                        lineTo(x, y)
+
+            self.path = path
+
+        return self.path
+
+class HistoryLevel(object):
+    """One resolution of a HistoryPyramid, keeps the minimum, maximum and mean
+    value of the last capacity buckets of bucket_length seconds"""
+
+    def __init__(self, bucket_length, capacity):
+        self.bucket_length = bucket_length
+        self.capacity = capacity
+        self.x = RingBuffer() # bucket start
+        self.y_min = RingBuffer()
+        self.y_max = RingBuffer()
+        self.y_mean = RingBuffer()
+        self.open_bucket = None # [bucket number, min, max, sum, count]
+
+    # returns the closed bucket as (x, min, max, sum, count) if the new data
+    # starts a new bucket
+    def add(self, x, y_min, y_max, y_sum, count):
+        bucket = int(math.floor(x / self.bucket_length))
+        open_bucket = self.open_bucket
+        closed = None
+
+        if open_bucket != None and open_bucket[0] == bucket:
+            open_bucket[1] = min(open_bucket[1], y_min)
+            open_bucket[2] = max(open_bucket[2], y_max)
+            open_bucket[3] += y_sum
+            open_bucket[4] += count
+
+            return None
+
+        if open_bucket != None:
+            closed = (open_bucket[0] * self.bucket_length,) + tuple(open_bucket[1:])
+
+            self.x.append(closed[0])
+            self.y_min.append(closed[1])
+            self.y_max.append(closed[2])
+            self.y_mean.append(closed[3] / closed[4])
+
+            if len(self.x) > self.capacity:
+                for buf in [self.x, self.y_min, self.y_max, self.y_mean]:
+                    buf.drop(1)
+
+        self.open_bucket = [bucket, y_min, y_max, y_sum, count]
+
+        return closed
+
+    def get_first_x(self):
+        if len(self.x) > 0:
+            return self.x[0]
+        elif self.open_bucket != None:
+            return self.open_bucket[0] * self.bucket_length
+        else:
+            return None
+
+    # returns the buckets overlapping [x_start, x_end] as list of
+    # (x, min, max, mean) tuples, including the open bucket
+    def get_buckets(self, x_start, x_end):
+        first = max(bisect.bisect_right(self.x, x_start) - 1, 0)
+        last = bisect.bisect_right(self.x, x_end)
+        half = self.bucket_length / 2.0
+        buckets = []
+
+        for i in xrange(first, last):
+            buckets.append((self.x[i] + half, self.y_min[i], self.y_max[i], self.y_mean[i]))
+
+        if self.open_bucket != None:
+            open_bucket = self.open_bucket
+            x = open_bucket[0] * self.bucket_length
+
+            if x <= x_end:
+                buckets.append((x + half, open_bucket[1], open_bucket[2], open_bucket[3] / open_bucket[4]))
+
+        return buckets
+
+class HistoryPyramid(object):
+    """Downsampled history of a curve at several resolutions. Each level
+    aggregates the closed buckets of the next finer level, so a new value only
+    touches the finest level most of the time. Memory use is bounded by the
+    number of levels times the bucket capacity per level"""
+
+    BUCKET_LENGTH = 0.1 # seconds, of the finest level
+    LEVEL_FACTOR = 4
+    LEVEL_COUNT = 8
+    LEVEL_CAPACITY = 1024 # buckets
+
+    def __init__(self):
+        self.levels = []
+
+        for i in range(HistoryPyramid.LEVEL_COUNT):
+            self.levels.append(HistoryLevel(HistoryPyramid.BUCKET_LENGTH * HistoryPyramid.LEVEL_FACTOR ** i,
+                                            HistoryPyramid.LEVEL_CAPACITY))
+
+    def add(self, x, y):
+        closed = self.levels[0].add(x, y, y, y, 1)
+
+        for level in self.levels[1:]:
+            if closed == None:
+                break
+
+            closed = level.add(*closed)
+
+    @staticmethod
+    def get_max_length():
+        return HistoryPyramid.BUCKET_LENGTH * HistoryPyramid.LEVEL_FACTOR ** (HistoryPyramid.LEVEL_COUNT - 1) * \
+               HistoryPyramid.LEVEL_CAPACITY
+
+    # returns the finest level that covers x_start and has at most
+    # max_buckets buckets in [x_start, x_end]
+    def get_level(self, x_start, x_end, max_buckets):
+        candidate = None
+
+        for level in self.levels:
+            if (x_end - x_start) / level.bucket_length > max_buckets:
+                continue
+
+            first_x = level.get_first_x()
+
+            if first_x != None and first_x <= x_start:
+                return level
+
+            if candidate == None:
+                candidate = level
+
+        if candidate == None:
+            candidate = self.levels[-1]
+
+        return candidate
+
+    # returns (x center, y min, y max, y mean) tuples of the level picked by
+    # get_level for [x_start, x_end]
+    def get_buckets(self, x_start, x_end, max_buckets):
+        return self.get_level(x_start, x_end, max_buckets).get_buckets(x_start, x_end)
+
+class DataFileHistory(object):
+    """Stands in for the HistoryPyramid of a curve while a recording is
+    browsed. The buckets come from a DataFileReader channel, x is relative to
+    time_base. The last result is kept, because a repaint asks for the same
+    buckets more than once"""
+
+    def __init__(self, reader, channel, time_base):
+        self.reader = reader
+        self.channel = channel
+        self.time_base = time_base
+        self.last_query = None
+        self.last_buckets = None
+
+    def get_buckets(self, x_start, x_end, max_buckets):
+        query = (x_start, x_end, max_buckets)
+
+        if query != self.last_query:
+            buckets = self.reader.get_buckets(self.channel, self.time_base + x_start,
+                                              self.time_base + x_end, max_buckets)
+
+            self.last_buckets = [(t - self.time_base, y_min, y_max, y_mean) for t, y_min, y_max, y_mean in buckets]
+            self.last_query = query
+
+        return self.last_buckets
+
 class Scale(object):
     def __init__(self, tick_text_font, title_text_font):
         self.axis_line_thickness = 1 # px, fixed
@@ -93,31 +457,75 @@ class XScale(Scale):
                             self.title_text_height + \
                             self.title_text_to_border # px, fixed
 
-    def draw(self, painter, factor, tick_value_min, tick_count):
-        factor_int = int(math.floor(factor))
+    # (tick step, label step) in seconds, from fine to coarse
+    TICK_STEPS = [(0.1, 0.5), (0.2, 1.0), (0.5, 2.0), (1, 5), (2, 10), (5, 30),
+                  (10, 60), (30, 300), (60, 300), (120, 600), (300, 1800),
+                  (600, 3600), (1800, 7200), (3600, 21600), (7200, 43200),
+                  (21600, 86400)]
+
+    # returns the finest tick and label step that fit the given factor
+    def get_tick_steps(self, factor, value_max):
+        label_width = self.tick_text_font_metrics.width(istr(value_max))
+
+        for tick_step, label_step in XScale.TICK_STEPS:
+            if factor * tick_step >= 10 and factor * label_step >= 4 * label_width:
+                return tick_step, label_step
+
+        return XScale.TICK_STEPS[-1]
+
+    # returns (tick step, label step, axis line length, [(x, tick index)]).
+    # equal layouts draw the same scale, the Plot compares them to decide if
+    # the scale needs to be repainted
+    def get_layout(self, factor, value_min, value_length):
+        tick_step, label_step = self.get_tick_steps(factor, value_min + value_length)
+        axis_line_length = int(math.floor(factor * value_length))
+        ticks = []
+
+        # ticks are placed on multiples of the tick step
+        i = int(math.ceil(value_min / tick_step - EPSILON))
+
+        while True:
+            x = int(round(factor * (i * tick_step - value_min)))
+
+            if x >= axis_line_length:
+                break
+
+            ticks.append((x, i))
+
+            i += 1
+
+        return tick_step, label_step, axis_line_length, tuple(ticks)
+
+    def draw(self, painter, factor, layout):
+        tick_step, label_step, axis_line_length, ticks = layout
         text_flags = Qt.TextDontClip | Qt.AlignHCenter | Qt.AlignBottom
 
-        # axis line
-        axis_line_length = int(math.floor(factor * tick_count))
+        if tick_step < 1:
+            tick_value_to_str = fstr
+        else:
+            tick_value_to_str = istr
 
+        # axis line
         painter.drawLine(0, 0, axis_line_length - 1, 0)
 
         # ticks
         tick_text_y = self.axis_line_thickness + \
                       self.tick_mark_size_large + \
                       self.tick_mark_to_tick_text
-        tick_text_width = factor_int + self.tick_mark_thickness + factor_int
+        tick_text_width_half = int(math.floor(factor * label_step / 2))
+        tick_text_width = tick_text_width_half + self.tick_mark_thickness + tick_text_width_half
         tick_text_height = self.tick_text_height
 
         painter.setFont(self.tick_text_font)
 
-        for i in range(tick_count):
-            x = round(factor * i)
-            tick_value = int(tick_value_min + i)
+        labels_per_tick = int(round(label_step / tick_step))
 
-            if (tick_value % 5) == 0:
+        for x, i in ticks:
+            tick_value = i * tick_step
+
+            if (i % labels_per_tick) == 0:
                 tick_mark_size = self.tick_mark_size_large
-                tick_text_x = x - factor_int
+                tick_text_x = x - tick_text_width_half
 
                 if DEBUG:
                     painter.fillRect(tick_text_x, tick_text_y,
@@ -127,7 +535,7 @@ class XScale(Scale):
                 painter.drawText(tick_text_x, tick_text_y,
                                  tick_text_width, tick_text_height,
                                  text_flags,
-                                 self.tick_value_to_str(tick_value))
+                                 tick_value_to_str(tick_value))
             else:
                 tick_mark_size = self.tick_mark_size_small
 
@@ -312,6 +720,10 @@ class Plot(QWidget):
         self.plots = plots
         self.scales_visible = scales_visible
         self.history_length_x = 20 # seconds
+        self.view_length_x = None # seconds, None shows the live history
+        self.view_end_x = None # None follows the newest data
+        self.view_drag_start = None # (mouse x, view end x)
+        self.browsing = False # True if curves_history is recorded data, see browse
 
         if curve_outer_border_visible:
             self.curve_outer_border = 5 # px, fixed
@@ -342,6 +754,20 @@ class Plot(QWidget):
         self.y_scale_fixed = False
         self.y_scale_height_offset = max(self.curve_outer_border, self.y_scale.tick_text_height_half) # px, from top
 
+        # new data only requests a repaint, the timer coalesces the requests
+        self.repaint_timer = QTimer(self)
+        self.repaint_timer.setSingleShot(True)
+        self.repaint_timer.setInterval(REPAINT_INTERVAL)
+        self.repaint_timer.timeout.connect(self.update_curves)
+
+        # canvas, border and y-scale only change on resize or scale change,
+        # keep them in a pixmap instead of redrawing them on every repaint.
+        # the x-scale moves with the data, it is drawn directly and only
+        # repainted if its ticks moved
+        self.chrome_pixmap = None
+        self.chrome_key = None
+        self.x_scale_layout = None # as last painted
+
         self.clear_graph()
 
     # override QWidget.sizeHint
@@ -357,9 +783,8 @@ class Plot(QWidget):
 
         QWidget.resizeEvent(self, event)
 
-    # override QWidget.paintEvent
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    # internal
+    def get_geometry(self):
         width = self.width()
         height = self.height()
 
@@ -370,10 +795,6 @@ class Plot(QWidget):
             curve_width = width - self.curve_outer_border - self.curve_outer_border
             curve_height = height - self.curve_outer_border - self.curve_outer_border
 
-        if DEBUG:
-            painter.fillRect(0, 0, width, height, Qt.green)
-
-        # fill canvas
         if self.scales_visible:
             canvas_x = self.y_scale.total_width + self.curve_to_scale - self.curve_outer_border
             canvas_y = self.y_scale_height_offset - self.curve_outer_border
@@ -384,19 +805,176 @@ class Plot(QWidget):
         canvas_width = self.curve_outer_border + curve_width + self.curve_outer_border
         canvas_height = self.curve_outer_border + curve_height + self.curve_outer_border
 
-        painter.fillRect(canvas_x, canvas_y, canvas_width, canvas_height, self.canvas_color)
+        return canvas_x, canvas_y, canvas_width, canvas_height, curve_width, curve_height
 
-        # draw cross hair at cursor position
-        if self.cross_hair_visible:
-            p = self.mapFromGlobal(QCursor.pos())
-            p_x = p.x()
-            p_y = p.y()
+    # internal
+    def get_chrome_key(self):
+        y_scale = self.y_scale
+
+        return (self.width(), self.height(), self.scales_visible,
+                y_scale.value_min, y_scale.value_max, y_scale.step_size,
+                y_scale.step_subdivision_count, y_scale.total_width,
+                y_scale.title_text_height)
+
+    # returns the visible time range as (x min, length). in live mode that is
+    # the stored history, otherwise the zoomed and panned range that is read
+    # from the history pyramids
+    def get_view(self):
+        if self.view_length_x == None:
+            if self.x_min != None:
+                return self.x_min, self.history_length_x
+            else:
+                return 0, self.history_length_x
 
-            if p_x >= canvas_x and p_x < canvas_x + canvas_width and \
-               p_y >= canvas_y and p_y < canvas_y + canvas_height:
-                painter.setPen(QPen(QColor(190, 190, 190), 1, Qt.DashLine))
-                painter.drawLine(canvas_x, p_y, canvas_x + canvas_width - 1, p_y)
-                painter.drawLine(p_x, canvas_y, p_x, canvas_y + canvas_height - 1)
+        if self.view_end_x != None:
+            view_end_x = self.view_end_x
+        elif self.x_max != None:
+            view_end_x = self.x_max
+        else:
+            view_end_x = 0
+
+        return view_end_x - self.view_length_x, self.view_length_x
+
+    # internal
+    def get_view_buckets(self, c):
+        view_x_min, view_length_x = self.get_view()
+        curve_width = self.get_geometry()[4]
+
+        return self.curves_history[c].get_buckets(view_x_min, view_x_min + view_length_x, max(curve_width, 1))
+
+    # internal
+    def get_view_y_min_max(self):
+        if self.view_length_x == None and not self.browsing:
+            return self.y_min, self.y_max
+
+        y_min = None
+        y_max = None
+
+        for c in range(len(self.curves_history)):
+            if not self.curves_visible[c]:
+                continue
+
+            for bucket in self.get_view_buckets(c):
+                if y_min == None or bucket[1] < y_min:
+                    y_min = bucket[1]
+
+                if y_max == None or bucket[2] > y_max:
+                    y_max = bucket[2]
+
+        return y_min, y_max
+
+    # internal
+    def set_view(self, view_length_x, view_end_x):
+        if view_length_x != None:
+            if self.browsing:
+                max_length_x = self.history_length_x
+            else:
+                max_length_x = HistoryPyramid.get_max_length()
+
+            view_length_x = min(max(view_length_x, MIN_VIEW_LENGTH), max_length_x)
+
+            if view_end_x == None and fuzzy_eq(view_length_x, self.history_length_x):
+                view_length_x = None
+
+        if view_end_x != None and self.x_max != None and view_end_x >= self.x_max:
+            view_end_x = None
+
+        self.view_length_x = view_length_x
+        self.view_end_x = view_end_x
+
+        self.update_y_min_max_scale()
+        self.update()
+
+    # internal
+    def get_view_x_at(self, p_x):
+        view_x_min, view_length_x = self.get_view()
+        canvas_x, canvas_y, canvas_width, canvas_height, curve_width, curve_height = self.get_geometry()
+
+        return view_x_min + float(p_x - canvas_x - self.curve_outer_border) / max(curve_width, 1) * view_length_x
+
+    # override QWidget.wheelEvent, zooms the time axis around the cursor
+    def wheelEvent(self, event):
+        view_x_min, view_length_x = self.get_view()
+
+        if event.delta() > 0:
+            new_length_x = view_length_x / 2.0
+        else:
+            new_length_x = view_length_x * 2.0
+
+        if not self.browsing and (self.view_length_x == None or self.view_end_x == None):
+            # keep following the newest data
+            self.set_view(new_length_x, None)
+        else:
+            anchor_x = self.get_view_x_at(event.x())
+            ratio = (view_x_min + view_length_x - anchor_x) / view_length_x
+
+            self.set_view(new_length_x, anchor_x + ratio * new_length_x)
+
+    # override QWidget.mousePressEvent, starts panning the time axis
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            view_x_min, view_length_x = self.get_view()
+
+            self.view_drag_start = (event.x(), view_x_min + view_length_x)
+
+    # override QWidget.mouseMoveEvent
+    def mouseMoveEvent(self, event):
+        if self.view_drag_start == None:
+            return
+
+        view_x_min, view_length_x = self.get_view()
+        curve_width = self.get_geometry()[4]
+        drag_x, drag_end_x = self.view_drag_start
+        delta_x = float(event.x() - drag_x) / max(curve_width, 1) * view_length_x
+
+        if delta_x != 0:
+            self.set_view(view_length_x, drag_end_x - delta_x)
+
+    # override QWidget.mouseReleaseEvent
+    def mouseReleaseEvent(self, event):
+        self.view_drag_start = None
+
+    # override QWidget.mouseDoubleClickEvent, returns to the live history
+    def mouseDoubleClickEvent(self, event):
+        self.set_view(None, None)
+
+    # internal
+    def update_curves(self):
+        if self.view_length_x != None:
+            self.update_y_min_max_scale()
+
+        # the curves are drawn on top of the cached canvas, only the canvas
+        # needs to be repainted as long as the scales did not change
+        if self.get_chrome_key() != self.chrome_key:
+            self.update()
+        else:
+            canvas_x, canvas_y, canvas_width, canvas_height = self.get_geometry()[:4]
+
+            self.update(canvas_x, canvas_y, canvas_width, canvas_height)
+
+            if self.scales_visible and self.get_x_scale_layout() != self.x_scale_layout:
+                x_scale_height = self.x_scale.total_height
+
+                self.update(0, self.height() - x_scale_height, self.width(), x_scale_height)
+
+    # internal
+    def get_x_scale_layout(self):
+        view_x_min, view_length_x = self.get_view()
+        factor_x = float(self.get_geometry()[4]) / view_length_x
+
+        return self.x_scale.get_layout(factor_x, view_x_min, view_length_x)
+
+    # internal
+    def draw_chrome(self, painter):
+        width = self.width()
+        height = self.height()
+        canvas_x, canvas_y, canvas_width, canvas_height, curve_width, curve_height = self.get_geometry()
+
+        if DEBUG:
+            painter.fillRect(0, 0, width, height, Qt.green)
+
+        # fill canvas
+        painter.fillRect(canvas_x, canvas_y, canvas_width, canvas_height, self.canvas_color)
 
         # draw canvas border
         if self.curve_outer_border > 0:
@@ -411,28 +989,70 @@ class Plot(QWidget):
                              curve_height,
                              Qt.cyan)
 
-        # draw scales
+        # draw y-scale, the x-scale is drawn by paintEvent
+        if self.scales_visible:
+            factor_y = float(curve_height - 1) / max(self.y_scale.value_max - self.y_scale.value_min, EPSILON) # -1 to accommodate the 1px width of the curve
+
+            self.draw_y_scale(painter, curve_height, factor_y)
+
+    # override QWidget.paintEvent
+    def paintEvent(self, event):
+        canvas_x, canvas_y, canvas_width, canvas_height, curve_width, curve_height = self.get_geometry()
+        chrome_key = self.get_chrome_key()
+
+        if self.chrome_pixmap == None or chrome_key != self.chrome_key:
+            self.chrome_pixmap = QPixmap(self.size())
+            self.chrome_pixmap.fill(Qt.transparent)
+            self.chrome_key = chrome_key
+
+            chrome_painter = QPainter(self.chrome_pixmap)
+            self.draw_chrome(chrome_painter)
+            chrome_painter.end()
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.chrome_pixmap)
+
+        if self.scales_visible:
+            self.x_scale_layout = self.get_x_scale_layout()
+
+            self.draw_x_scale(painter, self.x_scale_layout)
+
+        # draw cross hair at cursor position, inside the canvas border
+        if self.cross_hair_visible:
+            p = self.mapFromGlobal(QCursor.pos())
+            p_x = p.x()
+            p_y = p.y()
+            border = min(self.curve_outer_border, 1)
+
+            if p_x >= canvas_x + border and p_x < canvas_x + canvas_width - border and \
+               p_y >= canvas_y + border and p_y < canvas_y + canvas_height - border:
+                painter.setPen(QPen(QColor(190, 190, 190), 1, Qt.DashLine))
+                painter.drawLine(canvas_x + border, p_y, canvas_x + canvas_width - 1 - border, p_y)
+                painter.drawLine(p_x, canvas_y + border, p_x, canvas_y + canvas_height - 1 - border)
+                painter.setPen(Qt.black)
+
         y_min_scale = self.y_scale.value_min
         y_max_scale = self.y_scale.value_max
 
-        factor_x = float(curve_width) / self.history_length_x
-        factor_y = float(curve_height - 1) / max(y_max_scale - y_min_scale, EPSILON) # -1 to accommodate the 1px width of the curve
+        view_x_min, view_length_x = self.get_view()
 
-        if self.scales_visible:
-            self.draw_x_scale(painter, factor_x)
-            self.draw_y_scale(painter, curve_height, factor_y)
+        factor_x = float(curve_width) / view_length_x
+        factor_y = float(curve_height - 1) / max(y_max_scale - y_min_scale, EPSILON) # -1 to accommodate the 1px width of the curve
 
         # draw curves
         if self.x_min != None and self.x_max != None:
-            x_min = self.x_min
+            x_min = view_x_min
             x_max = self.x_max
 
-            if self.scales_visible:
+            if self.scales_visible or self.view_length_x != None:
                 curve_x_offset = 0
             else:
                 curve_x_offset = round((self.history_length_x - (x_max - x_min)) * factor_x)
 
             painter.save()
+            # partial repaints only cover the canvas, clip the curves to it to
+            # get the same result for full repaints
+            painter.setClipRect(canvas_x, canvas_y, canvas_width, canvas_height)
             painter.translate(canvas_x + self.curve_outer_border + curve_x_offset,
                               canvas_y + self.curve_outer_border + curve_height - 1 + self.curve_y_offset) # -1 to accommodate the 1px width of the curve
             painter.scale(factor_x, -factor_y)
@@ -442,21 +1062,55 @@ class Plot(QWidget):
                 if not self.curves_visible[c]:
                     continue
 
-                curve_x = self.curves_x[c]
-                curve_y = self.curves_y[c]
-                path = QPainterPath()
-                lineTo = path.lineTo
+                if self.browsing:
+                    self.draw_history(painter, c)
+                    continue
 
-                path.moveTo(curve_x[0], curve_y[0])
+                if len(self.curves_x[c]) == 0:
+                    continue
 
-                for i in xrange(1, len(curve_x)):
-                    lineTo(curve_x[i], curve_y[i])
+                if self.view_length_x != None and self.curves_x[c][0] > view_x_min:
+                    # the live history does not cover the view, draw the
+                    # min/max envelope and the mean from the history pyramid
+                    self.draw_history(painter, c)
+                    continue
+
+                path = self.curves_decimator[c].get_path(self.curves_x[c], self.curves_y[c], factor_x)
+
+                if path == None:
+                    continue
 
                 painter.setPen(self.plots[c][1])
                 painter.drawPath(path)
 
             painter.restore()
 
+    # internal
+    def draw_history(self, painter, c):
+        buckets = self.get_view_buckets(c)
+
+        if len(buckets) == 0:
+            return
+
+        envelope = QPainterPath()
+        mean = QPainterPath()
+
+        envelope.moveTo(buckets[0][0], buckets[0][1])
+        mean.moveTo(buckets[0][0], buckets[0][3])
+
+        for x, y_min, y_max, y_mean in buckets:
+            envelope.lineTo(x, y_min)
+            envelope.lineTo(x, y_max)
+            mean.lineTo(x, y_mean)
+
+        envelope_color = QColor(self.plots[c][1])
+        envelope_color.setAlpha(80)
+
+        painter.setPen(envelope_color)
+        painter.drawPath(envelope)
+        painter.setPen(self.plots[c][1])
+        painter.drawPath(mean)
+
     def set_fixed_y_scale(self, value_min, value_max, step_size, step_division_count):
         self.y_scale_fixed = True
         self.y_scale.update_tick_config(value_min, value_max, step_size, step_division_count)
@@ -464,19 +1118,16 @@ class Plot(QWidget):
     def get_legend_offset_y(self): # px, from top
         return max(self.y_scale.tick_text_height_half - self.curve_outer_border, 0)
 
-    def draw_x_scale(self, painter, factor):
+    def draw_x_scale(self, painter, layout):
         offset_x = self.y_scale.total_width + self.curve_to_scale
         offset_y = self.height() - self.x_scale.total_height
 
-        if self.x_min != None:
-            x_min = self.x_min
-        else:
-            x_min = 0
+        factor_x = float(self.get_geometry()[4]) / self.get_view()[1]
 
         painter.save()
         painter.translate(offset_x, offset_y)
 
-        self.x_scale.draw(painter, factor, x_min, self.history_length_x)
+        self.x_scale.draw(painter, factor_x, layout)
 
         painter.restore()
 
@@ -521,6 +1172,8 @@ class Plot(QWidget):
 
         self.curves_x[c].append(x)
         self.curves_y[c].append(y)
+        self.curves_y_window[c].append(y)
+        self.curves_history[c].add(x, y)
 
         if self.curves_x_min[c] == None:
             self.curves_x_min[c] = x
@@ -540,8 +1193,9 @@ class Plot(QWidget):
 
         if len(self.curves_x[c]) > 0:
             if (self.curves_x[c][-1] - self.curves_x[c][0]) >= self.history_length_x:
-                self.curves_x[c] = self.curves_x[c][self.curve_motion_granularity:]
-                self.curves_y[c] = self.curves_y[c][self.curve_motion_granularity:]
+                self.curves_x[c].drop(self.curve_motion_granularity)
+                self.curves_y[c].drop(self.curve_motion_granularity)
+                self.curves_y_window[c].drop(self.curve_motion_granularity)
 
                 if len(self.curves_x[c]) > 0:
                     self.curves_x_min[c] = self.curves_x[c][0]
@@ -553,8 +1207,8 @@ class Plot(QWidget):
                 else:
                     self.curves_x_max[c] = None
 
-                self.curves_y_min[c] = min(self.curves_y[c])
-                self.curves_y_max[c] = max(self.curves_y[c])
+                self.curves_y_min[c] = self.curves_y_window[c].get_min()
+                self.curves_y_max[c] = self.curves_y_window[c].get_max()
 
                 self.update_x_min_max_y_min_max()
             else:
@@ -564,7 +1218,11 @@ class Plot(QWidget):
         if self.curves_visible[c] and (last_y_min != self.y_min or last_y_max != self.y_max):
             self.update_y_min_max_scale()
 
-        self.update()
+        self.schedule_update()
+
+    def schedule_update(self):
+        if not self.repaint_timer.isActive():
+            self.repaint_timer.start()
 
     def update_x_min_max_y_min_max(self):
         self.x_min = min(self.curves_x_min)
@@ -581,12 +1239,11 @@ class Plot(QWidget):
         if self.y_scale_fixed:
             return
 
-        if self.y_min == None or self.y_max == None:
+        y_min, y_max = self.get_view_y_min_max()
+
+        if y_min == None or y_max == None:
             y_min = -1.0
             y_max = 1.0
-        else:
-            y_min = self.y_min
-            y_max = self.y_max
 
         delta_y = abs(y_max - y_min)
 
@@ -657,17 +1314,42 @@ class Plot(QWidget):
 
         self.curves_visible[c] = show
 
-        self.update_x_min_max_y_min_max()
-
-        if last_y_min != self.y_min or last_y_max != self.y_max:
+        if self.browsing:
+            # the y range comes from the visible buckets
             self.update_y_min_max_scale()
+        else:
+            self.update_x_min_max_y_min_max()
+
+            if last_y_min != self.y_min or last_y_max != self.y_max:
+                self.update_y_min_max_scale()
 
         self.update()
 
+    # shows recorded data instead of live data. histories has one
+    # DataFileHistory per curve, x goes from 0 to length_x. the whole
+    # recording takes the place of the live history, so zoom, pan and
+    # double click work the same way
+    def browse(self, histories, length_x):
+        self.clear_graph()
+
+        self.browsing = True
+        self.curves_history = histories
+        self.history_length_x = max(length_x, MIN_VIEW_LENGTH)
+        self.x_min = 0.0
+        self.x_max = length_x
+        self.y_type = float
+
+        self.set_view(None, None)
+
     def clear_graph(self):
+        self.history_length_x = 20 # seconds
+        self.browsing = False
         self.curves_visible = [] # per curve visibility
         self.curves_x = [] # per curve x values
         self.curves_y = [] # per curve y values
+        self.curves_y_window = [] # per curve sliding minimum and maximum y value
+        self.curves_decimator = [] # per curve decimated path
+        self.curves_history = [] # per curve downsampled long-term history
         self.curves_x_min = [] # per curve minimum x value
         self.curves_x_max = [] # per curve maximum x value
         self.curves_y_min = [] # per curve minimum y value
@@ -677,11 +1359,15 @@ class Plot(QWidget):
         self.y_min = None # minimum y value over all curves
         self.y_max = None # maximum y value over all curves
         self.y_type = None
+        self.view_end_x = None
 
         for plot in self.plots:
             self.curves_visible.append(True)
-            self.curves_x.append([])
-            self.curves_y.append([])
+            self.curves_x.append(RingBuffer())
+            self.curves_y.append(RingBuffer())
+            self.curves_y_window.append(SlidingMinMax())
+            self.curves_decimator.append(CurveDecimator())
+            self.curves_history.append(HistoryPyramid())
             self.curves_x_min.append(None)
             self.curves_x_max.append(None)
             self.curves_y_min.append(None)
@@ -698,6 +1384,8 @@ class PlotWidget(QWidget):
 
         self.setMinimumSize(300, 250)
 
+        self.stop_time = None # see stop
+        self.time_base = None # timestamp of x = 0
         self.stop = True
         self.plot = Plot(self, y_scale_title_text, plots, scales_visible,
                          curve_outer_border_visible, curve_motion_granularity, canvas_color)
@@ -751,11 +1439,20 @@ class PlotWidget(QWidget):
         if clear_button == None:
             vlayout.addWidget(self.clear_button)
 
-        self.counter = 0
         self.update_funcs = []
+        self.curves_pushed = [] # per curve, True if data got pushed since the last timer tick
+        self.recording_source = to_text(y_scale_title_text) # set_recording_source prefixes the plugin
+        self.recording_curves = [] # per curve name for the data recorder
 
+        # a curve without update function is fed by push() instead of polling
         for plot in plots:
             self.update_funcs.append(plot[2])
+            self.curves_pushed.append(False)
+
+            if len(plot[0]) > 0:
+                self.recording_curves.append(to_text(plot[0]))
+            else:
+                self.recording_curves.append(to_text(y_scale_title_text))
 
         if external_timer == None:
             self.timer = QTimer(self)
@@ -787,20 +1484,385 @@ class PlotWidget(QWidget):
 
                     plot_button.setMinimumSize(size)
 
+    # plugins set stop while their tab is not shown. the time axis leaves
+    # out the stopped time, otherwise the curves would jump ahead by it on
+    # restart and the newest data would be off the canvas for a while
+    @property
+    def stop(self):
+        return self.stop_time != None
+
+    @stop.setter
+    def stop(self, stop):
+        if stop:
+            if self.stop_time == None:
+                self.stop_time = monotonic()
+        elif self.stop_time != None:
+            if self.time_base != None:
+                self.time_base += monotonic() - self.stop_time
+
+            self.stop_time = None
+
+    # internal
+    def get_x(self, timestamp):
+        if self.time_base == None:
+            self.time_base = timestamp
+
+        return timestamp - self.time_base
+
+    # internal
+    def add_data(self, c, x, value):
+        self.plot.add_data(c, x, value)
+
+        if data_recorder.recording:
+            data_recorder.record(self.recording_source, self.recording_curves[c], self.time_base + x, value)
+
+    def set_recording_source(self, prefix):
+        self.recording_source = u'{0} {1}'.format(to_text(prefix), to_text(self.plot.y_scale.title_text)).strip()
+
     # internal
     def add_new_data(self):
         if self.stop:
             return
 
+        x = self.get_x(monotonic())
+
         for i, update_func in enumerate(self.update_funcs):
-            value = update_func()
+            if update_func == None:
+                # keep the curve moving while no new data is pushed, by
+                # repeating its last value
+                if not self.curves_pushed[i] and len(self.plot.curves_y[i]) > 0:
+                    self.plot.add_data(i, max(x, self.plot.curves_x[i][-1]), self.plot.curves_y[i][-1])
 
-            if value != None:
-                self.plot.add_data(i, self.counter / 10.0, value)
+                self.curves_pushed[i] = False
+            else:
+                value = update_func()
 
-        self.counter += 1
+                if value != None:
+                    self.add_data(i, x, value)
+
+    # Adds values to curve c. The timestamp is in seconds from the monotonic
+    # clock of this module, None means now. If values is a list then timestamp
+    # is either a list of the same length or the timestamp of the last value,
+    # in which case the values are spread evenly since the previous push.
+    # Has to be called from the GUI thread, e.g. from a Qt signal handler.
+    def push(self, c, timestamp, values):
+        if self.stop:
+            return
+
+        if timestamp == None:
+            timestamp = monotonic()
+
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+            timestamp = [timestamp]
+
+        if len(values) == 0:
+            return
+
+        curve_x = self.plot.curves_x[c]
+
+        if len(curve_x) > 0:
+            last_x = curve_x[-1]
+        else:
+            last_x = None
+
+        if isinstance(timestamp, (list, tuple)):
+            xs = [self.get_x(t) for t in timestamp]
+        else:
+            x = self.get_x(timestamp)
+
+            if last_x == None or last_x >= x:
+                xs = [x] * len(values)
+            else:
+                step = (x - last_x) / len(values)
+                xs = [last_x + step * (i + 1) for i in range(len(values))]
+
+        for x, value in zip(xs, values):
+            if value == None:
+                continue
+
+            # x has to grow constantly, clamp out-of-order timestamps
+            if last_x != None and x < last_x:
+                x = last_x
+
+            self.add_data(c, x, value)
+            last_x = x
+
+        self.curves_pushed[c] = True
+
+    # Shows the given channels of a DataFileReader, one per plot. The x axis
+    # starts at the first sample of the recording.
+    def browse(self, reader, channels):
+        time_range = reader.get_time_range()
+
+        if time_range == None:
+            time_range = (0.0, 0.0)
+
+        histories = []
+
+        for channel in channels:
+            histories.append(DataFileHistory(reader, channel, time_range[0]))
+
+        self.stop = True
+        self.time_base = time_range[0]
+        self.plot.browse(histories, time_range[1] - time_range[0])
 
     # internal
     def clear_clicked(self):
         self.plot.clear_graph()
-        self.counter = 0
+        self.time_base = None
+
+class SparklineWidget(QWidget):
+    """Strip chart of small, independently scaled traces stacked in lanes.
+    All lanes share one time axis buffer and are drawn in one paint pass,
+    which is a lot cheaper than one PlotWidget per trace"""
+
+    def __init__(self, lanes, clear_button=None, parent=None,
+                 curve_motion_granularity=1, external_timer=None, lane_names=None):
+        QWidget.__init__(self, parent)
+
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMinimumSize(100, 15 * len(lanes))
+
+        self.stop_time = None # see stop
+        self.time_base = None # timestamp of x = 0
+        self.stop = True
+        self.lanes = lanes # per lane: [curve color, canvas color, update function]
+        self.history_length_x = 20 # seconds
+        self.curve_motion_granularity = curve_motion_granularity
+        self.pushed = False # True if data got pushed since the last timer tick
+        self.lane_grid = None
+        self.lane_grid_first_row = 0
+        self.recording_source = u''
+
+        if lane_names != None:
+            self.recording_curves = [to_text(name) for name in lane_names]
+        else:
+            self.recording_curves = [u'Lane {0}'.format(i) for i in range(len(lanes))]
+
+        # lanes without update function are fed by push() instead of polling
+        self.polled = False
+
+        for lane in lanes:
+            if lane[2] != None:
+                self.polled = True
+
+        if clear_button != None:
+            clear_button.clicked.connect(self.clear_graph)
+
+        self.repaint_timer = QTimer(self)
+        self.repaint_timer.setSingleShot(True)
+        self.repaint_timer.setInterval(REPAINT_INTERVAL)
+        self.repaint_timer.timeout.connect(self.update)
+
+        self.clear_graph()
+
+        if external_timer == None:
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.add_new_data)
+            self.timer.start(100)
+        else:
+            # assuming that the external timer runs with 100ms interval
+            external_timer.timeout.connect(self.add_new_data)
+
+    # Aligns the lanes to the rows of a QGridLayout that the widget spans,
+    # starting at first_row. Otherwise the lanes split the height evenly.
+    def align_lanes_to_grid(self, grid, first_row):
+        self.lane_grid = grid
+        self.lane_grid_first_row = first_row
+        self.update()
+
+    # internal
+    def get_lane_rects(self):
+        count = len(self.lanes)
+        width = self.width()
+        height = self.height()
+        rects = []
+
+        if self.lane_grid != None:
+            for i in range(count):
+                cell = self.lane_grid.cellRect(self.lane_grid_first_row + i, 0)
+
+                if not cell.isValid():
+                    rects = []
+                    break
+
+                rects.append((0, cell.y() - self.y(), width, cell.height()))
+
+        if len(rects) == 0:
+            for i in range(count):
+                top = height * i // count
+
+                rects.append((0, top, width, height * (i + 1) // count - top))
+
+        return rects
+
+    # override QWidget.paintEvent
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        x_min = self.x_min
+
+        for i, (lane_x, lane_y, lane_width, lane_height) in enumerate(self.get_lane_rects()):
+            painter.fillRect(lane_x, lane_y, lane_width, lane_height, self.lanes[i][1])
+
+            if x_min == None or lane_height < 2:
+                continue
+
+            y_min = self.lanes_y_window[i].get_min()
+            y_max = self.lanes_y_window[i].get_max()
+
+            if y_min == None:
+                continue
+
+            # center flat traces
+            if y_max - y_min < EPSILON:
+                y_min -= 1.0
+                y_max += 1.0
+
+            factor_x = float(lane_width) / self.history_length_x
+            factor_y = float(lane_height - 1) / (y_max - y_min) # -1 to accommodate the 1px width of the curve
+            path = self.lanes_decimator[i].get_path(self.curve_x, self.lanes_y[i], factor_x)
+
+            if path == None:
+                continue
+
+            # right-align the curve while the history is not full yet
+            curve_x_offset = round((self.history_length_x - (self.curve_x[-1] - x_min)) * factor_x)
+
+            painter.save()
+            painter.setClipRect(lane_x, lane_y, lane_width, lane_height)
+            painter.translate(lane_x + curve_x_offset, lane_y + lane_height - 1) # -1 to accommodate the 1px width of the curve
+            painter.scale(factor_x, -factor_y)
+            painter.translate(-x_min, -y_min)
+            painter.setPen(self.lanes[i][0])
+            painter.drawPath(path)
+            painter.restore()
+
+    # plugins set stop while their tab is not shown. the time axis leaves
+    # out the stopped time, otherwise the curves would jump ahead by it on
+    # restart and the newest data would be off the canvas for a while
+    @property
+    def stop(self):
+        return self.stop_time != None
+
+    @stop.setter
+    def stop(self, stop):
+        if stop:
+            if self.stop_time == None:
+                self.stop_time = monotonic()
+        elif self.stop_time != None:
+            if self.time_base != None:
+                self.time_base += monotonic() - self.stop_time
+
+            self.stop_time = None
+
+    # internal
+    def get_x(self, timestamp):
+        if self.time_base == None:
+            self.time_base = timestamp
+
+        return timestamp - self.time_base
+
+    # internal
+    def add_data(self, x, values):
+        curve_x = self.curve_x
+
+        # x has to grow constantly, clamp out-of-order timestamps
+        if len(curve_x) > 0 and x < curve_x[-1]:
+            x = curve_x[-1]
+
+        curve_x.append(x)
+
+        for i, value in enumerate(values):
+            lane_y = self.lanes_y[i]
+
+            # hold the last value of lanes without new data
+            if value == None:
+                if len(lane_y) > 0:
+                    value = lane_y[-1]
+                else:
+                    value = 0.0
+
+            value = float(value)
+
+            lane_y.append(value)
+            self.lanes_y_window[i].append(value)
+
+        if curve_x[-1] - curve_x[0] >= self.history_length_x:
+            curve_x.drop(self.curve_motion_granularity)
+
+            for i in range(len(self.lanes)):
+                self.lanes_y[i].drop(self.curve_motion_granularity)
+                self.lanes_y_window[i].drop(self.curve_motion_granularity)
+
+        self.x_min = curve_x[0]
+
+        if not self.repaint_timer.isActive():
+            self.repaint_timer.start()
+
+    # internal
+    def add_new_data(self):
+        if self.stop:
+            return
+
+        x = self.get_x(monotonic())
+
+        if self.polled:
+            values = []
+
+            for lane in self.lanes:
+                if lane[2] != None:
+                    values.append(lane[2]())
+                else:
+                    values.append(None)
+
+            self.add_data(x, values)
+            self.record(x, values)
+        elif not self.pushed and len(self.curve_x) > 0:
+            # keep the lanes moving while no new data is pushed
+            self.add_data(x, [None] * len(self.lanes))
+
+        self.pushed = False
+
+    # Adds one value per lane, None keeps the last value of a lane. The
+    # timestamp is in seconds from the monotonic clock of this module, None
+    # means now. Has to be called from the GUI thread.
+    def push(self, timestamp, values):
+        if self.stop:
+            return
+
+        if timestamp == None:
+            timestamp = monotonic()
+
+        x = self.get_x(timestamp)
+
+        self.add_data(x, values)
+        self.record(x, values)
+        self.pushed = True
+
+    # internal
+    def record(self, x, values):
+        if not data_recorder.recording:
+            return
+
+        for i, value in enumerate(values):
+            if value != None:
+                data_recorder.record(self.recording_source, self.recording_curves[i], self.time_base + x, value)
+
+    def set_recording_source(self, prefix):
+        self.recording_source = to_text(prefix)
+
+    def clear_graph(self):
+        self.curve_x = RingBuffer() # x values shared by all lanes
+        self.lanes_y = [] # per lane y values
+        self.lanes_y_window = [] # per lane sliding minimum and maximum y value
+        self.lanes_decimator = [] # per lane decimated path
+        self.x_min = None
+        self.time_base = None
+
+        for lane in self.lanes:
+            self.lanes_y.append(RingBuffer())
+            self.lanes_y_window.append(SlidingMinMax())
+            self.lanes_decimator.append(CurveDecimator())
+
+        self.update()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+placeholder.py: Stand-in for a Plugin that was not built yet
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+from PyQt4.QtGui import QVBoxLayout
+
+from brickv.plugin_system.plugin_base import PluginBase
+
+class Placeholder(PluginBase):
+    """
+    Takes the place of a plugin in the device info and its tab until the
+    tab is shown for the first time. It has the device object, the name and
+    the URL part of the plugin, but none of its widgets. The MainWindow
+    replaces it with the plugin_class instance on demand.
+    """
+
+    def __init__(self, plugin_class, device_class, *args):
+        # PluginBase.__init__ asks is_hardware_version_relevant for the name
+        self.plugin_class = plugin_class
+
+        PluginBase.__init__(self, device_class, *args)
+
+        QVBoxLayout(self)
+
+    # unbound method on Python 2, plain function on Python 3. both only
+    # depend on the PluginBase attributes that are set up here as well
+    def call_plugin_class(self, name):
+        method = getattr(self.plugin_class, name)
+
+        return getattr(method, '__func__', method)(self)
+
+    def is_hardware_version_relevant(self):
+        return self.call_plugin_class('is_hardware_version_relevant')
+
+    def get_url_part(self):
+        return self.call_plugin_class('get_url_part')
+
+    @staticmethod
+    def has_device_identifier(device_identifier):
+        return False
@@ -26,6 +26,8 @@ import sys
 import traceback
 from PyQt4.QtGui import QWidget
 from brickv.bindings.ip_connection import IPConnection
+from brickv.callback_emulator import CallbackEmulator
+from brickv.plot_widget import PlotWidget, SparklineWidget
 
 class PluginBase(QWidget, object):
     PLUGIN_STATE_STOPPED = 0
@@ -44,6 +46,7 @@ class PluginBase(QWidget, object):
         self.firmware_version = firmware_version
         self.error_count = 0
         self.actions = None
+        self.on_screen = True
 
         if device_class is not None:
             self.base_name = device_class.DEVICE_DISPLAY_NAME
@@ -65,6 +68,11 @@ class PluginBase(QWidget, object):
     def start_plugin(self):
         # only consider starting the plugin, if it's stopped
         if self.plugin_state == PluginBase.PLUGIN_STATE_STOPPED:
+            # name the plot data for the data recorder, the plot widgets are
+            # created by the inheriting class after PluginBase.__init__
+            for plot_widget in self.get_plot_widgets():
+                plot_widget.set_recording_source('{0} {1}'.format(self.base_name, self.uid))
+
             if self.ipcon.get_connection_state() == IPConnection.CONNECTION_STATE_PENDING:
                 # if connection is pending, the just mark it as paused. it'll
                 # started later then
@@ -159,6 +167,35 @@ class PluginBase(QWidget, object):
 
                 setattr(self, member, None)"""
 
+    def set_on_screen(self, on_screen):
+        # adaptive polling: CallbackEmulators poll at a low rate while the
+        # plugin is not on screen, e.g. its window is minimized. being put on
+        # screen again also restores the requested periods of idle emulators.
+        # every focus change reports the plugin as on screen, only react to
+        # actual changes, each one can set callback periods on the device.
+        # getting focus is handled by got_focus
+        if self.on_screen == on_screen:
+            return
+
+        self.on_screen = on_screen
+
+        for emulator in self.get_callback_emulators():
+            emulator.set_on_screen(on_screen)
+
+    def got_focus(self):
+        # snap back to the requested periods if the plugin gets focus. only
+        # idle emulators are woken, so repeated focus changes don't set the
+        # callback periods on the device again and again
+        for emulator in self.get_callback_emulators():
+            if emulator.idle_level > 0:
+                emulator.wake()
+
+    def get_callback_emulators(self):
+        return [value for value in self.__dict__.values() if isinstance(value, CallbackEmulator)]
+
+    def get_plot_widgets(self):
+        return [value for value in self.__dict__.values() if isinstance(value, (PlotWidget, SparklineWidget))]
+
     def increase_error_count(self):
         self.error_count += 1
         if self.label_timeouts:
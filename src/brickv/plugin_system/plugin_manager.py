@@ -24,20 +24,54 @@ Boston, MA 02111-1307, USA.
 
 from brickv.plugin_system.error import Error
 from brickv.plugin_system.unknown import Unknown
-from brickv.plugin_system.plugins import device_classes
+from brickv.plugin_system.placeholder import Placeholder
+from brickv.plugin_system.plugins import device_modules, device_bindings
 import traceback
 
 class PluginManager(object):
     def __init__(self):
-        self.plugins = device_classes
+        self.plugins = {} # device identifier -> plugin class, imported on first use
+
+    # returns None for unknown devices
+    def get_plugin_class(self, device_identifier):
+        plugin = self.plugins.get(device_identifier)
+
+        if plugin == None:
+            module_name = device_modules.get(device_identifier)
+
+            if module_name == None:
+                return None
+
+            plugin = __import__(module_name, globals(), locals(), ['device_class']).device_class
+            self.plugins[device_identifier] = plugin
+
+        return plugin
 
     def get_plugin(self, device_identifier, ipcon, uid, hardware_version, firmware_version):
-        for plugin in self.plugins:
-            if plugin.has_device_identifier(device_identifier):
-                try:
-                    return plugin(ipcon, uid, hardware_version, firmware_version)
-                except:
-                    traceback.print_exc()
-                    return Error(ipcon, uid, hardware_version, firmware_version)
-
-        return Unknown(ipcon, uid, hardware_version, firmware_version)
+        try:
+            plugin = self.get_plugin_class(device_identifier)
+
+            if plugin == None:
+                return Unknown(ipcon, uid, hardware_version, firmware_version)
+
+            return plugin(ipcon, uid, hardware_version, firmware_version)
+        except:
+            traceback.print_exc()
+            return Error(ipcon, uid, hardware_version, firmware_version)
+
+    # returns None for unknown devices and plugins that fail to import, call
+    # get_plugin for them right away to get an Unknown or Error plugin
+    def get_placeholder(self, device_identifier, ipcon, uid, hardware_version, firmware_version):
+        binding = device_bindings.get(device_identifier)
+
+        if binding == None:
+            return None
+
+        try:
+            plugin = self.get_plugin_class(device_identifier)
+            device_class = getattr(__import__(binding[0], globals(), locals(), [binding[1]]), binding[1])
+
+            return Placeholder(plugin, device_class, ipcon, uid, hardware_version, firmware_version)
+        except:
+            traceback.print_exc()
+            return None
@@ -1,139 +1,145 @@
-from brickv.plugin_system.plugins.ac_current import device_class as ac_current
-from brickv.plugin_system.plugins.accelerometer import device_class as accelerometer
-from brickv.plugin_system.plugins.ambient_light import device_class as ambient_light
-from brickv.plugin_system.plugins.ambient_light_v2 import device_class as ambient_light_v2
-from brickv.plugin_system.plugins.analog_in import device_class as analog_in
-from brickv.plugin_system.plugins.analog_in_v2 import device_class as analog_in_v2
-from brickv.plugin_system.plugins.analog_out import device_class as analog_out
-from brickv.plugin_system.plugins.analog_out_v2 import device_class as analog_out_v2
-from brickv.plugin_system.plugins.barometer import device_class as barometer
-from brickv.plugin_system.plugins.co2 import device_class as co2
-from brickv.plugin_system.plugins.color import device_class as color
-from brickv.plugin_system.plugins.current12 import device_class as current12
-from brickv.plugin_system.plugins.current25 import device_class as current25
-from brickv.plugin_system.plugins.dc import device_class as dc
-from brickv.plugin_system.plugins.distance_ir import device_class as distance_ir
-from brickv.plugin_system.plugins.distance_us import device_class as distance_us
-from brickv.plugin_system.plugins.dual_button import device_class as dual_button
-from brickv.plugin_system.plugins.dual_relay import device_class as dual_relay
-from brickv.plugin_system.plugins.dust_detector import device_class as dust_detector
-from brickv.plugin_system.plugins.gas_detector import device_class as gas_detector
-from brickv.plugin_system.plugins.gps import device_class as gps
-from brickv.plugin_system.plugins.hall_effect import device_class as hall_effect
-from brickv.plugin_system.plugins.heart_rate import device_class as heart_rate
-from brickv.plugin_system.plugins.humidity import device_class as humidity
-from brickv.plugin_system.plugins.imu import device_class as imu
-from brickv.plugin_system.plugins.imu_v2 import device_class as imu_v2
-from brickv.plugin_system.plugins.industrial_analog_out import device_class as industrial_analog_out
-from brickv.plugin_system.plugins.industrial_digital_in_4 import device_class as industrial_digital_in_4
-from brickv.plugin_system.plugins.industrial_digital_out_4 import device_class as industrial_digital_out_4
-from brickv.plugin_system.plugins.industrial_dual_0_20ma import device_class as industrial_dual_0_20ma
-from brickv.plugin_system.plugins.industrial_dual_analog_in import device_class as industrial_dual_analog_in
-from brickv.plugin_system.plugins.industrial_quad_relay import device_class as industrial_quad_relay
-from brickv.plugin_system.plugins.io16 import device_class as io16
-from brickv.plugin_system.plugins.io4 import device_class as io4
-from brickv.plugin_system.plugins.joystick import device_class as joystick
-from brickv.plugin_system.plugins.laser_range_finder import device_class as laser_range_finder
-from brickv.plugin_system.plugins.lcd_16x2 import device_class as lcd_16x2
-from brickv.plugin_system.plugins.lcd_20x4 import device_class as lcd_20x4
-from brickv.plugin_system.plugins.led_strip import device_class as led_strip
-from brickv.plugin_system.plugins.line import device_class as line
-from brickv.plugin_system.plugins.linear_poti import device_class as linear_poti
-from brickv.plugin_system.plugins.load_cell import device_class as load_cell
-from brickv.plugin_system.plugins.master import device_class as master
-from brickv.plugin_system.plugins.moisture import device_class as moisture
-from brickv.plugin_system.plugins.motion_detector import device_class as motion_detector
-from brickv.plugin_system.plugins.multi_touch import device_class as multi_touch
-from brickv.plugin_system.plugins.nfc_rfid import device_class as nfc_rfid
-from brickv.plugin_system.plugins.oled_128x64 import device_class as oled_128x64
-from brickv.plugin_system.plugins.oled_64x48 import device_class as oled_64x48
-from brickv.plugin_system.plugins.ozone import device_class as ozone
-from brickv.plugin_system.plugins.piezo_buzzer import device_class as piezo_buzzer
-from brickv.plugin_system.plugins.piezo_speaker import device_class as piezo_speaker
-from brickv.plugin_system.plugins.ptc import device_class as ptc
-from brickv.plugin_system.plugins.red import device_class as red
-from brickv.plugin_system.plugins.remote_switch import device_class as remote_switch
-from brickv.plugin_system.plugins.rotary_encoder import device_class as rotary_encoder
-from brickv.plugin_system.plugins.rotary_poti import device_class as rotary_poti
-from brickv.plugin_system.plugins.rs232 import device_class as rs232
-from brickv.plugin_system.plugins.segment_display_4x7 import device_class as segment_display_4x7
-from brickv.plugin_system.plugins.servo import device_class as servo
-from brickv.plugin_system.plugins.solid_state_relay import device_class as solid_state_relay
-from brickv.plugin_system.plugins.sound_intensity import device_class as sound_intensity
-from brickv.plugin_system.plugins.stepper import device_class as stepper
-from brickv.plugin_system.plugins.temperature import device_class as temperature
-from brickv.plugin_system.plugins.temperature_ir import device_class as temperature_ir
-from brickv.plugin_system.plugins.tilt import device_class as tilt
-from brickv.plugin_system.plugins.voltage import device_class as voltage
-from brickv.plugin_system.plugins.voltage_current import device_class as voltage_current
+# generated by build_plugin_list.py, maps device identifiers to plugin
+# packages. PluginManager imports a plugin when its device shows up
+device_modules = {
+    257: 'brickv.plugin_system.plugins.ac_current',
+    250: 'brickv.plugin_system.plugins.accelerometer',
+    21: 'brickv.plugin_system.plugins.ambient_light',
+    259: 'brickv.plugin_system.plugins.ambient_light_v2',
+    219: 'brickv.plugin_system.plugins.analog_in',
+    251: 'brickv.plugin_system.plugins.analog_in_v2',
+    220: 'brickv.plugin_system.plugins.analog_out',
+    256: 'brickv.plugin_system.plugins.analog_out_v2',
+    221: 'brickv.plugin_system.plugins.barometer',
+    262: 'brickv.plugin_system.plugins.co2',
+    243: 'brickv.plugin_system.plugins.color',
+    23: 'brickv.plugin_system.plugins.current12',
+    24: 'brickv.plugin_system.plugins.current25',
+    11: 'brickv.plugin_system.plugins.dc',
+    25: 'brickv.plugin_system.plugins.distance_ir',
+    229: 'brickv.plugin_system.plugins.distance_us',
+    230: 'brickv.plugin_system.plugins.dual_button',
+    26: 'brickv.plugin_system.plugins.dual_relay',
+    260: 'brickv.plugin_system.plugins.dust_detector',
+    252: 'brickv.plugin_system.plugins.gas_detector',
+    222: 'brickv.plugin_system.plugins.gps',
+    240: 'brickv.plugin_system.plugins.hall_effect',
+    245: 'brickv.plugin_system.plugins.heart_rate',
+    27: 'brickv.plugin_system.plugins.humidity',
+    16: 'brickv.plugin_system.plugins.imu',
+    18: 'brickv.plugin_system.plugins.imu_v2',
+    258: 'brickv.plugin_system.plugins.industrial_analog_out',
+    223: 'brickv.plugin_system.plugins.industrial_digital_in_4',
+    224: 'brickv.plugin_system.plugins.industrial_digital_out_4',
+    228: 'brickv.plugin_system.plugins.industrial_dual_0_20ma',
+    249: 'brickv.plugin_system.plugins.industrial_dual_analog_in',
+    225: 'brickv.plugin_system.plugins.industrial_quad_relay',
+    28: 'brickv.plugin_system.plugins.io16',
+    29: 'brickv.plugin_system.plugins.io4',
+    210: 'brickv.plugin_system.plugins.joystick',
+    255: 'brickv.plugin_system.plugins.laser_range_finder',
+    211: 'brickv.plugin_system.plugins.lcd_16x2',
+    212: 'brickv.plugin_system.plugins.lcd_20x4',
+    231: 'brickv.plugin_system.plugins.led_strip',
+    241: 'brickv.plugin_system.plugins.line',
+    213: 'brickv.plugin_system.plugins.linear_poti',
+    253: 'brickv.plugin_system.plugins.load_cell',
+    13: 'brickv.plugin_system.plugins.master',
+    232: 'brickv.plugin_system.plugins.moisture',
+    233: 'brickv.plugin_system.plugins.motion_detector',
+    234: 'brickv.plugin_system.plugins.multi_touch',
+    246: 'brickv.plugin_system.plugins.nfc_rfid',
+    263: 'brickv.plugin_system.plugins.oled_128x64',
+    264: 'brickv.plugin_system.plugins.oled_64x48',
+    261: 'brickv.plugin_system.plugins.ozone',
+    214: 'brickv.plugin_system.plugins.piezo_buzzer',
+    242: 'brickv.plugin_system.plugins.piezo_speaker',
+    226: 'brickv.plugin_system.plugins.ptc',
+    17: 'brickv.plugin_system.plugins.red',
+    235: 'brickv.plugin_system.plugins.remote_switch',
+    236: 'brickv.plugin_system.plugins.rotary_encoder',
+    215: 'brickv.plugin_system.plugins.rotary_poti',
+    254: 'brickv.plugin_system.plugins.rs232',
+    237: 'brickv.plugin_system.plugins.segment_display_4x7',
+    14: 'brickv.plugin_system.plugins.servo',
+    244: 'brickv.plugin_system.plugins.solid_state_relay',
+    238: 'brickv.plugin_system.plugins.sound_intensity',
+    15: 'brickv.plugin_system.plugins.stepper',
+    216: 'brickv.plugin_system.plugins.temperature',
+    217: 'brickv.plugin_system.plugins.temperature_ir',
+    239: 'brickv.plugin_system.plugins.tilt',
+    218: 'brickv.plugin_system.plugins.voltage',
+    227: 'brickv.plugin_system.plugins.voltage_current',
+}
 
-device_classes = [
-    ac_current,
-    accelerometer,
-    ambient_light,
-    ambient_light_v2,
-    analog_in,
-    analog_in_v2,
-    analog_out,
-    analog_out_v2,
-    barometer,
-    co2,
-    color,
-    current12,
-    current25,
-    dc,
-    distance_ir,
-    distance_us,
-    dual_button,
-    dual_relay,
-    dust_detector,
-    gas_detector,
-    gps,
-    hall_effect,
-    heart_rate,
-    humidity,
-    imu,
-    imu_v2,
-    industrial_analog_out,
-    industrial_digital_in_4,
-    industrial_digital_out_4,
-    industrial_dual_0_20ma,
-    industrial_dual_analog_in,
-    industrial_quad_relay,
-    io16,
-    io4,
-    joystick,
-    laser_range_finder,
-    lcd_16x2,
-    lcd_20x4,
-    led_strip,
-    line,
-    linear_poti,
-    load_cell,
-    master,
-    moisture,
-    motion_detector,
-    multi_touch,
-    nfc_rfid,
-    oled_128x64,
-    oled_64x48,
-    ozone,
-    piezo_buzzer,
-    piezo_speaker,
-    ptc,
-    red,
-    remote_switch,
-    rotary_encoder,
-    rotary_poti,
-    rs232,
-    segment_display_4x7,
-    servo,
-    solid_state_relay,
-    sound_intensity,
-    stepper,
-    temperature,
-    temperature_ir,
-    tilt,
-    voltage,
-    voltage_current,
-]
+# binding module and class per device identifier, placeholder plugins
+# create the device object from these before the plugin is built
+device_bindings = {
+    257: ('brickv.bindings.bricklet_ac_current', 'BrickletACCurrent'),
+    250: ('brickv.bindings.bricklet_accelerometer', 'BrickletAccelerometer'),
+    21: ('brickv.bindings.bricklet_ambient_light', 'BrickletAmbientLight'),
+    259: ('brickv.bindings.bricklet_ambient_light_v2', 'BrickletAmbientLightV2'),
+    219: ('brickv.bindings.bricklet_analog_in', 'BrickletAnalogIn'),
+    251: ('brickv.bindings.bricklet_analog_in_v2', 'BrickletAnalogInV2'),
+    220: ('brickv.bindings.bricklet_analog_out', 'BrickletAnalogOut'),
+    256: ('brickv.bindings.bricklet_analog_out_v2', 'BrickletAnalogOutV2'),
+    221: ('brickv.bindings.bricklet_barometer', 'BrickletBarometer'),
+    262: ('brickv.bindings.bricklet_co2', 'BrickletCO2'),
+    243: ('brickv.bindings.bricklet_color', 'BrickletColor'),
+    23: ('brickv.bindings.bricklet_current12', 'BrickletCurrent12'),
+    24: ('brickv.bindings.bricklet_current25', 'BrickletCurrent25'),
+    11: ('brickv.bindings.brick_dc', 'BrickDC'),
+    25: ('brickv.bindings.bricklet_distance_ir', 'BrickletDistanceIR'),
+    229: ('brickv.bindings.bricklet_distance_us', 'BrickletDistanceUS'),
+    230: ('brickv.bindings.bricklet_dual_button', 'BrickletDualButton'),
+    26: ('brickv.bindings.bricklet_dual_relay', 'BrickletDualRelay'),
+    260: ('brickv.bindings.bricklet_dust_detector', 'BrickletDustDetector'),
+    252: ('brickv.bindings.bricklet_gas_detector', 'BrickletGasDetector'),
+    222: ('brickv.bindings.bricklet_gps', 'BrickletGPS'),
+    240: ('brickv.bindings.bricklet_hall_effect', 'BrickletHallEffect'),
+    245: ('brickv.bindings.bricklet_heart_rate', 'BrickletHeartRate'),
+    27: ('brickv.bindings.bricklet_humidity', 'BrickletHumidity'),
+    16: ('brickv.bindings.brick_imu', 'BrickIMU'),
+    18: ('brickv.bindings.brick_imu_v2', 'BrickIMUV2'),
+    258: ('brickv.bindings.bricklet_industrial_analog_out', 'BrickletIndustrialAnalogOut'),
+    223: ('brickv.bindings.bricklet_industrial_digital_in_4', 'BrickletIndustrialDigitalIn4'),
+    224: ('brickv.bindings.bricklet_industrial_digital_out_4', 'BrickletIndustrialDigitalOut4'),
+    228: ('brickv.bindings.bricklet_industrial_dual_0_20ma', 'BrickletIndustrialDual020mA'),
+    249: ('brickv.bindings.bricklet_industrial_dual_analog_in', 'BrickletIndustrialDualAnalogIn'),
+    225: ('brickv.bindings.bricklet_industrial_quad_relay', 'BrickletIndustrialQuadRelay'),
+    28: ('brickv.bindings.bricklet_io16', 'BrickletIO16'),
+    29: ('brickv.bindings.bricklet_io4', 'BrickletIO4'),
+    210: ('brickv.bindings.bricklet_joystick', 'BrickletJoystick'),
+    255: ('brickv.bindings.bricklet_laser_range_finder', 'BrickletLaserRangeFinder'),
+    211: ('brickv.bindings.bricklet_lcd_16x2', 'BrickletLCD16x2'),
+    212: ('brickv.bindings.bricklet_lcd_20x4', 'BrickletLCD20x4'),
+    231: ('brickv.bindings.bricklet_led_strip', 'BrickletLEDStrip'),
+    241: ('brickv.bindings.bricklet_line', 'BrickletLine'),
+    213: ('brickv.bindings.bricklet_linear_poti', 'BrickletLinearPoti'),
+    253: ('brickv.bindings.bricklet_load_cell', 'BrickletLoadCell'),
+    13: ('brickv.bindings.brick_master', 'BrickMaster'),
+    232: ('brickv.bindings.bricklet_moisture', 'BrickletMoisture'),
+    233: ('brickv.bindings.bricklet_motion_detector', 'BrickletMotionDetector'),
+    234: ('brickv.bindings.bricklet_multi_touch', 'BrickletMultiTouch'),
+    246: ('brickv.bindings.bricklet_nfc_rfid', 'BrickletNFCRFID'),
+    263: ('brickv.bindings.bricklet_oled_128x64', 'BrickletOLED128x64'),
+    264: ('brickv.bindings.bricklet_oled_64x48', 'BrickletOLED64x48'),
+    261: ('brickv.bindings.bricklet_ozone', 'BrickletOzone'),
+    214: ('brickv.bindings.bricklet_piezo_buzzer', 'BrickletPiezoBuzzer'),
+    242: ('brickv.bindings.bricklet_piezo_speaker', 'BrickletPiezoSpeaker'),
+    226: ('brickv.bindings.bricklet_ptc', 'BrickletPTC'),
+    17: ('brickv.bindings.brick_red', 'BrickRED'),
+    235: ('brickv.bindings.bricklet_remote_switch', 'BrickletRemoteSwitch'),
+    236: ('brickv.bindings.bricklet_rotary_encoder', 'BrickletRotaryEncoder'),
+    215: ('brickv.bindings.bricklet_rotary_poti', 'BrickletRotaryPoti'),
+    254: ('brickv.bindings.bricklet_rs232', 'BrickletRS232'),
+    237: ('brickv.bindings.bricklet_segment_display_4x7', 'BrickletSegmentDisplay4x7'),
+    14: ('brickv.bindings.brick_servo', 'BrickServo'),
+    244: ('brickv.bindings.bricklet_solid_state_relay', 'BrickletSolidStateRelay'),
+    238: ('brickv.bindings.bricklet_sound_intensity', 'BrickletSoundIntensity'),
+    15: ('brickv.bindings.brick_stepper', 'BrickStepper'),
+    216: ('brickv.bindings.bricklet_temperature', 'BrickletTemperature'),
+    217: ('brickv.bindings.bricklet_temperature_ir', 'BrickletTemperatureIR'),
+    239: ('brickv.bindings.bricklet_tilt', 'BrickletTilt'),
+    218: ('brickv.bindings.bricklet_voltage', 'BrickletVoltage'),
+    227: ('brickv.bindings.bricklet_voltage_current', 'BrickletVoltageCurrent'),
+}
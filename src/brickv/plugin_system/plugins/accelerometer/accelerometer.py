@@ -29,7 +29,7 @@ from PyQt4.QtGui import QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QCheckBox,
 
 from brickv.plugin_system.plugin_base import PluginBase
 from brickv.bindings.bricklet_accelerometer import BrickletAccelerometer
-from brickv.plot_widget import PlotWidget
+from brickv.plot_widget import PlotWidget, monotonic
 from brickv.async_call import async_call
 from brickv.callback_emulator import CallbackEmulator
 
@@ -81,11 +81,10 @@ class Accelerometer(PluginBase):
                                                 self.increase_error_count)
 
         self.acceleration_label = AccelerationLabel()
-        self.current_acceleration = [None, None, None]
         
-        plot_list = [['X', Qt.red, self.get_current_x],
-                     ['Y', Qt.darkGreen, self.get_current_y],
-                     ['Z', Qt.blue, self.get_current_z]]
+        plot_list = [['X', Qt.red, None],
+                     ['Y', Qt.darkGreen, None],
+                     ['Z', Qt.blue, None]]
         self.plot_widget = PlotWidget('Acceleration [g]', plot_list)
         
         self.temperature_label = TemperatureLabel()
@@ -179,7 +178,11 @@ class Accelerometer(PluginBase):
         x, y, z = data
         self.acceleration_label.setText(x, y, z)
         self.pitch_roll_label.setText(x, y, z)
-        self.current_acceleration = [x/1000.0, y/1000.0, z/1000.0]
+
+        timestamp = monotonic()
+
+        for i, value in enumerate([x, y, z]):
+            self.plot_widget.push(i, timestamp, value/1000.0)
         
     def cb_configuration(self, conf):
         self.fs_combo.setCurrentIndex(conf.full_scale)
@@ -189,15 +192,6 @@ class Accelerometer(PluginBase):
     def cb_temperature(self, temp):
         self.temperature_label.setText(temp)
         
-    def get_current_x(self):
-        return self.current_acceleration[0]
-
-    def get_current_y(self):
-        return self.current_acceleration[1]
-
-    def get_current_z(self):
-        return self.current_acceleration[2]
-
     def start(self):
         async_call(self.accelerometer.is_led_on, None, self.is_led_on_async, self.increase_error_count)
         async_call(self.accelerometer.get_configuration, None, self.cb_configuration, self.increase_error_count)
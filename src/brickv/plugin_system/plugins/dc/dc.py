@@ -30,7 +30,7 @@ from brickv.plugin_system.plugins.dc.speedometer import SpeedoMeter
 from brickv.plugin_system.plugins.dc.ui_dc import Ui_DC
 from brickv.bindings import ip_connection
 from brickv.bindings.brick_dc import BrickDC
-from brickv.async_call import async_call
+from brickv.async_call import async_call, ASYNC_PRIORITY_BACKGROUND
 from brickv.callback_emulator import CallbackEmulator
 from brickv.slider_spin_syncer import SliderSpinSyncer
 
@@ -315,10 +315,10 @@ class DC(PluginBase, Ui_DC):
 #            self.update_encoder()
 
     def update_data(self):
-        async_call(self.dc.get_stack_input_voltage, None, self.stack_input_voltage_update, self.increase_error_count)
-        async_call(self.dc.get_external_input_voltage, None, self.external_input_voltage_update, self.increase_error_count)
-        async_call(self.dc.get_minimum_voltage, None, self.minimum_voltage_update, self.increase_error_count)
-        async_call(self.dc.get_current_consumption, None, self.current_consumption_update, self.increase_error_count)
+        async_call(self.dc.get_stack_input_voltage, None, self.stack_input_voltage_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+        async_call(self.dc.get_external_input_voltage, None, self.external_input_voltage_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+        async_call(self.dc.get_minimum_voltage, None, self.minimum_voltage_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+        async_call(self.dc.get_current_consumption, None, self.current_consumption_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
 
     def acceleration_changed(self, value):
         try:
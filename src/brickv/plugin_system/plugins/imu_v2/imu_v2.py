@@ -22,7 +22,7 @@ Free Software Foundation, Inc., 59 Temple Place - Suite 330,
 Boston, MA 02111-1307, USA.
 """
 
-from PyQt4.QtCore import Qt, QTimer
+from PyQt4.QtCore import Qt
 from PyQt4.QtGui import QVBoxLayout, QColor, QPalette, QFrame, QPainter, \
                         QBrush, QDialog, QAction
 
@@ -31,7 +31,7 @@ from brickv.plugin_system.plugins.imu_v2.ui_imu_v2 import Ui_IMUV2
 from brickv.plugin_system.plugins.imu_v2.ui_calibration import Ui_Calibration
 from brickv.bindings.brick_imu_v2 import BrickIMUV2
 from brickv.async_call import async_call
-from brickv.plot_widget import PlotWidget
+from brickv.plot_widget import SparklineWidget
 from brickv.callback_emulator import CallbackEmulator
 
 class Calibration(QDialog, Ui_Calibration):
@@ -146,7 +146,6 @@ class IMUV2(PluginBase, Ui_IMUV2):
         self.max_y = 0
         self.max_z = 0
 
-        self.data_plot_widget = []
         self.sensor_data = [0]*23
 
         self.data_labels = [self.label_acceleration_x, self.label_acceleration_y, self.label_acceleration_z, 
@@ -195,29 +194,24 @@ class IMUV2(PluginBase, Ui_IMUV2):
                     
                 label.setAutoFillBackground(True)
 
-        def get_lambda_data_getter(i):
-            return lambda: self.get_data(i)
-
-        self.plot_timer = QTimer(self)
-        self.plot_timer.start(100)
-
-        for i in range(23):
-            self.data_plot_widget.append(PlotWidget("",
-                                                    [["", self.data_color[i][0], get_lambda_data_getter(i)]],
-                                                    self.clear_graphs, 
-                                                    scales_visible=False, 
-                                                    curve_outer_border_visible=False,
-                                                    curve_motion_granularity=1,
-                                                    canvas_color=self.data_color[i][1],
-                                                    external_timer=self.plot_timer))
-
-        for w in self.data_plot_widget:
-            w.setMinimumHeight(15)
-            w.setMaximumHeight(25)
-                    
-        for i in range(23):
-            self.data_grid.addWidget(self.data_plot_widget[i], i, 4)
-            
+        # one widget draws the traces of all 23 data rows, lane i is aligned
+        # to row i of the data grid. the lanes are fed by all_data_callback
+        data_names = ['Acceleration X', 'Acceleration Y', 'Acceleration Z',
+                      'Magnetic Field X', 'Magnetic Field Y', 'Magnetic Field Z',
+                      'Angular Velocity X', 'Angular Velocity Y', 'Angular Velocity Z',
+                      'Euler Angle Heading', 'Euler Angle Roll', 'Euler Angle Pitch',
+                      'Quaternion W', 'Quaternion X', 'Quaternion Y', 'Quaternion Z',
+                      'Linear Acceleration X', 'Linear Acceleration Y', 'Linear Acceleration Z',
+                      'Gravity Vector X', 'Gravity Vector Y', 'Gravity Vector Z',
+                      'Temperature']
+
+        self.data_sparklines = SparklineWidget([[color, canvas_color, None] for color, canvas_color in self.data_color],
+                                               self.clear_graphs, lane_names=data_names)
+        self.data_sparklines.setMaximumHeight(25 * 23)
+        self.data_sparklines.align_lanes_to_grid(self.data_grid, 0)
+
+        self.data_grid.addWidget(self.data_sparklines, 0, 4, 23, 1)
+
         self.data_grid.setColumnMinimumWidth(2, 75)
 
         self.gl_layout = QVBoxLayout()
@@ -246,12 +240,10 @@ class IMUV2(PluginBase, Ui_IMUV2):
         self.gl_layout.activate()
         self.cbe_all_data.set_period(50)
 
-        for w in self.data_plot_widget:
-            w.stop = False
+        self.data_sparklines.stop = False
 
     def stop(self):
-        for w in self.data_plot_widget:
-            w.stop = True
+        self.data_sparklines.stop = True
 
         self.cbe_all_data.set_period(0)
 
@@ -305,6 +297,8 @@ class IMUV2(PluginBase, Ui_IMUV2):
             for i in range(23):
                 self.data_labels[i].setText("{0:.2f}".format(self.sensor_data[i]))
 
+            self.data_sparklines.push(None, self.sensor_data)
+
             self.imu_gl.update(self.sensor_data[12],
                                self.sensor_data[13],
                                self.sensor_data[14],
@@ -333,6 +327,3 @@ class IMUV2(PluginBase, Ui_IMUV2):
             self.imu.leds_on()
         else:
             self.imu.leds_off()
-    
-    def get_data(self, i):
-        return self.sensor_data[i]
@@ -122,14 +122,16 @@ class LEDStrip(PluginBase, Ui_LEDStrip):
         self.label_voltage.setText(str(voltage/1000.0) + 'V')
 
     def cb_frame_rendered(self):
-        if self.state == self.STATE_COLOR_SINGLE:
-            self.render_color_single()
-        elif self.state == self.STATE_COLOR_BLACK:
-            self.render_color_black()
-        elif self.state == self.STATE_COLOR_GRADIENT:
-            self.render_color_gradient()
-        elif self.state == self.STATE_COLOR_DOT:
-            self.render_color_dot()
+        # send all set_rgb_values calls of a frame at once
+        with self.ipcon.batch():
+            if self.state == self.STATE_COLOR_SINGLE:
+                self.render_color_single()
+            elif self.state == self.STATE_COLOR_BLACK:
+                self.render_color_black()
+            elif self.state == self.STATE_COLOR_GRADIENT:
+                self.render_color_gradient()
+            elif self.state == self.STATE_COLOR_DOT:
+                self.render_color_dot()
 
     def clock_frequency_changed(self, frequency):
         self.led_strip.set_clock_frequency(frequency)
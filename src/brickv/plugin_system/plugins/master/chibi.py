@@ -27,7 +27,7 @@ from brickv.bindings.ip_connection import IPConnection
 from PyQt4.QtGui import QWidget, QMessageBox
 
 from brickv.plugin_system.plugins.master.ui_chibi import Ui_Chibi
-from brickv.async_call import async_call
+from brickv.async_call import async_call, ASYNC_PRIORITY_BACKGROUND
 from brickv.utils import get_main_window
 from brickv import infos
 
@@ -250,4 +250,4 @@ class Chibi(QWidget, Ui_Chibi):
         self.signal_strength_label.setText(ss_str)
 
     def update_data(self):
-        async_call(self.master.get_chibi_signal_strength, None, self.signal_strength_update, self.parent.increase_error_count)
+        async_call(self.master.get_chibi_signal_strength, None, self.signal_strength_update, self.parent.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
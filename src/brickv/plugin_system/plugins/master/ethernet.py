@@ -26,7 +26,7 @@ from PyQt4.QtGui import QWidget, QMessageBox, QLineEdit
 from PyQt4.QtCore import Qt
 
 from brickv.plugin_system.plugins.master.ui_ethernet import Ui_Ethernet
-from brickv.async_call import async_call
+from brickv.async_call import async_call, async_gather, ASYNC_PRIORITY_BACKGROUND
 from brickv.utils import get_main_window
 
 class Ethernet(QWidget, Ui_Ethernet):
@@ -46,14 +46,16 @@ class Ethernet(QWidget, Ui_Ethernet):
         self.last_port = 4223
         self.last_websocket_port = 4280
 
+        getters = []
+
         if parent.firmware_version >= (2, 1, 0):
-            async_call(self.master.get_ethernet_configuration, None, self.get_ethernet_configuration_async, self.parent.increase_error_count)
-            async_call(self.master.get_ethernet_status, None, self.get_ethernet_status_init_async, self.parent.increase_error_count)
+            getters.append((self.master.get_ethernet_configuration, self.get_ethernet_configuration_async))
+            getters.append((self.master.get_ethernet_status, self.get_ethernet_status_init_async))
             self.ethernet_connection.currentIndexChanged.connect(self.connection_changed)
             self.ethernet_save.clicked.connect(self.save_clicked)
 
         if parent.firmware_version >= (2, 2, 0):
-            async_call(self.master.get_ethernet_websocket_configuration, None, self.get_ethernet_websocket_configuration_async, self.parent.increase_error_count)
+            getters.append((self.master.get_ethernet_websocket_configuration, self.get_ethernet_websocket_configuration_async))
             self.ethernet_socket_connections.valueChanged.connect(self.socket_connections_changed)
             self.ethernet_websocket_connections.valueChanged.connect(self.websocket_connections_changed)
 
@@ -67,7 +69,7 @@ class Ethernet(QWidget, Ui_Ethernet):
             self.ethernet_secret_label.hide()
             self.ethernet_secret.hide()
 
-            async_call(self.master.get_ethernet_authentication_secret, None, self.get_ethernet_authentication_secret_async, self.parent.increase_error_count)
+            getters.append((self.master.get_ethernet_authentication_secret, self.get_ethernet_authentication_secret_async))
         else:
             self.ethernet_use_auth.setText("Use Authentication (FW Version >= 2.2.0 required)")
             self.ethernet_use_auth.setDisabled(True)
@@ -78,6 +80,15 @@ class Ethernet(QWidget, Ui_Ethernet):
             self.ethernet_socket_connections.setEnabled(False)
             self.ethernet_websocket_connections.setEnabled(False)
 
+        def getters_async(results):
+            for (_, getter_async), result in zip(getters, results):
+                if isinstance(result, Exception):
+                    self.parent.increase_error_count()
+                else:
+                    getter_async(result)
+
+        async_gather([(getter, None) for getter, _ in getters], return_exceptions=True).then(getters_async)
+
     def destroy(self):
         pass
 
@@ -295,7 +306,7 @@ class Ethernet(QWidget, Ui_Ethernet):
         self.update_data_counter += 1
         if self.update_data_counter == 10:
             self.update_data_counter = 0
-            async_call(self.master.get_ethernet_status, None, self.get_ethernet_status_async, self.parent.increase_error_count)
+            async_call(self.master.get_ethernet_status, None, self.get_ethernet_status_async, self.parent.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
 
     def popup_ok(self, message='Successfully saved configuration.\nNew configuration will be used after reset of the Master Brick.'):
         QMessageBox.information(get_main_window(), "Configuration", message, QMessageBox.Ok)
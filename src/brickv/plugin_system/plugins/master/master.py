@@ -33,7 +33,7 @@ from brickv.plugin_system.plugins.master.rs485 import RS485
 from brickv.plugin_system.plugins.master.wifi import Wifi
 from brickv.plugin_system.plugins.master.ethernet import Ethernet
 from brickv.bindings.brick_master import BrickMaster
-from brickv.async_call import async_call
+from brickv.async_call import async_call, async_gather, ASYNC_PRIORITY_BACKGROUND
         
 class Master(PluginBase, Ui_Master):
     def __init__(self, *args):
@@ -111,21 +111,32 @@ class Master(PluginBase, Ui_Master):
         if self.check_extensions:
             self.check_extensions = False
 
+            checks = []
+
             # Chibi widget
             if self.firmware_version >= (1, 1, 0):
-                async_call(self.master.is_chibi_present, None, self.is_chibi_present_async, self.increase_error_count)
+                checks.append((self.master.is_chibi_present, self.is_chibi_present_async))
 
             # RS485 widget
             if self.firmware_version >= (1, 2, 0):
-                async_call(self.master.is_rs485_present, None, self.is_rs485_present_async, self.increase_error_count)
+                checks.append((self.master.is_rs485_present, self.is_rs485_present_async))
 
             # Wifi widget
             if self.firmware_version >= (1, 3, 0):
-                async_call(self.master.is_wifi_present, None, self.is_wifi_present_async, self.increase_error_count)
+                checks.append((self.master.is_wifi_present, self.is_wifi_present_async))
 
             # Ethernet widget
             if self.firmware_version >= (2, 1, 0):
-                async_call(self.master.is_ethernet_present, None, self.is_ethernet_present_async, self.increase_error_count)
+                checks.append((self.master.is_ethernet_present, self.is_ethernet_present_async))
+
+            def checks_async(results):
+                for (_, present_async), present in zip(checks, results):
+                    if isinstance(present, Exception):
+                        self.increase_error_count()
+                    else:
+                        present_async(present)
+
+            async_gather([(is_present, None) for is_present, _ in checks], return_exceptions=True).then(checks_async)
 
         self.update_timer.start(1000)
 
@@ -154,8 +165,8 @@ class Master(PluginBase, Ui_Master):
         return device_identifier == BrickMaster.DEVICE_IDENTIFIER
     
     def update_data(self):
-        async_call(self.master.get_stack_voltage, None, self.stack_voltage_update, self.increase_error_count)
-        async_call(self.master.get_stack_current, None, self.stack_current_update, self.increase_error_count)
+        async_call(self.master.get_stack_voltage, None, self.stack_voltage_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+        async_call(self.master.get_stack_current, None, self.stack_current_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
         
         for extension in self.extensions:
             extension.update_data()
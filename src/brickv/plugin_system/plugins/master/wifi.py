@@ -27,7 +27,7 @@ from PyQt4.QtCore import Qt
 
 from brickv.plugin_system.plugins.master.ui_wifi import Ui_Wifi
 from brickv.plugin_system.plugins.master.wifi_status import WifiStatus
-from brickv.async_call import async_call
+from brickv.async_call import async_call, async_gather
 from brickv.utils import get_main_window, get_home_path, get_open_file_name
 
 import os
@@ -51,25 +51,27 @@ class Wifi(QWidget, Ui_Wifi):
         self.wifi_password.setEchoMode(QLineEdit.Password)
         self.wifi_password_show.stateChanged.connect(self.wifi_password_show_state_changed)
 
+        getters = []
+
         if parent.firmware_version >= (1, 3, 0):
             if parent.firmware_version < (1, 3, 3):
                 # AP and Ad Hoc was added in 1.3.3
                 while self.wifi_connection.count() > 2:
                     self.wifi_connection.removeItem(self.wifi_connection.count() - 1)
 
-            async_call(self.master.get_wifi_configuration, None, self.get_wifi_configuration_async, self.parent.increase_error_count)
-            async_call(self.master.get_wifi_certificate, 0xFFFF, self.update_username_async, self.parent.increase_error_count)
-            async_call(self.master.get_wifi_certificate, 0xFFFE, self.update_password_async, self.parent.increase_error_count)
-            async_call(self.master.get_wifi_power_mode, None, self.wifi_power_mode.setCurrentIndex, self.parent.increase_error_count)
+            getters.append((self.master.get_wifi_configuration, None, self.get_wifi_configuration_async))
+            getters.append((self.master.get_wifi_certificate, 0xFFFF, self.update_username_async))
+            getters.append((self.master.get_wifi_certificate, 0xFFFE, self.update_password_async))
+            getters.append((self.master.get_wifi_power_mode, None, self.wifi_power_mode.setCurrentIndex))
 
             if parent.firmware_version >= (1, 3, 4):
-                async_call(self.master.get_wifi_regulatory_domain, None, self.wifi_domain.setCurrentIndex, self.parent.increase_error_count)
+                getters.append((self.master.get_wifi_regulatory_domain, None, self.wifi_domain.setCurrentIndex))
             else:
                 self.wifi_domain.setEnabled(False)
                 self.wifi_domain.clear()
                 self.wifi_domain.addItem("FW Version >= 1.3.4 required")
 
-            async_call(self.master.get_wifi_encryption, None, self.get_wifi_encryption_async, self.parent.increase_error_count)
+            getters.append((self.master.get_wifi_encryption, None, self.get_wifi_encryption_async))
 
             if parent.firmware_version < (2, 0, 5):
                 self.wifi_hostname.setDisabled(True)
@@ -77,7 +79,7 @@ class Wifi(QWidget, Ui_Wifi):
                 self.wifi_hostname.setText("FW Version >= 2.0.5 required")
                 self.wifi_hostname_label.setDisabled(True)
             else:
-                async_call(self.master.get_wifi_hostname, None, self.get_wifi_hostname_async, self.parent.increase_error_count)
+                getters.append((self.master.get_wifi_hostname, None, self.get_wifi_hostname_async))
 
         if parent.firmware_version >= (2, 2, 0):
             self.wifi_use_auth.stateChanged.connect(self.wifi_auth_changed)
@@ -87,7 +89,7 @@ class Wifi(QWidget, Ui_Wifi):
             self.wifi_secret_label.hide()
             self.wifi_secret.hide()
 
-            async_call(self.master.get_wifi_authentication_secret, None, self.get_wifi_authentication_secret_async, self.parent.increase_error_count)
+            getters.append((self.master.get_wifi_authentication_secret, None, self.get_wifi_authentication_secret_async))
         else:
             self.wifi_use_auth.setText("Use Authentication (FW Version >= 2.2.0 required)")
             self.wifi_use_auth.setDisabled(True)
@@ -95,6 +97,15 @@ class Wifi(QWidget, Ui_Wifi):
             self.wifi_secret_label.hide()
             self.wifi_secret.hide()
 
+        def getters_async(results):
+            for (_, _, getter_async), result in zip(getters, results):
+                if isinstance(result, Exception):
+                    self.parent.increase_error_count()
+                else:
+                    getter_async(result)
+
+        async_gather([(getter, parameter) for getter, parameter, _ in getters], return_exceptions=True).then(getters_async)
+
         self.wifi_status = None
 
     def destroy(self):
@@ -773,29 +773,27 @@ class REDFileBase(REDObject):
 
         unchecked_writes = 0
 
-        # do at most ASYNC_BURST_CHUNKS - 1 unchecked writes before the final async write per burst
-        while unchecked_writes < REDFileBase.ASYNC_BURST_CHUNKS - 1 and \
-              (self._write_async_data.length - self._write_async_data.written) > REDFileBase.MAX_WRITE_ASYNC_BUFFER_LENGTH:
-            chunk, length_to_write = _get_zero_padded_chunk(self._write_async_data.data,
-                                                            REDFileBase.MAX_WRITE_UNCHECKED_BUFFER_LENGTH,
-                                                            self._write_async_data.written)
-
-            try:
-                self._session._brick.write_file_unchecked(self.object_id, chunk, length_to_write)
-            except Exception as e:
-                self._report_write_async_result(e)
-                return
-
-            self._write_async_data.written += length_to_write
-            unchecked_writes               += 1
-
-        chunk, length_to_write = _get_zero_padded_chunk(self._write_async_data.data,
-                                                        REDFileBase.MAX_WRITE_ASYNC_BUFFER_LENGTH,
-                                                        self._write_async_data.written)
-
         try:
-            # FIXME: Do we need a timeout here for the case that no callback comes?
-            self._session._brick.write_file_async(self.object_id, chunk, length_to_write)
+            # send the whole burst with as few syscalls as possible
+            with self._session._brick.ipcon.batch():
+                # do at most ASYNC_BURST_CHUNKS - 1 unchecked writes before the final async write per burst
+                while unchecked_writes < REDFileBase.ASYNC_BURST_CHUNKS - 1 and \
+                      (self._write_async_data.length - self._write_async_data.written) > REDFileBase.MAX_WRITE_ASYNC_BUFFER_LENGTH:
+                    chunk, length_to_write = _get_zero_padded_chunk(self._write_async_data.data,
+                                                                    REDFileBase.MAX_WRITE_UNCHECKED_BUFFER_LENGTH,
+                                                                    self._write_async_data.written)
+
+                    self._session._brick.write_file_unchecked(self.object_id, chunk, length_to_write)
+
+                    self._write_async_data.written += length_to_write
+                    unchecked_writes               += 1
+
+                chunk, length_to_write = _get_zero_padded_chunk(self._write_async_data.data,
+                                                                REDFileBase.MAX_WRITE_ASYNC_BUFFER_LENGTH,
+                                                                self._write_async_data.written)
+
+                # FIXME: Do we need a timeout here for the case that no callback comes?
+                self._session._brick.write_file_async(self.object_id, chunk, length_to_write)
         except Exception as e:
             self._report_write_async_result(e)
 
@@ -34,7 +34,7 @@ from brickv.plugin_system.plugin_base import PluginBase
 from brickv.plugin_system.plugins.servo.ui_servo import Ui_Servo
 from brickv.bindings import ip_connection
 from brickv.bindings.brick_servo import BrickServo
-from brickv.async_call import async_call
+from brickv.async_call import async_call, async_gather
 from brickv.knob_widget import KnobWidget
 from brickv.slider_spin_syncer import SliderSpinSyncer
 
@@ -304,15 +304,23 @@ class Servo(PluginBase, Ui_Servo):
             self.enable_checkbox.setChecked(False)
             return
 
-        async_call(self.servo.get_position, i, self.get_position_async, self.increase_error_count)
-        async_call(self.servo.get_velocity, i, self.get_velocity_async, self.increase_error_count)
-        async_call(self.servo.get_acceleration, i, self.get_acceleration_async, self.increase_error_count)
-        async_call(self.servo.get_period, i, self.get_period_async, self.increase_error_count)
-        async_call(self.servo.is_enabled, i, self.is_enabled_async, self.increase_error_count)
-        def get_lambda_deg(i):
-            return lambda x: self.get_degree_async(x, i)
-        async_call(self.servo.get_degree, i, get_lambda_deg(i), self.increase_error_count)
-        async_call(self.servo.get_pulse_width, i, self.get_pulse_width_async, self.increase_error_count)
+        getters = [(self.servo.get_position, self.get_position_async),
+                   (self.servo.get_velocity, self.get_velocity_async),
+                   (self.servo.get_acceleration, self.get_acceleration_async),
+                   (self.servo.get_period, self.get_period_async),
+                   (self.servo.is_enabled, self.is_enabled_async),
+                   (self.servo.get_degree, lambda deg: self.get_degree_async(deg, i)),
+                   (self.servo.get_pulse_width, self.get_pulse_width_async)]
+
+        # a failed getter only counts as error, the others are still applied
+        def getters_async(results):
+            for (_, getter_async), result in zip(getters, results):
+                if isinstance(result, Exception):
+                    self.increase_error_count()
+                else:
+                    getter_async(result)
+
+        async_gather([(getter, i) for getter, _ in getters], return_exceptions=True).then(getters_async)
 
     def error_handler(self, error):
         pass
@@ -30,7 +30,7 @@ from brickv.plugin_system.plugins.stepper.speedometer import SpeedoMeter
 from brickv.plugin_system.plugins.stepper.ui_stepper import Ui_Stepper
 from brickv.bindings import ip_connection
 from brickv.bindings.brick_stepper import BrickStepper
-from brickv.async_call import async_call
+from brickv.async_call import async_call, ASYNC_PRIORITY_BACKGROUND
 from brickv.slider_spin_syncer import SliderSpinSyncer
 
 class Stepper(PluginBase, Ui_Stepper):
@@ -323,17 +323,17 @@ class Stepper(PluginBase, Ui_Stepper):
         async_call(self.stepper.is_enabled, None, self.is_enabled_async, self.increase_error_count)
 
     def update_data(self):
-        async_call(self.stepper.get_remaining_steps, None, self.remaining_steps_update, self.increase_error_count)
-        async_call(self.stepper.get_current_position, None, self.position_update, self.increase_error_count)
-        async_call(self.stepper.get_current_velocity, None, self.speedometer.set_velocity, self.increase_error_count)
+        async_call(self.stepper.get_remaining_steps, None, self.remaining_steps_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+        async_call(self.stepper.get_current_position, None, self.position_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+        async_call(self.stepper.get_current_velocity, None, self.speedometer.set_velocity, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
 
         self.update_counter += 1
         if self.update_counter % 10 == 0:
-            async_call(self.stepper.get_motor_current, None, self.maximum_current_update, self.increase_error_count)
-            async_call(self.stepper.get_stack_input_voltage, None, self.stack_input_voltage_update, self.increase_error_count)
-            async_call(self.stepper.get_external_input_voltage, None, self.external_input_voltage_update, self.increase_error_count)
-            async_call(self.stepper.get_minimum_voltage, None, self.minimum_voltage_update, self.increase_error_count)
-            async_call(self.stepper.get_step_mode, None, self.mode_update, self.increase_error_count)
+            async_call(self.stepper.get_motor_current, None, self.maximum_current_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+            async_call(self.stepper.get_stack_input_voltage, None, self.stack_input_voltage_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+            async_call(self.stepper.get_external_input_voltage, None, self.external_input_voltage_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+            async_call(self.stepper.get_minimum_voltage, None, self.minimum_voltage_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
+            async_call(self.stepper.get_step_mode, None, self.mode_update, self.increase_error_count, priority=ASYNC_PRIORITY_BACKGROUND)
 
     def velocity_changed(self, value):
         try:
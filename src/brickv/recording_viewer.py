@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+brickv (Brick Viewer)
+Copyright (C) 2015 Vincent Szurma <vincent@szurma.de>
+
+recording_viewer.py: Browse recorded data files
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+from brickv.ui_recording_viewer import Ui_RecordingViewer
+
+from PyQt4.QtCore import Qt
+from PyQt4.QtGui import QDialog
+
+from brickv.plot_widget import PlotWidget
+
+import os
+import time
+
+CURVE_COLORS = [Qt.red, Qt.blue, Qt.darkGreen, Qt.magenta, Qt.darkCyan, Qt.darkYellow, Qt.black]
+
+class RecordingViewerWindow(QDialog, Ui_RecordingViewer):
+    def __init__(self, parent, reader, paths):
+        QDialog.__init__(self, parent)
+
+        self.setupUi(self)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+
+        self.reader = reader
+        self.plot_widget = None
+        self.sources = [] # per combo item source name
+        self.channels = {} # source -> list of (channel, curve)
+
+        for channel, (source, curve) in enumerate(reader.get_channels()):
+            if source not in self.channels:
+                self.sources.append(source)
+                self.channels[source] = []
+
+            self.channels[source].append((channel, curve))
+
+        self.sources.sort()
+
+        for source in self.sources:
+            self.combo_source.addItem(source)
+
+        names = [os.path.basename(path) for path in paths]
+        time_range = reader.get_time_range()
+
+        if time_range != None:
+            start = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time_range[0]))
+
+            self.setWindowTitle(u'Recording {0} ({1}, {2:.0f} s)'.format(', '.join(names), start,
+                                                                         time_range[1] - time_range[0]))
+        else:
+            self.setWindowTitle(u'Recording {0} (empty)'.format(', '.join(names)))
+
+        self.combo_source.currentIndexChanged.connect(self.source_changed)
+        self.source_changed(self.combo_source.currentIndex())
+
+    def source_changed(self, index):
+        if self.plot_widget != None:
+            self.layout_plot.removeWidget(self.plot_widget)
+            self.plot_widget.setParent(None)
+            self.plot_widget = None
+
+        if index < 0:
+            return
+
+        source = self.sources[index]
+        channels = self.channels[source]
+
+        if len(channels) == 1 and channels[0][1] not in source:
+            title = u'{0}: {1}'.format(source, channels[0][1])
+        else:
+            title = source
+
+        plots = []
+
+        for i, (channel, curve) in enumerate(channels):
+            plots.append([curve, CURVE_COLORS[i % len(CURVE_COLORS)], None])
+
+        self.plot_widget = PlotWidget(title, plots)
+        self.plot_widget.clear_button.hide()
+        self.plot_widget.browse(self.reader, [channel for channel, curve in channels])
+
+        self.layout_plot.addWidget(self.plot_widget)
+
+    # override QDialog.done, also called on close
+    def done(self, result):
+        self.reader.close()
+
+        QDialog.done(self, result)
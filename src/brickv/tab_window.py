@@ -25,7 +25,7 @@ Boston, MA 02111-1307, USA.
 
 import os
 
-from PyQt4.QtCore import Qt, pyqtSignal
+from PyQt4.QtCore import Qt, QEvent, pyqtSignal
 from PyQt4.QtGui import QWidget, QAbstractButton, QTabBar, QPainter, \
                         QSizePolicy, QIcon
 
@@ -69,7 +69,8 @@ class TabWindow(QWidget):
     it has a clickable icon visualizing mouseOver events; on click the button_handler
     of this class is called with the current index in the TabWidget.
     Callbacks called after the tabbing and before the  untabbing events
-    can be registered."""
+    can be registered. If untabbed, callbacks are called when the window
+    gets minimized, restored or activated."""
 
     def __init__(self, tab_widget, name, button_handler, parent=None):
         super(TabWindow, self).__init__(parent)
@@ -82,11 +83,25 @@ class TabWindow(QWidget):
         self.button_icon_mouse_over = QIcon(load_pixmap('tab-mouse-over-icon.png'))
         self.cb_on_tab = None
         self.cb_on_untab = None
+        self.cb_on_screen_change = None
+        self.cb_on_focus = None
 
     def closeEvent(self, event):
         self.tab()
         event.accept()
 
+    def changeEvent(self, event):
+        if self.windowFlags() & Qt.Window and self.cb_on_screen_change != None:
+            if event.type() == QEvent.WindowStateChange:
+                self.cb_on_screen_change(not self.isMinimized())
+            elif event.type() == QEvent.ActivationChange and self.isActiveWindow():
+                self.cb_on_screen_change(True)
+
+                if self.cb_on_focus != None:
+                    self.cb_on_focus()
+
+        super(TabWindow, self).changeEvent(event)
+
     def untab(self):
         index = self.tab_widget.indexOf(self)
         if index > -1:
@@ -115,8 +130,17 @@ class TabWindow(QWidget):
             if self.cb_on_tab != None:
                 self.cb_on_tab(index)
 
+            if self.cb_on_screen_change != None:
+                self.cb_on_screen_change(True)
+
     def set_callback_on_tab(self, callback):
         self.cb_on_tab = callback
 
     def set_callback_on_untab(self, callback):
         self.cb_on_untab = callback
+
+    def set_callback_on_screen_change(self, callback):
+        self.cb_on_screen_change = callback
+
+    def set_callback_on_focus(self, callback):
+        self.cb_on_focus = callback
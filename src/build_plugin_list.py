@@ -4,7 +4,7 @@
 brickv (Brick Viewer)
 Copyright (C) 2014-2015 Matthias Bolte <matthias@tinkerforge.com>
 
-build_plugin_list.py: Collects Brick Viewer plugins into a list
+build_plugin_list.py: Collects Brick Viewer plugins into a registry
 
 This program is free software; you can redistribute it and/or
 modify it under the terms of the GNU General Public License
@@ -23,6 +23,7 @@ Boston, MA 02111-1307, USA.
 """
 
 import os
+import re
 import sys
 
 released_only = False
@@ -33,8 +34,9 @@ if len(sys.argv) > 1:
     else:
         raise Exception('Unexpected argument ' + sys.argv[1])
 
-imports = []
-device_classes = []
+device_modules = []
+device_bindings = []
+device_identifiers = set()
 root = os.path.abspath(__file__).replace(__file__, '')
 plugins = os.path.join(root, 'brickv', 'plugin_system', 'plugins')
 bindings = os.path.join(root, 'brickv', 'bindings')
@@ -47,24 +49,49 @@ for plugin in sorted(os.listdir(plugins)):
     bricklet_binding = os.path.join(bindings, 'bricklet_{0}.py'.format(plugin))
 
     if os.path.isfile(brick_binding):
-        if released_only:
-            with open(brick_binding, 'r') as f:
-                if '#### __DEVICE_IS_NOT_RELEASED__ ####' in f.read():
-                    continue
+        binding = brick_binding
     elif os.path.isfile(bricklet_binding):
-        if released_only:
-            with open(bricklet_binding, 'r') as f:
-                if '#### __DEVICE_IS_NOT_RELEASED__ ####' in f.read():
-                    continue
+        binding = bricklet_binding
     else:
         raise Exception('No bindings found corresponding to plugin ' + plugin)
 
-    imports.append('from brickv.plugin_system.plugins.{0} import device_class as {0}\n'.format(plugin))
-    device_classes.append('    {0},\n'.format(plugin))
+    with open(binding, 'r') as f:
+        source = f.read()
+
+    if released_only and '#### __DEVICE_IS_NOT_RELEASED__ ####' in source:
+        continue
+
+    # read the device identifier from the binding instead of importing the
+    # plugin, that would require Qt and every plugin module at build time
+    match = re.search(r'^    DEVICE_IDENTIFIER = (\d+)$', source, re.MULTILINE)
+
+    if match == None:
+        raise Exception('No device identifier found in bindings of plugin ' + plugin)
+
+    if match.group(1) in device_identifiers:
+        raise Exception('Duplicate device identifier {0} in bindings of plugin {1}'.format(match.group(1), plugin))
+
+    device_identifier = match.group(1)
+    match = re.search(r'^class (\w+)\(Device\):$', source, re.MULTILINE)
+
+    if match == None:
+        raise Exception('No device class found in bindings of plugin ' + plugin)
+
+    binding_module = os.path.basename(binding)[:-3]
+
+    device_identifiers.add(device_identifier)
+    device_modules.append("    {0}: 'brickv.plugin_system.plugins.{1}',\n".format(device_identifier, plugin))
+    device_bindings.append("    {0}: ('brickv.bindings.{1}', '{2}'),\n".format(device_identifier, binding_module, match.group(1)))
 
 with open(os.path.join(plugins, '__init__.py'), 'wb') as f:
-    f.writelines(map(lambda s: s.encode('utf-8'), imports))
+    f.write(b'# generated by build_plugin_list.py, maps device identifiers to plugin\n')
+    f.write(b'# packages. PluginManager imports a plugin when its device shows up\n')
+    f.write(b'device_modules = {\n')
+    f.writelines(map(lambda s: s.encode('utf-8'), device_modules))
+    f.write(b'}\n')
     f.write(b'\n')
-    f.write(b'device_classes = [\n')
-    f.writelines(map(lambda s: s.encode('utf-8'), device_classes))
-    f.write(b']\n')
+    f.write(b'# binding module and class per device identifier, placeholder plugins\n')
+    f.write(b'# create the device object from these before the plugin is built\n')
+    f.write(b'device_bindings = {\n')
+    f.writelines(map(lambda s: s.encode('utf-8'), device_bindings))
+    f.write(b'}\n')
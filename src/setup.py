@@ -96,7 +96,7 @@ setup_arguments = {
 }
 
 if sys.platform.startswith('linux'):
-    setup_arguments['scripts'] = ['brickv/brickv']
+    setup_arguments['scripts'] = ['brickv/brickv', 'brickv/brickv-logger']
 elif sys.platform == 'win32':
     import py2exe
 
@@ -117,6 +117,8 @@ elif sys.platform == 'win32':
                              'pywintypes',
                              'win32file',
                              'win32api'],
+            # plugins are imported by name on first use, see plugin_manager.py
+            'packages':     ['brickv.plugin_system.plugins'],
             'excludes':     ['config_linux',
                              'config_macosx',
                              '_gtkagg',
@@ -158,6 +160,8 @@ elif sys.platform == 'darwin':
                                'ctypes.util',
                                'serial',
                                'colorsys'],
+            # plugins are imported by name on first use, see plugin_manager.py
+            'packages':       ['brickv.plugin_system.plugins'],
             'excludes':       ['scipy',
                                'distutils',
                                'setuptools',